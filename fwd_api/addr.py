@@ -0,0 +1,120 @@
+'''
+Helpers for converting address strings used by the Forward server
+(IPv4/IPv6 addresses and subnets, MAC addresses) to and from integers.
+'''
+
+import socket
+
+IPV4_BITS = 32
+IPV6_BITS = 128
+MAC_BITS = 48
+
+
+def is_ipv6(addr_str):
+    return ':' in addr_str
+
+
+def parse_ipv4(addr_str):
+    '''
+    @param {str} addr_str: E.g., "10.0.0.1"
+    @return {int}
+    '''
+    octets = addr_str.strip().split('.')
+    if len(octets) != 4:
+        raise ValueError('Invalid IPv4 address: %s' % addr_str)
+    value = 0
+    for octet in octets:
+        if not octet.isdigit() or int(octet) > 255:
+            raise ValueError('Invalid IPv4 address: %s' % addr_str)
+        value = (value << 8) | int(octet)
+    return value
+
+
+def parse_ipv6(addr_str):
+    '''
+    @param {str} addr_str: E.g., "2001:db8::1"
+    @return {long}
+    '''
+    try:
+        packed = socket.inet_pton(socket.AF_INET6, addr_str.strip())
+    except (socket.error, ValueError):
+        raise ValueError('Invalid IPv6 address: %s' % addr_str)
+    return long(packed.encode('hex'), 16)
+
+
+def parse_mac(addr_str):
+    '''
+    @param {str} addr_str: E.g., "00:00:00:9e:15:0a"
+    @return {long}
+    '''
+    parts = addr_str.strip().split(':')
+    if len(parts) != 6:
+        raise ValueError('Invalid MAC address: %s' % addr_str)
+    try:
+        octets = [int(part, 16) for part in parts]
+    except ValueError:
+        raise ValueError('Invalid MAC address: %s' % addr_str)
+    value = 0
+    for octet in octets:
+        if octet > 255:
+            raise ValueError('Invalid MAC address: %s' % addr_str)
+        value = (value << 8) | octet
+    return value
+
+
+def parse_prefix(prefix_str):
+    '''Parse an IPv4 or IPv6 address or subnet.
+
+    @param {str} prefix_str: E.g., "10.0.0.0/8", "10.0.0.1" or "2001:db8::/32"
+    @return {tuple}: (bits, value, prefix_len), where bits is the
+    address width (32 or 128), value is the network address with host
+    bits cleared and prefix_len is the number of significant bits.
+    '''
+    if '/' in prefix_str:
+        addr_str, len_str = prefix_str.split('/', 1)
+    else:
+        addr_str, len_str = prefix_str, None
+    if is_ipv6(addr_str):
+        bits, value = IPV6_BITS, parse_ipv6(addr_str)
+    else:
+        bits, value = IPV4_BITS, parse_ipv4(addr_str)
+    if len_str is None:
+        prefix_len = bits
+    else:
+        len_str = len_str.strip()
+        if not len_str.isdigit() or int(len_str) > bits:
+            raise ValueError('Invalid prefix length: %s' % prefix_str)
+        prefix_len = int(len_str)
+    return bits, value & prefix_mask(bits, prefix_len), prefix_len
+
+
+def prefix_mask(bits, prefix_len):
+    '''
+    @return {long}: Mask with the top prefix_len of bits bits set.
+    '''
+    return ((1 << prefix_len) - 1) << (bits - prefix_len)
+
+
+def format_ipv4(value):
+    return '.'.join(str((value >> shift) & 0xff)
+                    for shift in (24, 16, 8, 0))
+
+
+def format_ipv6(value):
+    packed = ('%032x' % value).decode('hex')
+    return socket.inet_ntop(socket.AF_INET6, packed)
+
+
+def format_prefix(bits, value, prefix_len):
+    '''Inverse of parse_prefix. Host routes are formatted without a
+    prefix length.
+
+    @return {str}
+    '''
+    if bits == IPV4_BITS:
+        addr_str = format_ipv4(value)
+    else:
+        addr_str = format_ipv6(value)
+    if prefix_len == bits:
+        return addr_str
+    return '%s/%d' % (addr_str, prefix_len)
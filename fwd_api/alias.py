@@ -5,6 +5,25 @@ import json
 import subprocess
 import abc
 
+import canonical
+from prefix_set import PrefixSet, collapse_prefixes, is_prefix
+from vlan_set import VlanSet
+
+# Keys of alias definitions set by clients. Other keys of the aliases
+# returned by the server are ignored by definition hashes.
+DEFINITION_KEYS = frozenset(['type', 'name', 'values', 'vlanIds'])
+
+
+def definition_hash(definition):
+    '''
+    @param {dict} definition: Alias definition, e.g., the output of
+    _Alias._to_alias_dict or an alias returned by the server
+    @return {str}: Hex digest identifying the definition
+    '''
+    return canonical.fingerprint(dict(
+        (key, value) for key, value in definition.iteritems()
+        if key in DEFINITION_KEYS))
+
 
 class _Alias(object):
     '''Base class for all alias objects.
@@ -29,6 +48,30 @@ class _Alias(object):
             'name': self.name
         }
 
+    def get_definition_hash(self):
+        '''Return hex digest identifying the alias definition; see
+        definition_hash
+        '''
+        return definition_hash(self._to_alias_dict())
+
+
+class RawAlias(_Alias):
+    '''Alias given by its definition, e.g., as returned by the server
+    '''
+
+    def __init__(self, definition):
+        '''
+        @param {dict} definition: Must have a 'name'. Keys outside
+        DEFINITION_KEYS are dropped.
+        '''
+        super(RawAlias, self).__init__(definition['name'])
+        self._definition = dict(
+            (key, value) for key, value in definition.iteritems()
+            if key in DEFINITION_KEYS)
+
+    def _to_alias_dict(self):
+        return self._definition
+
 
 class InterfaceAlias(_Alias):
     def __init__(self, alias_name, dev, port):
@@ -66,14 +109,20 @@ class VlanInterfaceAlias(InterfaceAlias):
         Keyword arguments:
         @param {str} dev: The name of the target device for the alias
         @param {str} port: The name of the device port for the alias
-        @param {list} vlans: All vlans covered by this alias. Each
-        element should be a string. Can also accept ranges. E.g.,
-        "1-5".
+        @param {list or vlan_set.VlanSet} vlans: All vlans covered by
+        this alias. Each element should be a string. Can also accept
+        ranges. E.g., "1-5". A VlanSet is uploaded as its most compact
+        list of ranges.
+        @param {bool} collapse: Upload a list of vlans as its most
+        compact list of ranges too, e.g., ["1", "2-5"] as ["1-5"]
         '''
 
         vlans = kwargs.get('vlans')
         self._vlans = []
-        if vlans is not None:
+        if isinstance(vlans, VlanSet) or (vlans is not None and
+                                          kwargs.get('collapse', False)):
+            self._vlans = VlanSet(vlans).to_strings()
+        elif vlans is not None:
             self._vlans = list(vlans)
         dev = kwargs.get('dev')
         port = kwargs.get('port')
@@ -92,6 +141,12 @@ class VlanInterfaceAlias(InterfaceAlias):
             d['vlanIds'] = list(self._vlans)
         return d
 
+    def get_vlan_set(self):
+        '''
+        @return {vlan_set.VlanSet}
+        '''
+        return VlanSet(self._vlans)
+
 
 class TrafficAlias(_Alias):
     def __init__(self, alias_name, traffic_dict):
@@ -110,14 +165,25 @@ class TrafficAlias(_Alias):
             "values": self._traffic_dict
         }
 
+    def get_prefix_set(self):
+        '''
+        @return {prefix_set.PrefixSet}: Addresses matched by the
+        'ip_addr' values of the alias
+        '''
+        return PrefixSet(self._traffic_dict.get('ip_addr', ()))
+
 
 class IpV4TrafficAlias(TrafficAlias):
-    def __init__(self, alias_name, ipv4_addr_list):
+    def __init__(self, alias_name, ipv4_addr_list, collapse=False):
         '''
         @param {str} alias_name: The name of the alias to upload
         @param {list} ipv4_addr_list: Each element is a string containing
         an IPv4 address or subnet.
+        @param {bool} collapse: Replace the list by its minimal CIDR
+        cover, e.g., adjacent subnets by their common supernet
         '''
+        if collapse:
+            ipv4_addr_list = PrefixSet(ipv4_addr_list).to_list()
         traffic_dict = {
             'eth_type': ['0x800'],
             'ip_addr': ipv4_addr_list
@@ -126,12 +192,16 @@ class IpV4TrafficAlias(TrafficAlias):
 
 
 class IpV6TrafficAlias(TrafficAlias):
-    def __init__(self, alias_name, ipv6_addr_list):
+    def __init__(self, alias_name, ipv6_addr_list, collapse=False):
         '''
         @param {str} alias_name: The name of the alias to upload
         @param {list} ipv6_addr_list: Each element is a string
         containing an IPv6 address or subnet.
+        @param {bool} collapse: Replace the list by its minimal CIDR
+        cover, e.g., adjacent subnets by their common supernet
         '''
+        if collapse:
+            ipv6_addr_list = PrefixSet(ipv6_addr_list).to_list()
         traffic_dict = {
             'eth_type': ['0x86dd'],
             'ip_addr': ipv6_addr_list
@@ -143,27 +213,93 @@ class VlanTrafficAlias(TrafficAlias):
     def __init__(self, alias_name, vlan_ids_list):
         '''
         @param {str} alias_name
-        @param {str[]} vlan_ids_list
+        @param {str[] or vlan_set.VlanSet} vlan_ids_list: A VlanSet is
+        expanded to one string per VLAN ID
         '''
+        if isinstance(vlan_ids_list, VlanSet):
+            vlan_ids_list = [str(v) for v in vlan_ids_list]
         traffic_dict = {
             'vlan_vid': list(vlan_ids_list)
         }
         super(VlanTrafficAlias, self).__init__(alias_name, traffic_dict)
 
+    def get_vlan_set(self):
+        '''
+        @return {vlan_set.VlanSet}
+        '''
+        return VlanSet(self._traffic_dict['vlan_vid'])
+
 
 class HostAlias(_Alias):
-    def __init__(self, alias_name, hosts_list):
+    def __init__(self, alias_name, hosts_list, collapse=False):
         '''
         @param {str} alias_name: The name of the alias
         @param {list} hosts_list: Each element is a string
         corresponding to a host name
+        @param {bool} collapse: Replace the IP addresses and subnets of
+        the list by their minimal CIDR cover. Other entries are kept.
         '''
         super(HostAlias, self).__init__(alias_name)
+        if collapse:
+            hosts_list = collapse_prefixes(hosts_list)
         self._hosts_list = hosts_list
 
+    def get_prefix_set(self):
+        '''
+        @return {prefix_set.PrefixSet}: IP addresses and subnets of the
+        alias. Host names and MAC addresses are not included.
+        '''
+        return PrefixSet(h for h in self._hosts_list
+                         if is_prefix(h))
+
     def _to_alias_dict(self):
         return {
             'type': 'HOSTS',
             'name': self.name,
             'values': self._hosts_list
         }
+
+
+class AliasSyncSummary(object):
+    """Outcome of Fwd.sync_aliases
+    """
+
+    def __init__(self, created, updated, unchanged, failures):
+        """
+        @param {str[]} created: Names of aliases new to the snapshot
+        @param {str[]} updated: Names of aliases whose definition changed
+        @param {str[]} unchanged: Names of aliases already up to date
+        @param {concurrency.BatchResult[]} failures: Results of the
+        aliases that failed to upload, carrying their exceptions
+        """
+        self._created = created
+        self._updated = updated
+        self._unchanged = unchanged
+        self._failures = failures
+
+    def get_created(self):
+        return list(self._created)
+
+    def get_updated(self):
+        return list(self._updated)
+
+    def get_unchanged(self):
+        return list(self._unchanged)
+
+    def get_failures(self):
+        return list(self._failures)
+
+    def get_counts(self):
+        """
+        @return {dict}: Number of aliases by outcome: 'created',
+        'updated', 'unchanged' and 'failed'
+        """
+        return {
+            'created': len(self._created),
+            'updated': len(self._updated),
+            'unchanged': len(self._unchanged),
+            'failed': len(self._failures),
+        }
+
+    def is_success(self):
+        return not self._failures
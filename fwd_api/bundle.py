@@ -0,0 +1,186 @@
+'''
+Intent bundles: a set of aliases and checks that can be saved to a
+file and applied to many snapshots.
+
+    bundle = IntentBundle(aliases, checks)
+    with open('intent.json', 'w') as f:
+        f.write(bundle.to_json())
+    ...
+    bundle = IntentBundle.from_json(open('intent.json').read())
+    results = apply_bundle(fwd, bundle, snapshot_ids)
+
+Aliases are serialized and applied before the checks, since checks may
+reference them through alias filters such as HostAliasFilter and
+PacketAliasFilter.
+'''
+
+import json
+
+from alias import RawAlias
+from check import RawCheck
+from concurrency import DEFAULT_RETRIES, run_concurrently_ordered
+from validation import check_batch
+
+FORMAT_VERSION = 1
+
+# Default number of snapshots a bundle is applied to at once, and of
+# requests in flight per snapshot
+DEFAULT_SNAPSHOT_CONCURRENCY = 4
+DEFAULT_PER_SNAPSHOT_CONCURRENCY = 2
+
+_ALIAS_FILTER_TYPES = frozenset(['HostAliasFilter', 'DeviceAliasFilter',
+                                 'InterfaceAliasFilter', 'PacketAliasFilter'])
+
+
+def _collect_alias_names(value, names):
+    if isinstance(value, dict):
+        if value.get('type') in _ALIAS_FILTER_TYPES:
+            names.add(value.get('value'))
+        for v in value.itervalues():
+            _collect_alias_names(v, names)
+    elif isinstance(value, list):
+        for v in value:
+            _collect_alias_names(v, names)
+
+
+def referenced_aliases(check):
+    '''
+    @param {check.Check} check
+    @return {set}: Names of the aliases referenced by the check's filters
+    '''
+    names = set()
+    _collect_alias_names(check.to_check_dict(), names)
+    return names
+
+
+class IntentBundle(object):
+    """Aliases and the checks that may reference them
+    """
+
+    def __init__(self, aliases=(), checks=()):
+        """
+        @param {alias._Alias[]} aliases
+        @param {check.Check[]} checks
+        """
+        self._aliases = list(aliases)
+        self._checks = list(checks)
+
+    def get_aliases(self):
+        return list(self._aliases)
+
+    def get_checks(self):
+        return list(self._checks)
+
+    def get_missing_aliases(self):
+        """
+        @return {str[]}: Sorted names of aliases referenced by checks but
+        not in the bundle. Applying the bundle only works on snapshots
+        that already have them.
+        """
+        names = set()
+        for check in self._checks:
+            names |= referenced_aliases(check)
+        return sorted(names - set(a.get_name() for a in self._aliases))
+
+    def validate(self):
+        """Raise a validation.ValidationError listing every problem of
+        the bundle's aliases and checks, if any
+        """
+        check_batch(self._aliases + self._checks)
+
+    def to_json(self):
+        """
+        @return {str}: Serialized bundle, aliases first
+        """
+        return json.dumps({
+            'version': FORMAT_VERSION,
+            'aliases': [a._to_alias_dict() for a in self._aliases],
+            'checks': [c.to_check_dict() for c in self._checks],
+        }, indent=2, sort_keys=True)
+
+    @classmethod
+    def from_json(cls, bundle_json):
+        """
+        @param {str} bundle_json: Output of to_json
+        @return {IntentBundle}: With RawAlias and RawCheck objects
+        """
+        d = json.loads(bundle_json)
+        if d.get('version') != FORMAT_VERSION:
+            raise ValueError('Unsupported bundle version %r' %
+                             d.get('version'))
+        return cls([RawAlias(a) for a in d.get('aliases', [])],
+                   [RawCheck(c) for c in d.get('checks', [])])
+
+
+class BundleResult(object):
+    """Outcome of applying a bundle to one snapshot
+    """
+
+    def __init__(self, snapshot_id, alias_summary, check_summary):
+        """
+        @param {int} snapshot_id
+        @param {alias.AliasSyncSummary} alias_summary
+        @param {check.CheckBatchSummary} check_summary
+        """
+        self._snapshot_id = snapshot_id
+        self._alias_summary = alias_summary
+        self._check_summary = check_summary
+
+    def get_snapshot_id(self):
+        return self._snapshot_id
+
+    def get_alias_summary(self):
+        return self._alias_summary
+
+    def get_check_summary(self):
+        return self._check_summary
+
+    def is_success(self):
+        return (self._alias_summary.is_success() and
+                self._check_summary.is_success())
+
+
+def apply_bundle(fwd, bundle, snapshot_ids,
+                 max_concurrency=DEFAULT_SNAPSHOT_CONCURRENCY,
+                 per_snapshot_concurrency=DEFAULT_PER_SNAPSHOT_CONCURRENCY,
+                 retries=DEFAULT_RETRIES, verbose=False):
+    '''Apply a bundle to many snapshots in parallel
+
+    The bundle is validated once, up front. In each snapshot, aliases
+    are synced with Fwd.sync_aliases, then checks that do not exist yet
+    are uploaded. If an alias fails to sync, no check is uploaded to
+    that snapshot.
+
+    @param {Fwd} fwd
+    @param {IntentBundle} bundle
+    @param {int[]} snapshot_ids
+    @param {int} max_concurrency: Maximum number of snapshots updated at
+    once. Up to max_concurrency * per_snapshot_concurrency requests are
+    in flight.
+    @param {int} per_snapshot_concurrency: Maximum number of requests
+    in flight per snapshot
+    @param {int} retries: Retries per item of transient failures
+    @return {concurrency.BatchResult[]}: One per snapshot, in
+    snapshot_ids order, whose result is a BundleResult
+    '''
+    bundle.validate()
+    aliases = bundle.get_aliases()
+    checks = bundle.get_checks()
+
+    def apply_to_snapshot(snapshot_id):
+        alias_summary = fwd.sync_aliases(
+            aliases, snapshot_id, per_snapshot_concurrency, retries,
+            validate=False, verbose=verbose)
+        if not alias_summary.is_success():
+            raise Exception(
+                'Not uploading checks to snapshot %d: failed to sync '
+                'aliases %s' % (snapshot_id, ', '.join(
+                    f.get_request().get_name()
+                    for f in alias_summary.get_failures())))
+        check_summary = fwd.upload_checks(
+            checks, snapshot_id, per_snapshot_concurrency, retries,
+            skip_existing=True, validate=False, verbose=verbose)
+        return BundleResult(snapshot_id, alias_summary, check_summary)
+
+    return run_concurrently_ordered(apply_to_snapshot, snapshot_ids,
+                                    max_concurrency=max_concurrency)
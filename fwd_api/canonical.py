@@ -0,0 +1,89 @@
+'''
+Canonical serialization and stable fingerprints of queries, filters
+and checks.
+
+Two objects that the server treats identically serialize to the same
+string: object keys are sorted and lists whose order carries no
+meaning (the headers of an EndpointFilter, the flow types of a search)
+are sorted as well.
+'''
+
+import hashlib
+import json
+
+# Keys whose list values are conjunctions or sets rather than sequences
+_UNORDERED_LIST_KEYS = frozenset(['headers', 'flowTypes'])
+
+
+def _default(obj):
+    # Objects such as fwd_filter.Placeholder that are not json-izable
+    # but have a canonical form
+    if hasattr(obj, '_canonical_form'):
+        return obj._canonical_form()
+    raise TypeError('%r is not JSON serializable' % obj)
+
+
+_ENCODER = json.JSONEncoder(sort_keys=True, separators=(',', ':'),
+                            default=_default)
+
+
+def _to_json_dict(obj):
+    '''Convert supported objects to their json-izable form
+    '''
+    if hasattr(obj, 'build_query'):
+        return obj.build_query()
+    if hasattr(obj, 'to_check_dict'):
+        return obj.to_check_dict()
+    if hasattr(obj, 'as_dict'):
+        return obj.as_dict()
+    return obj
+
+
+def canonicalize(value):
+    '''
+    @param value: json-izable value
+    @return: Equivalent value with unordered lists sorted
+    '''
+    if isinstance(value, dict):
+        result = {}
+        for key, val in value.iteritems():
+            val = canonicalize(val)
+            if key in _UNORDERED_LIST_KEYS and isinstance(val, list):
+                # Sorted by serialization, dropping duplicates
+                by_json = dict((_ENCODER.encode(v), v) for v in val)
+                val = [by_json[k] for k in sorted(by_json)]
+            result[key] = val
+        return result
+    if isinstance(value, (list, tuple)):
+        return [canonicalize(v) for v in value]
+    return value
+
+
+def canonical_json(obj):
+    '''
+    @param obj: A search.SearchBuilder, search.Context, fwd_filter.Filter,
+    check.Check or json-izable value
+    @return {str}: Canonical JSON serialization of obj
+    '''
+    if hasattr(obj, 'as_json'):
+        # Filters cache their canonical serialization
+        return obj.as_json()
+    return _ENCODER.encode(canonicalize(_to_json_dict(obj)))
+
+
+def fingerprint_json(json_str):
+    '''
+    @param {str} json_str: Output of canonical_json
+    @return {str}: Hex digest identifying json_str
+    '''
+    if isinstance(json_str, unicode):
+        json_str = json_str.encode('utf-8')
+    return hashlib.sha1(json_str).hexdigest()
+
+
+def fingerprint(obj):
+    '''
+    @param obj: See canonical_json
+    @return {str}: Stable hex digest of obj's canonical serialization
+    '''
+    return fingerprint_json(canonical_json(obj))
@@ -5,6 +5,28 @@ import json
 import subprocess
 import abc
 
+import canonical
+from vlan_set import VlanSet
+
+
+# Top-level keys of a check definition set by clients. Other keys of
+# the definitions returned by the server, e.g., ids, are ignored by
+# definition hashes.
+DEFINITION_KEYS = frozenset(['checkType', 'name', 'filters', 'noiseTypes',
+                             'predefinedCheckType', 'params', 'query'])
+
+
+def definition_hash(definition):
+    '''
+    @param {dict} definition: Check definition, e.g., the output of
+    Check.to_check_dict or the 'definition' of a check returned by the
+    server
+    @return {str}: Hex digest identifying the definition
+    '''
+    return canonical.fingerprint(dict(
+        (key, value) for key, value in definition.iteritems()
+        if key in DEFINITION_KEYS))
+
 
 class Check(object):
     '''Base class for all Forward checks.
@@ -17,6 +39,17 @@ class Check(object):
         '''Return json-izable dictionary representation of check
         '''
 
+    def to_check_json(self):
+        '''Return canonical JSON serialization of check
+        '''
+        return canonical.canonical_json(self.to_check_dict())
+
+    def get_definition_hash(self):
+        '''Return hex digest identifying the check definition; see
+        definition_hash
+        '''
+        return definition_hash(self.to_check_dict())
+
     @staticmethod
     def get_upload_url_suffix_str(snapshot_id):
         return '/api/snapshots/%(snapshot_id)d/checks' % {
@@ -31,6 +64,30 @@ class Check(object):
         }
 
 
+class RawCheck(Check):
+    '''Check given by its definition, e.g., as returned by the server
+    '''
+
+    def __init__(self, definition):
+        '''
+        @param {dict} definition: Keys outside DEFINITION_KEYS are
+        dropped
+        '''
+        self._definition = dict(
+            (key, value) for key, value in definition.iteritems()
+            if key in DEFINITION_KEYS)
+
+    @classmethod
+    def from_result(cls, network_check_result):
+        '''
+        @param {NetworkCheckResult} network_check_result
+        '''
+        return cls(network_check_result.get_response()['definition'])
+
+    def to_check_dict(self):
+        return self._definition
+
+
 class _StructuredCheckBase(Check):
 
     def __init__(self, from_clause, to_clause, check_type, name=''):
@@ -49,18 +106,37 @@ class _StructuredCheckBase(Check):
             raise ValueError('Cannot create check base with empty ' +
                              'from and to clauses')
 
+    def _get_clauses(self):
+        '''
+        @return {list}: (key, filter) of the clauses that are set
+        '''
+        return [(key, clause)
+                for key, clause in (('from', self._from_clause),
+                                    ('to', self._to_clause))
+                if clause]
+
     def to_check_dict(self):
-        result = {
+        return {
             'checkType': self._check_type,
             'name': self._name,
-            'filters': {},
+            'filters': dict((key, clause.as_dict())
+                            for key, clause in self._get_clauses()),
             'noiseTypes': [],
         }
-        if self._from_clause:
-            result['filters']['from'] = self._from_clause.as_dict()
-        if self._to_clause:
-            result['filters']['to'] = self._to_clause.as_dict()
-        return result
+
+    def to_check_json(self):
+        # Splices in the cached JSON of the filters rather than
+        # serializing them again. Keys are in canonical (sorted) order.
+        filters_json = ','.join(
+            '%s:%s' % (canonical.canonical_json(key), clause.as_json())
+            for key, clause in self._get_clauses())
+        return '{"checkType":%s,"filters":{%s},"name":%s,"noiseTypes":[]}' % (
+            canonical.canonical_json(self._check_type), filters_json,
+            canonical.canonical_json(self._name))
+
+    def get_definition_hash(self):
+        # Every key of the definition is in DEFINITION_KEYS
+        return canonical.fingerprint_json(self.to_check_json())
 
     def get_from_filters(self):
         return self._from_clause.as_dict()
@@ -154,29 +230,39 @@ class NetworkCheckResult(object):
     """Python-ized representation of server's json returned from call to
     post check endpoint.
     """
-    def __init__(self, check_id, name, check_type, status, raw_json):
+    def __init__(self, check_id, name, check_type, status, raw_json,
+                 definition_hash=None):
         """
         @param {long} check id
         @param {string} check name, may be None
         @param {NetworkCheckType} check type
         @param {NetworkCheckStatus} status
-        @param {string} Raw json received from Forward server
+        @param {string} Raw json received from Forward server, may be None
+        @param {str} definition_hash [optional]: Precomputed hash of the
+        definition in raw_json
         """
         self._check_id = check_id
         self._name = name
         self._check_type = check_type
         self._status = status
         self._raw_json = raw_json
+        self._definition_hash = definition_hash
 
     @classmethod
-    def from_json(cls, json_response):
+    def from_json(cls, json_response, keep_raw_json=True,
+                  hash_definition=False):
         """
         @param {dict} json_response
+        @param {bool} keep_raw_json: If False, keep only the id, name,
+        type and status of the check, and get_response returns None
+        @param {bool} hash_definition: Compute the definition hash now,
+        so that get_definition_hash works without the raw json
         """
         check_id = None
         name = None
         check_type = None
         status = None
+        hash_ = None
         if "id" in json_response:
             check_id = long(json_response['id'])
         if "definition" in json_response:
@@ -184,9 +270,13 @@ class NetworkCheckResult(object):
                 name = json_response['definition']['name']
             if "checkType" in json_response['definition']:
                 check_type = NetworkCheckType.from_string(json_response['definition']['checkType'])
+            if hash_definition:
+                hash_ = definition_hash(json_response['definition'])
         if "status" in json_response:
             status = NetworkCheckStatus.from_string(json_response['status'])
-        return NetworkCheckResult(check_id, name, check_type, status, json_response)
+        return NetworkCheckResult(check_id, name, check_type, status,
+                                  json_response if keep_raw_json else None,
+                                  hash_)
 
     def get_check_id(self):
         return self._check_id
@@ -200,6 +290,18 @@ class NetworkCheckResult(object):
     def get_status(self):
         return self._status
 
+    def get_definition_hash(self):
+        """
+        @return {str}: Hash of the check definition, comparable to
+        Check.get_definition_hash, or None if the response has no
+        definition or was not kept and the hash was not precomputed
+        """
+        if self._definition_hash is not None:
+            return self._definition_hash
+        if self._raw_json is None or 'definition' not in self._raw_json:
+            return None
+        return definition_hash(self._raw_json['definition'])
+
     def get_response(self):
         """
         WARNING:
@@ -209,6 +311,72 @@ class NetworkCheckResult(object):
         return self._raw_json
 
 
+class CheckBatchSummary(object):
+    """Outcome of a bulk check operation, e.g., Fwd.upload_checks
+    """
+
+    def __init__(self, batch_results, skipped=()):
+        """
+        @param {concurrency.BatchResult[]} batch_results: One per item, in
+        item order
+        @param {int[]} skipped: Indices of items that needed no request,
+        e.g., checks that already existed
+        """
+        self._batch_results = list(batch_results)
+        self._skipped = sorted(skipped)
+        self._results_by_status = {}
+        for batch_result in self._batch_results:
+            result = batch_result.get_result()
+            if batch_result.is_success() and \
+                    isinstance(result, NetworkCheckResult):
+                self._results_by_status.setdefault(
+                    result.get_status(), []).append(result)
+
+    def get_batch_results(self):
+        """
+        @return {concurrency.BatchResult[]}: One per item, in item order
+        """
+        return list(self._batch_results)
+
+    def get_results_by_status(self):
+        """
+        @return {dict}: Lists of NetworkCheckResult by NetworkCheckStatus
+        """
+        return dict((status, list(results)) for status, results
+                    in self._results_by_status.iteritems())
+
+    def get_results(self, status):
+        """
+        @param {NetworkCheckStatus} status
+        @return {NetworkCheckResult[]}
+        """
+        return list(self._results_by_status.get(status, []))
+
+    def get_succeeded(self):
+        """
+        @return {list}: Items that succeeded, e.g., uploaded checks or
+        deleted check ids
+        """
+        return [r.get_request() for r in self._batch_results
+                if r.is_success()]
+
+    def get_skipped(self):
+        """
+        @return {list}: Items that needed no request
+        """
+        return [self._batch_results[i].get_request() for i in self._skipped]
+
+    def get_failures(self):
+        """
+        @return {concurrency.BatchResult[]}: Results of the failed items,
+        carrying their exceptions
+        """
+        return [r for r in self._batch_results if not r.is_success()]
+
+    def is_success(self):
+        return all(r.is_success() for r in self._batch_results)
+
+
 class VlanExistenceCheck(Check):
     """
     Checks that a list of VLANs are defined on a list of interfaces. And interfaces where VLANs configured must be edge
@@ -217,10 +385,13 @@ class VlanExistenceCheck(Check):
     def __init__(self, interfaces, vlans):
         """
         @param {list} interfaces: A list of DeviceInterface objects containing interface names.
-        @param {list} vlans: A list of integer VLANs.
+        @param {list} vlans: A list of integer VLANs, or a VlanSet which
+        is expanded to such a list.
         """
         super(VlanExistenceCheck, self).__init__()
         self._interfaces = interfaces
+        if isinstance(vlans, VlanSet):
+            vlans = vlans.to_list()
         self._vlans = vlans
 
     def to_check_dict(self):
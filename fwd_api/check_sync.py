@@ -0,0 +1,329 @@
+'''
+Incremental sync of check statuses into a local store.
+
+    sync = CheckStatusSync(fwd, SqliteCheckStore('checks.db'))
+    sync.add_listener(on_change)
+    sync.refresh_all(snapshot_ids)      # e.g., every minute
+    sync.get_store().count_by_status(snapshot_id)
+
+Each refresh fetches the checks of a snapshot, reduces them to rows of
+(check type, status, definition hash) and writes only the rows that
+changed, reporting every change as a CheckChange.
+'''
+
+import abc
+import sqlite3
+import threading
+
+from check import definition_hash
+from concurrency import DEFAULT_MAX_CONCURRENCY, run_concurrently_ordered
+
+
+class CheckRow(object):
+    """Locally stored state of a check
+    """
+
+    def __init__(self, snapshot_id, check_id, check_type, status,
+                 definition_hash):
+        """
+        @param {int} snapshot_id
+        @param {int} check_id
+        @param {str} check_type: A NetworkCheckType value
+        @param {str} status: Status string reported by the server, e.g.,
+        "PASS"
+        @param {str} definition_hash: See check.definition_hash
+        """
+        self._snapshot_id = snapshot_id
+        self._check_id = check_id
+        self._check_type = check_type
+        self._status = status
+        self._definition_hash = definition_hash
+
+    def get_snapshot_id(self):
+        return self._snapshot_id
+
+    def get_check_id(self):
+        return self._check_id
+
+    def get_check_type(self):
+        return self._check_type
+
+    def get_status(self):
+        return self._status
+
+    def get_definition_hash(self):
+        return self._definition_hash
+
+    def __eq__(self, other):
+        return (isinstance(other, CheckRow) and
+                self.__dict__ == other.__dict__)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'CheckRow(%r, %r, %r, %r, %r)' % (
+            self._snapshot_id, self._check_id, self._check_type,
+            self._status, self._definition_hash)
+
+
+class CheckChange(object):
+    """Change of a stored check found by a refresh
+    """
+    ADDED = 'ADDED'
+    UPDATED = 'UPDATED'
+    REMOVED = 'REMOVED'
+
+    def __init__(self, kind, old_row, new_row):
+        """
+        @param {str} kind: ADDED, UPDATED or REMOVED
+        @param {CheckRow} old_row: None if the check was added
+        @param {CheckRow} new_row: None if the check was removed
+        """
+        self._kind = kind
+        self._old_row = old_row
+        self._new_row = new_row
+
+    def get_kind(self):
+        return self._kind
+
+    def get_old_row(self):
+        return self._old_row
+
+    def get_new_row(self):
+        return self._new_row
+
+    def get_check_id(self):
+        return (self._new_row or self._old_row).get_check_id()
+
+
+class _CheckStore(object):
+    '''Base class for stores of CheckRow-s
+
+    Stores hold rows as (check_type, status, definition_hash) tuples by
+    snapshot id and check id.
+    '''
+
+    __metaclass__ = abc.ABCMeta
+
+    @abc.abstractmethod
+    def get_rows(self, snapshot_id):
+        '''
+        @return {dict}: Row tuples by check id
+        '''
+
+    @abc.abstractmethod
+    def apply(self, snapshot_id, upserts, deletes):
+        '''
+        @param {dict} upserts: Row tuples by check id, to insert or
+        replace
+        @param {int[]} deletes: Ids of checks to remove
+        '''
+
+    @abc.abstractmethod
+    def get_snapshot_ids(self):
+        '''
+        @return {int[]}: Sorted ids of snapshots with stored checks
+        '''
+
+    def get_checks(self, snapshot_id, status=None):
+        '''
+        @param {int} snapshot_id
+        @param {str} status [optional]: Only return checks with this
+        status
+        @return {CheckRow[]}: Sorted by check id
+        '''
+        rows = self.get_rows(snapshot_id)
+        return [CheckRow(snapshot_id, check_id, *rows[check_id])
+                for check_id in sorted(rows)
+                if status is None or rows[check_id][1] == status]
+
+    def count_by_status(self, snapshot_id):
+        '''
+        @return {dict}: Number of checks by status
+        '''
+        counts = {}
+        for _, status, _ in self.get_rows(snapshot_id).itervalues():
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+
+class MemoryCheckStore(_CheckStore):
+    '''Check store in a dictionary of tuples
+    '''
+
+    def __init__(self):
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def get_rows(self, snapshot_id):
+        with self._lock:
+            return dict(self._rows.get(snapshot_id, {}))
+
+    def apply(self, snapshot_id, upserts, deletes):
+        with self._lock:
+            rows = self._rows.setdefault(snapshot_id, {})
+            rows.update(upserts)
+            for check_id in deletes:
+                rows.pop(check_id, None)
+            if not rows:
+                del self._rows[snapshot_id]
+
+    def get_snapshot_ids(self):
+        with self._lock:
+            return sorted(self._rows)
+
+
+class SqliteCheckStore(_CheckStore):
+    '''Check store in an SQLite database, which other processes can
+    query
+    '''
+
+    def __init__(self, path=':memory:'):
+        '''
+        @param {str} path: Database file, created if needed
+        '''
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS checks ('
+                'snapshot_id INTEGER NOT NULL, '
+                'check_id INTEGER NOT NULL, '
+                'check_type TEXT, '
+                'status TEXT, '
+                'definition_hash TEXT, '
+                'PRIMARY KEY (snapshot_id, check_id))')
+
+    def get_rows(self, snapshot_id):
+        with self._lock:
+            cursor = self._conn.execute(
+                'SELECT check_id, check_type, status, definition_hash '
+                'FROM checks WHERE snapshot_id = ?', (snapshot_id,))
+            return dict((row[0], tuple(row[1:])) for row in cursor)
+
+    def apply(self, snapshot_id, upserts, deletes):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO checks VALUES (?, ?, ?, ?, ?)',
+                [(snapshot_id, check_id) + tuple(row)
+                 for check_id, row in upserts.iteritems()])
+            self._conn.executemany(
+                'DELETE FROM checks WHERE snapshot_id = ? AND check_id = ?',
+                [(snapshot_id, check_id) for check_id in deletes])
+
+    def get_snapshot_ids(self):
+        with self._lock:
+            cursor = self._conn.execute(
+                'SELECT DISTINCT snapshot_id FROM checks ORDER BY 1')
+            return [row[0] for row in cursor]
+
+    def count_by_status(self, snapshot_id):
+        with self._lock:
+            cursor = self._conn.execute(
+                'SELECT status, COUNT(*) FROM checks WHERE snapshot_id = ? '
+                'GROUP BY status', (snapshot_id,))
+            return dict(cursor.fetchall())
+
+    def close(self):
+        self._conn.close()
+
+
+def _row_from_json(check_json):
+    '''
+    @param {dict} check_json: Check as returned by the server
+    @return {tuple}: (check_id, row tuple)
+    '''
+    definition = check_json.get('definition', {})
+    return (long(check_json['id']),
+            (definition.get('checkType'), check_json.get('status'),
+             definition_hash(definition)))
+
+
+class CheckStatusSync(object):
+    """Keeps a check store up to date with the server
+    """
+
+    def __init__(self, fwd, store=None):
+        """
+        @param {Fwd} fwd
+        @param {_CheckStore} store [optional]: A MemoryCheckStore by
+        default
+        """
+        self._fwd = fwd
+        self._store = store if store is not None else MemoryCheckStore()
+        self._listeners = []
+
+    def get_store(self):
+        return self._store
+
+    def add_listener(self, listener):
+        """
+        @param {function} listener: Called with each CheckChange
+        """
+        self._listeners.append(listener)
+
+    def _fetch_rows(self, snapshot_id, verbose=False):
+        return dict(_row_from_json(c)
+                    for c in self._fwd.iter_checks_json(snapshot_id, verbose))
+
+    def _apply(self, snapshot_id, rows):
+        old_rows = self._store.get_rows(snapshot_id)
+        changes = []
+        upserts = {}
+        for check_id, row in rows.iteritems():
+            old_row = old_rows.get(check_id)
+            if old_row == row:
+                continue
+            upserts[check_id] = row
+            new_row = CheckRow(snapshot_id, check_id, *row)
+            if old_row is None:
+                changes.append(CheckChange(CheckChange.ADDED, None, new_row))
+            else:
+                changes.append(CheckChange(
+                    CheckChange.UPDATED,
+                    CheckRow(snapshot_id, check_id, *old_row), new_row))
+        deletes = [check_id for check_id in old_rows if check_id not in rows]
+        for check_id in deletes:
+            changes.append(CheckChange(
+                CheckChange.REMOVED,
+                CheckRow(snapshot_id, check_id, *old_rows[check_id]), None))
+        if upserts or deletes:
+            self._store.apply(snapshot_id, upserts, deletes)
+        changes.sort(key=lambda c: c.get_check_id())
+        for change in changes:
+            for listener in self._listeners:
+                listener(change)
+        return changes
+
+    def refresh(self, snapshot_id, verbose=False):
+        """Sync the checks of one snapshot
+
+        @param {int} snapshot_id
+        @return {CheckChange[]}: Changes applied to the store, by check
+        id
+        """
+        return self._apply(snapshot_id,
+                           self._fetch_rows(snapshot_id, verbose))
+
+    def refresh_all(self, snapshot_ids,
+                    max_concurrency=DEFAULT_MAX_CONCURRENCY, verbose=False):
+        """Sync the checks of many snapshots, fetching them concurrently
+
+        Snapshots whose checks cannot be fetched are left unchanged.
+
+        @param {int[]} snapshot_ids
+        @return {dict}: CheckChange-s by snapshot id, or the exception
+        raised fetching the checks of the snapshot
+        """
+        result = {}
+        for batch_result in run_concurrently_ordered(
+                lambda snapshot_id: self._fetch_rows(snapshot_id, verbose),
+                snapshot_ids, max_concurrency=max_concurrency):
+            snapshot_id = batch_result.get_request()
+            if batch_result.is_success():
+                result[snapshot_id] = self._apply(snapshot_id,
+                                                  batch_result.get_result())
+            else:
+                result[snapshot_id] = batch_result.get_error()
+        return result
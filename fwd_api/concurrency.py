@@ -0,0 +1,260 @@
+'''
+Helpers for running many independent API calls on a bounded pool of
+threads.
+'''
+
+import Queue
+import sys
+import threading
+import time
+
+# Default number of requests in flight at once. Kept below the default
+# connection pool size of HTTPApi so that threads do not wait on
+# connections.
+DEFAULT_MAX_CONCURRENCY = 8
+
+# Default initial delay, in seconds, before retrying a failed call.
+# Doubles after every attempt.
+DEFAULT_RETRY_DELAY = 0.5
+
+# Default number of retries of transient failures in bulk operations
+DEFAULT_RETRIES = 2
+
+
+class BatchResult(object):
+    """Outcome of one item of a batch operation
+    """
+
+    def __init__(self, index, request, result=None, error=None):
+        """
+        @param {int} index: Position of the item in the batch
+        @param request: The batch item, e.g., a SearchBuilder
+        @param result: Value returned for the item, if it succeeded
+        @param {Exception} error: Raised for the item, if it failed
+        """
+        self._index = index
+        self._request = request
+        self._result = result
+        self._error = error
+
+    def get_index(self):
+        return self._index
+
+    def get_request(self):
+        return self._request
+
+    def get_result(self):
+        return self._result
+
+    def get_error(self):
+        return self._error
+
+    def is_success(self):
+        return self._error is None
+
+
+def call_with_retries(func, args=(), retries=0, retry_if=None,
+                      retry_delay=DEFAULT_RETRY_DELAY):
+    '''
+    @param {function} func
+    @param {tuple} args: Positional arguments for func
+    @param {int} retries: Number of additional attempts after a failure
+    @param {function} retry_if [optional]: Takes the raised exception and
+    returns True if the call should be retried. By default every
+    exception is retried.
+    @param {float} retry_delay: Seconds before the first retry
+    @return: Return value of func
+    '''
+    attempt = 0
+    while True:
+        try:
+            return func(*args)
+        except Exception as e:
+            if attempt >= retries or (retry_if is not None and
+                                      not retry_if(e)):
+                raise
+            time.sleep(retry_delay * (2 ** attempt))
+            attempt += 1
+
+
+def run_concurrently(func, items, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                     retries=0, retry_if=None,
+                     retry_delay=DEFAULT_RETRY_DELAY):
+    '''Call func on every item using up to max_concurrency threads
+
+    Exceptions raised by func are captured per item instead of
+    aborting the other calls.
+
+    @param {function} func: Takes one item
+    @param {iterable} items
+    @param {int} max_concurrency: Maximum number of concurrent calls
+    @param {int} retries: See call_with_retries
+    @param {function} retry_if: See call_with_retries
+    @param {float} retry_delay: See call_with_retries
+    @return {generator}: Yields a BatchResult per item in completion
+    order
+    '''
+    if max_concurrency < 1:
+        raise ValueError('max_concurrency must be at least 1')
+    items = list(items)
+    if not items:
+        return
+    tasks = Queue.Queue()
+    for task in enumerate(items):
+        tasks.put(task)
+    results = Queue.Queue()
+    stopped = threading.Event()
+
+    def worker():
+        while not stopped.is_set():
+            try:
+                index, item = tasks.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                result = call_with_retries(func, (item,), retries, retry_if,
+                                           retry_delay)
+                results.put(BatchResult(index, item, result=result))
+            except Exception as e:
+                results.put(BatchResult(index, item, error=e))
+
+    for _ in range(min(max_concurrency, len(items))):
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+
+    try:
+        for _ in range(len(items)):
+            # A timeout keeps the wait interruptible by KeyboardInterrupt
+            while True:
+                try:
+                    batch_result = results.get(timeout=1)
+                    break
+                except Queue.Empty:
+                    pass
+            yield batch_result
+    finally:
+        # Lets workers exit early if the caller stops consuming results
+        stopped.set()
+
+
+def run_concurrently_ordered(func, items, **kwargs):
+    '''Like run_concurrently, but waits for every item to finish
+
+    @return {BatchResult[]}: One result per item, in item order
+    '''
+    results = list(run_concurrently(func, items, **kwargs))
+    results.sort(key=lambda r: r.get_index())
+    return results
+
+
+class _Call(object):
+    """Call shared by SingleFlight.do callers
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exc_info = None
+        self.expiry = None
+
+
+class SingleFlight(object):
+    """Coalesces concurrent calls with the same key into one
+
+    The first caller for a key runs the call; callers arriving while it
+    is in flight wait for it and get the same return value or exception.
+    With a ttl, successful results are also returned to callers arriving
+    within ttl seconds after the call completed. Expired results are
+    dropped as new keys are added, so memory stays bounded by the keys
+    used within about two ttls.
+    """
+
+    def __init__(self, ttl=0):
+        """
+        @param {float} ttl: Seconds during which completed results are
+        reused. Keep it short for resources that change.
+        """
+        self._ttl = ttl
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._calls_made = 0
+        self._calls_shared = 0
+        # Time after which _evict_expired next scans the calls
+        self._next_eviction = 0
+
+    def _evict_expired(self, now):
+        '''Drop completed calls whose results expired. Scans at most once
+        per ttl, so that adding keys stays amortized constant time.
+        Called with the lock held.
+        '''
+        if now < self._next_eviction:
+            return
+        for key, call in self._calls.items():
+            if call.done.is_set() and now >= call.expiry:
+                del self._calls[key]
+        self._next_eviction = now + self._ttl
+
+    def do(self, key, func, reuse=True):
+        """
+        @param key: Hashable identifier of the call, e.g., the URL of a
+        GET request
+        @param {function} func: Takes no arguments
+        @param {bool} reuse: If False, the result is only shared with
+        concurrent callers, never reused after the call completed, e.g.,
+        for resources that are polled
+        @return: Return value of func, possibly from another caller's call
+        """
+        with self._lock:
+            now = time.time()
+            call = self._calls.get(key)
+            if (call is not None and call.done.is_set() and
+                    (not reuse or now >= call.expiry)):
+                del self._calls[key]
+                call = None
+            is_owner = call is None
+            if is_owner:
+                self._evict_expired(now)
+                call = _Call()
+                self._calls[key] = call
+                self._calls_made += 1
+            else:
+                self._calls_shared += 1
+
+        if is_owner:
+            try:
+                call.result = func()
+            except:
+                # Also shared, so that waiters never hang
+                call.exc_info = sys.exc_info()
+            with self._lock:
+                call.expiry = time.time() + self._ttl
+                if ((call.exc_info is not None or self._ttl <= 0 or
+                     not reuse) and self._calls.get(key) is call):
+                    del self._calls[key]
+            call.done.set()
+        else:
+            call.done.wait()
+
+        if call.exc_info is not None:
+            raise call.exc_info[0], call.exc_info[1], call.exc_info[2]
+        return call.result
+
+    def forget(self, key):
+        """Let the next call with key run even if a result is reused or a
+        call is in flight
+        """
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def get_calls_made(self):
+        return self._calls_made
+
+    def get_calls_shared(self):
+        return self._calls_shared
+
+    def __len__(self):
+        '''
+        @return {int}: Number of calls in flight or kept for reuse
+        '''
+        return len(self._calls)
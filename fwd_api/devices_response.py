@@ -28,6 +28,12 @@ class DevicesResponse(object):
         @param {DeviceResponse[]} device_response_list
         """
         self._device_response_list = list(device_response_list)
+        # First device of each name and id, as found by a linear scan
+        self._by_name = {}
+        self._by_id = {}
+        for device_response in reversed(self._device_response_list):
+            self._by_name[device_response.get_name()] = device_response
+            self._by_id[device_response.get_id()] = device_response
 
     def get_device_response_list(self):
         return list(self._device_response_list)
@@ -36,10 +42,13 @@ class DevicesResponse(object):
         """
         @return {DeviceResponse or None} if device does not exist
         """
-        for device_response in self._device_response_list:
-            if device_response.get_name() == device_name:
-                return device_response
-        return None
+        return self._by_name.get(device_name)
+
+    def get_device_response_by_id(self, device_id):
+        """
+        @return {DeviceResponse or None} if device does not exist
+        """
+        return self._by_id.get(device_id)
 
     @classmethod
     def from_json(cls, json_list):
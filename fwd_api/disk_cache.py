@@ -0,0 +1,181 @@
+'''
+Persistent cache of snapshot data, shared by script runs.
+
+Devices, interfaces and flow search results of a snapshot never change
+once it is collected, so the response bodies can be kept on disk
+forever, evicting only to bound the size of the cache directory:
+
+    fwd = Fwd(url, username, password,
+              disk_cache=DiskCache(os.path.expanduser('~/.fwd_cache')))
+    fwd.get_devices(snapshot_id)   # Read from disk on later runs
+
+Entries are zlib-compressed response bodies in files named by the
+SHA-1 of (server, user, snapshot id, endpoint, canonical params), so
+several processes can share a directory without users seeing data
+they may not be allowed to. The least recently read entries are
+evicted first.
+'''
+
+import os
+import tempfile
+import threading
+import zlib
+
+from canonical import fingerprint
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+_SUFFIX = '.z'
+
+
+def make_key(server, username, snapshot_id, endpoint, params=None):
+    '''
+    @param {str} server: Base URL of the server
+    @param {str} username: User the response was sent to
+    @param {int} snapshot_id
+    @param {str} endpoint: URL suffix of the request, e.g.,
+    "/api/snapshots/1/devices/"
+    @param params [optional]: json-izable request parameters or body
+    @return {str}: Hex digest identifying the response
+    '''
+    return fingerprint([server.rstrip('/'), username, snapshot_id,
+                        endpoint, params])
+
+
+class DiskCache(object):
+    """Thread-safe directory of compressed response bodies, bounded by
+    their total compressed size
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES,
+                 compress_level=6):
+        """
+        @param {str} directory: Created if needed
+        @param {int} max_bytes: Upper bound on the total size of the
+        cache files
+        @param {int} compress_level: zlib compression level, 1 to 9
+        """
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._compress_level = compress_level
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._size_bytes = sum(size for _, _, size in self._list_entries())
+
+    def _path(self, key):
+        return os.path.join(self._directory, key + _SUFFIX)
+
+    def _list_entries(self):
+        '''
+        @return {list}: (mtime, path, size) of every cache file
+        '''
+        entries = []
+        for name in os.listdir(self._directory):
+            if not name.endswith(_SUFFIX):
+                continue
+            path = os.path.join(self._directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                # Evicted by another process
+                continue
+            entries.append((st.st_mtime, path, st.st_size))
+        return entries
+
+    def get(self, key):
+        """
+        @param {str} key: See make_key
+        @return {str}: Cached response body, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                body = zlib.decompress(f.read())
+        except (IOError, OSError, zlib.error):
+            with self._lock:
+                self._misses += 1
+            return None
+        try:
+            # Mark as most recently used
+            os.utime(path, None)
+        except OSError:
+            # E.g., a read-only directory shared by several users
+            pass
+        with self._lock:
+            self._hits += 1
+        return body
+
+    def put(self, key, body):
+        """
+        @param {str} key: See make_key
+        @param {str} body: Response body. Bodies that compress to more
+        than max_bytes are not cached, nor are bodies that cannot be
+        written, e.g., to a read-only or full directory.
+        """
+        data = zlib.compress(body, self._compress_level)
+        if len(data) > self._max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = None
+        try:
+            # Write then rename, so readers never see partial files
+            fd, tmp_path = tempfile.mkstemp(dir=self._directory,
+                                            suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            with self._lock:
+                try:
+                    old_size = os.path.getsize(path)
+                except OSError:
+                    old_size = 0
+                os.rename(tmp_path, path)
+                tmp_path = None
+                self._size_bytes += len(data) - old_size
+                if self._size_bytes > self._max_bytes:
+                    self._evict()
+        except (IOError, OSError):
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def _evict(self):
+        '''Remove the least recently used files until the cache fits in
+        max_bytes. Rescans the directory, which other processes may have
+        changed.
+        '''
+        entries = sorted(self._list_entries())
+        self._size_bytes = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if self._size_bytes <= self._max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._size_bytes -= size
+
+    def clear(self):
+        with self._lock:
+            for _, path, _ in self._list_entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size_bytes = 0
+
+    def get_size_bytes(self):
+        return self._size_bytes
+
+    def get_hits(self):
+        return self._hits
+
+    def get_misses(self):
+        return self._misses
+
+    def __len__(self):
+        return len(self._list_entries())
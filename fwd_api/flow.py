@@ -1,9 +1,14 @@
+from header_space import HeaderSpace
 from path import AggregatedLinksPath, DeviceIfaceListPair, Hop
 
 
 class TotalFlows(object):
     """Container for number of flows
     """
+    EXACT = 'EXACT'
+    # Type of merged totals of searches that may match the same flows
+    UPPER_BOUND = 'UPPER_BOUND'
+
     def __init__(self, total_flows, flows_type):
         """
         @param {int} total_flows
@@ -23,6 +28,33 @@ class TotalFlows(object):
         return TotalFlows(json_total_flows['value'],
                           json_total_flows['type'])
 
+    @classmethod
+    def merge(cls, total_flows_list, disjoint=False):
+        """Combine the totals of searches, e.g., the shards of a
+        search_planner plan
+
+        @param {TotalFlows[]} total_flows_list
+        @param {bool} disjoint: True if the searches match disjoint sets
+        of flows
+        @return {TotalFlows}: Sum of the totals. Unless the searches are
+        disjoint, a sum of several EXACT totals is only an UPPER_BOUND.
+        Otherwise the type is kept if all totals share it, or is the
+        first type other than EXACT, since the sum is only as exact as
+        its least exact term.
+        """
+        total_flows_list = list(total_flows_list)
+        flows_types = [t.get_flows_type() for t in total_flows_list]
+        flows_type = flows_types[0] if flows_types else cls.EXACT
+        for t in flows_types:
+            if t != flows_type:
+                flows_type = [x for x in flows_types if x != cls.EXACT][0]
+                break
+        if (not disjoint and len(total_flows_list) > 1 and
+                flows_type == cls.EXACT):
+            flows_type = cls.UPPER_BOUND
+        return TotalFlows(sum(t.get_total_flows() for t in total_flows_list),
+                          flows_type)
+
 
 class FlowsResponse(object):
     """Python-ized representation of server's json returned from call to
@@ -39,13 +71,18 @@ class FlowsResponse(object):
         self._flows_list = list(flows_list)
 
     @classmethod
-    def from_json(cls, json_response):
+    def from_json(cls, json_response, retain_header_space=False):
         """
         @param {dict} json_response
+        @param {bool} retain_header_space: See Flow.from_json
         """
         paged_flows = json_response['pagedFlows']
         total_flows = TotalFlows.from_json(json_response['totalFlows'])
-        flows_list = map(lambda f: Flow.from_json(f),
+        # Identical header spaces are common across hops and flows, so
+        # share a single decoded object between them.
+        header_space_cache = {} if retain_header_space else None
+        flows_list = map(lambda f: Flow.from_json(f, retain_header_space,
+                                                  header_space_cache),
                          json_response['flows'])
         return FlowsResponse(paged_flows, total_flows,
                              flows_list)
@@ -56,12 +93,56 @@ class FlowsResponse(object):
         """
         return list(self._flows_list)
 
+    def iter_flows(self):
+        """Iterate over flows without copying the flows list
+        """
+        return iter(self._flows_list)
+
     def get_total_flows(self):
         """
         @return {TotalFlows}
         """
         return self._total_flows
 
+    def get_paged_flows(self):
+        return self._paged_flows
+
+    @classmethod
+    def merge(cls, flows_responses, disjoint=False):
+        """Combine responses of searches, e.g., the shards of a
+        search_planner plan
+
+        Searches may match overlapping sets of flows, e.g., a flow whose
+        header space covers the IP sources of two shards. A flow with the
+        same type and path as a flow of an earlier response is dropped,
+        keeping the first response's flow. Flows of one response are all
+        kept, since the server may return several flows along a path.
+
+        @param {FlowsResponse[]} flows_responses
+        @param {bool} disjoint: See TotalFlows.merge
+        @return {FlowsResponse}: Its total flows are the sum of the
+        totals, see TotalFlows.merge
+        """
+        flows_responses = list(flows_responses)
+        flows_list = []
+        seen = set()
+        num_dropped = 0
+        for flows_response in flows_responses:
+            keys = set()
+            for flow in flows_response._flows_list:
+                key = (flow.get_flow_type(), flow.get_unexploded_path())
+                if key in seen:
+                    num_dropped += 1
+                else:
+                    flows_list.append(flow)
+                    keys.add(key)
+            seen |= keys
+        return FlowsResponse(
+            sum(r.get_paged_flows() for r in flows_responses) - num_dropped,
+            TotalFlows.merge((r.get_total_flows() for r in flows_responses),
+                             disjoint),
+            flows_list)
+
 
 class FlowType(object):
     VALID = 'VALID'
@@ -83,13 +164,18 @@ class Flow(object):
     INPUT_TABLE_SUFFIX = '.input'
     OUTPUT_TABLE_SUFFIX = '.output'
 
-    def __init__(self, flow_type, unexploded_path):
+    def __init__(self, flow_type, unexploded_path, header_spaces=None):
         """
         @param {str} flow_type One of the members of FlowType
         @param {AggregatedLinksPath} unexploded_path
+        @param {tuple[]} header_spaces [optional]: One (ingress, egress)
+        pair of HeaderSpace per hop of unexploded_path. Egress is None
+        when the hop has no egress.
         """
         self._flow_type = flow_type
         self._unexploded_path = unexploded_path
+        self._header_spaces = (None if header_spaces is None
+                               else list(header_spaces))
 
     def get_flow_type(self):
         return self._flow_type
@@ -100,6 +186,35 @@ class Flow(object):
         """
         return self._unexploded_path
 
+    def has_header_space(self):
+        """
+        @return {bool}: True if this flow was decoded with
+        retain_header_space set
+        """
+        return self._header_spaces is not None
+
+    def get_ingress_header_space(self, hop_index):
+        """
+        @param {int} hop_index: Index into the unexploded path's hops
+        @return {HeaderSpace}: Packets entering the hop's device
+        """
+        self._check_has_header_space()
+        return self._header_spaces[hop_index][0]
+
+    def get_egress_header_space(self, hop_index):
+        """
+        @param {int} hop_index: Index into the unexploded path's hops
+        @return {HeaderSpace or None}: Packets leaving the hop's device,
+        or None if the packets do not leave it
+        """
+        self._check_has_header_space()
+        return self._header_spaces[hop_index][1]
+
+    def _check_has_header_space(self):
+        if self._header_spaces is None:
+            raise ValueError('Header space was not retained for this flow; '
+                             'decode it with retain_header_space=True')
+
     @staticmethod
     def _has_suffix(val, suffix):
         return val[-len(suffix):] == suffix
@@ -120,9 +235,15 @@ class Flow(object):
                 Flow._is_output_table(table_name))
 
     @classmethod
-    def from_json(cls, flow_json):
+    def from_json(cls, flow_json, retain_header_space=False,
+                  header_space_cache=None):
         """
         @param {dict} flow_json
+        @param {bool} retain_header_space: If True, keep the header
+        space entering and leaving every hop in compact form (see
+        header_space.HeaderSpace).
+        @param {dict} header_space_cache [optional]: Shares decoded
+        header spaces across calls.
         """
         first_and_last_hops = []
         last_dev_name = None
@@ -141,7 +262,9 @@ class Flow(object):
                 first_and_last_hops.append(final_hop)
 
         unexploded_hop_list = []
+        header_spaces = [] if retain_header_space else None
         prev_pair = None
+        prev_hs = None
         for hop in first_and_last_hops:
             device_name = hop['parent']
             if Flow._is_input_table(hop['table']):
@@ -159,15 +282,27 @@ class Flow(object):
 
             pair = DeviceIfaceListPair(device_name, port_names)
 
+            hs = None
+            if retain_header_space:
+                hs_key = ('in_hs' if Flow._is_input_table(hop['table'])
+                          else 'out_hs')
+                hs = HeaderSpace.from_json(hop[hs_key], header_space_cache)
+
             if prev_pair is None:
                 prev_pair = pair
+                prev_hs = hs
             else:
                 unexploded_hop_list.append(Hop(prev_pair, pair))
+                if retain_header_space:
+                    header_spaces.append((prev_hs, hs))
                 prev_pair = None
 
         # Test for a packet that just ingresses a final device
         if prev_pair is not None:
             unexploded_hop_list.append(Hop(prev_pair))
+            if retain_header_space:
+                header_spaces.append((prev_hs, None))
 
         return Flow(flow_json['flowType'],
-                    AggregatedLinksPath(unexploded_hop_list))
+                    AggregatedLinksPath(unexploded_hop_list),
+                    header_spaces)
@@ -0,0 +1,120 @@
+'''
+Streaming writers that dump flows to JSON Lines or CSV files.
+
+The writers consume any iterable of flow.Flow objects one flow at a
+time and write through a buffered file, so memory use does not depend
+on the number of flows:
+
+    with open('flows.jsonl', 'wb') as fd:
+        write_flows_jsonl(flows_iter, fd)
+'''
+
+import csv
+import json
+
+# Default size of the write buffer used when a path is passed in
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+# Separator between interface names in a CSV cell
+CSV_IFACE_SEPARATOR = ';'
+
+CSV_COLUMNS = ['flow_index', 'flow_type', 'hop_index',
+               'ingress_device', 'ingress_ifaces',
+               'egress_device', 'egress_ifaces']
+
+_ENCODER = json.JSONEncoder(separators=(',', ':'))
+
+
+def flow_to_row_dict(flow):
+    '''
+    @param {flow.Flow} flow
+    @return {dict}: The record written for flow by write_flows_jsonl.
+    Hops are serialized by path.Hop.as_dict.
+    '''
+    return {
+        'flowType': flow.get_flow_type(),
+        'hops': [hop.as_dict()
+                 for hop in flow.get_unexploded_path().get_hop_list()],
+    }
+
+
+def _utf8(val):
+    if isinstance(val, unicode):
+        return val.encode('utf-8')
+    return val
+
+
+def _pair_cells(pair):
+    if pair is None:
+        return ['', '']
+    return [_utf8(pair.get_device_name()),
+            _utf8(CSV_IFACE_SEPARATOR.join(pair.get_iface_names_list()))]
+
+
+class _Output(object):
+    '''Context manager yielding a writable file for either a path or an
+    already-open file. Only files opened here are closed on exit.
+    '''
+
+    def __init__(self, dest, buffer_size):
+        self._dest = dest
+        self._buffer_size = buffer_size
+        self._fd = None
+
+    def __enter__(self):
+        if hasattr(self._dest, 'write'):
+            return self._dest
+        self._fd = open(self._dest, 'wb', self._buffer_size)
+        return self._fd
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._fd is not None:
+            self._fd.close()
+
+
+def write_flows_jsonl(flows, dest, buffer_size=DEFAULT_BUFFER_SIZE):
+    '''Write one JSON object per flow (see flow_to_row_dict)
+
+    @param {iterable} flows: flow.Flow objects
+    @param {str or file} dest: Path or open file to write to
+    @param {int} buffer_size: Write buffer size if dest is a path
+    @return {int}: Number of flows written
+    '''
+    count = 0
+    with _Output(dest, buffer_size) as fd:
+        write = fd.write
+        for flow in flows:
+            write(_ENCODER.encode(flow_to_row_dict(flow)))
+            write('\n')
+            count += 1
+    return count
+
+
+def write_flows_csv(flows, dest, buffer_size=DEFAULT_BUFFER_SIZE,
+                    header=True):
+    '''Write one CSV row per hop of every flow (see CSV_COLUMNS).
+    Flows without hops get a single row with an empty hop_index.
+
+    @param {iterable} flows: flow.Flow objects
+    @param {str or file} dest: Path or open file to write to
+    @param {int} buffer_size: Write buffer size if dest is a path
+    @param {bool} header: Whether to write CSV_COLUMNS as first row
+    @return {int}: Number of flows written
+    '''
+    count = 0
+    with _Output(dest, buffer_size) as fd:
+        writer = csv.writer(fd)
+        if header:
+            writer.writerow(CSV_COLUMNS)
+        for flow_index, flow in enumerate(flows):
+            flow_type = _utf8(flow.get_flow_type())
+            hops = flow.get_unexploded_path().get_hop_list()
+            if not hops:
+                writer.writerow([flow_index, flow_type, ''] +
+                                _pair_cells(None) + _pair_cells(None))
+            for hop_index, hop in enumerate(hops):
+                writer.writerow([flow_index, flow_type, hop_index] +
+                                _pair_cells(hop.get_ingress()) +
+                                _pair_cells(hop.get_egress()))
+            count += 1
+    return count
@@ -0,0 +1,319 @@
+'''
+Compact binary on-disk store for flows.
+
+A store is written once from a stream of flow.Flow objects and read
+back through mmap, decoding individual flows only when they are
+accessed:
+
+    write_flow_store('flows.bin', flows_iter)
+    with FlowStoreReader('flows.bin') as store:
+        for flow in store:
+            ...
+
+File layout (all integers little-endian):
+
+    header       magic, version, offset and length of every section
+    flow_types   uint8 per flow: index into type_names
+    type_names   uint32 string id per distinct flow type
+    flow_hops    uint32 per flow + 1: offsets into hops
+    hops         2 x uint32 per hop: ingress and egress pair ids
+                 (NO_PAIR for a hop without egress)
+    pair_devices uint32 string id per device/iface list pair
+    pair_ifaces  uint32 per pair + 1: offsets into iface_refs
+    iface_refs   uint32 string id per interface name
+    str_offsets  uint32 per string + 1: offsets into str_data
+    str_data     UTF-8 encoded strings
+
+Device/interface list pairs and strings are interned, so repeated
+hops cost 8 bytes each. Header spaces are not stored.
+'''
+
+import array
+import mmap
+import struct
+import sys
+
+from flow import Flow
+from path import AggregatedLinksPath, DeviceIfaceListPair, Hop
+
+MAGIC = 'FWDFLOW1'
+VERSION = 1
+
+NO_PAIR = 0xffffffff
+
+_SECTIONS = ['flow_types', 'type_names', 'flow_hops', 'hops',
+             'pair_devices', 'pair_ifaces', 'iface_refs',
+             'str_offsets', 'str_data']
+
+# magic, version, then offset and length in bytes of every section
+_HEADER = struct.Struct('<8sI' + 'QQ' * len(_SECTIONS))
+
+_ALIGNMENT = 8
+
+_UINT32 = struct.Struct('<I')
+
+
+def _uint32_array(values=()):
+    result = array.array('I', values)
+    if result.itemsize != 4:
+        result = array.array('L', values)
+    return result
+
+
+class FlowStoreWriter(object):
+    """Writes flows to a store file. Flows are buffered in compact
+    arrays and the file is written by close().
+    """
+
+    def __init__(self, path):
+        """
+        @param {str} path: File to create or overwrite
+        """
+        self._path = path
+        self._strings = {}
+        self._string_list = []
+        self._pairs = {}
+        self._type_codes = {}
+        self._flow_types = array.array('B')
+        self._type_names = _uint32_array()
+        self._flow_hops = _uint32_array([0])
+        self._hops = _uint32_array()
+        self._pair_devices = _uint32_array()
+        self._pair_ifaces = _uint32_array([0])
+        self._iface_refs = _uint32_array()
+        self._closed = False
+
+    def _intern_string(self, s):
+        string_id = self._strings.get(s)
+        if string_id is None:
+            string_id = self._strings[s] = len(self._string_list)
+            self._string_list.append(s)
+        return string_id
+
+    def _intern_pair(self, pair):
+        if pair is None:
+            return NO_PAIR
+        key = (pair.get_device_name(), tuple(pair.get_iface_names_list()))
+        pair_id = self._pairs.get(key)
+        if pair_id is None:
+            pair_id = self._pairs[key] = len(self._pair_devices)
+            self._pair_devices.append(self._intern_string(key[0]))
+            for iface_name in key[1]:
+                self._iface_refs.append(self._intern_string(iface_name))
+            self._pair_ifaces.append(len(self._iface_refs))
+        return pair_id
+
+    def add_flow(self, flow):
+        """
+        @param {flow.Flow} flow
+        """
+        flow_type = flow.get_flow_type()
+        type_code = self._type_codes.get(flow_type)
+        if type_code is None:
+            if len(self._type_codes) > 0xff:
+                raise ValueError('Too many distinct flow types')
+            type_code = self._type_codes[flow_type] = len(self._type_names)
+            self._type_names.append(self._intern_string(flow_type))
+        self._flow_types.append(type_code)
+        for hop in flow.get_unexploded_path().get_hop_list():
+            self._hops.append(self._intern_pair(hop.get_ingress()))
+            self._hops.append(self._intern_pair(hop.get_egress()))
+        self._flow_hops.append(len(self._hops) // 2)
+
+    def add_flows(self, flows):
+        """
+        @param {iterable} flows: flow.Flow objects
+        """
+        for flow in flows:
+            self.add_flow(flow)
+
+    def close(self):
+        """Write the store file
+        """
+        if self._closed:
+            return
+        self._closed = True
+        str_offsets = _uint32_array([0])
+        str_data = []
+        size = 0
+        for s in self._string_list:
+            if isinstance(s, unicode):
+                s = s.encode('utf-8')
+            str_data.append(s)
+            size += len(s)
+            str_offsets.append(size)
+        sections = [self._flow_types, self._type_names, self._flow_hops,
+                    self._hops, self._pair_devices, self._pair_ifaces,
+                    self._iface_refs, str_offsets]
+        if sys.byteorder != 'little':
+            for section in sections:
+                section.byteswap()
+        blobs = [section.tostring() for section in sections]
+        blobs.append(''.join(str_data))
+
+        header_fields = [MAGIC, VERSION]
+        offset = _HEADER.size
+        for blob in blobs:
+            offset += -offset % _ALIGNMENT
+            header_fields += [offset, len(blob)]
+            offset += len(blob)
+        with open(self._path, 'wb') as fd:
+            fd.write(_HEADER.pack(*header_fields))
+            position = _HEADER.size
+            for blob in blobs:
+                padding = -position % _ALIGNMENT
+                fd.write('\0' * padding)
+                fd.write(blob)
+                position += padding + len(blob)
+
+    def __len__(self):
+        """
+        @return {int}: Number of flows added
+        """
+        return len(self._flow_types)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+
+def write_flow_store(path, flows):
+    """
+    @param {str} path
+    @param {iterable} flows: flow.Flow objects
+    @return {int}: Number of flows written
+    """
+    writer = FlowStoreWriter(path)
+    writer.add_flows(flows)
+    writer.close()
+    return len(writer)
+
+
+class FlowStoreReader(object):
+    """Read-only, memory-mapped view of a store written by
+    FlowStoreWriter. Opening a store only reads its header; flows are
+    decoded on access.
+    """
+
+    def __init__(self, path):
+        """
+        @param {str} path
+        """
+        with open(path, 'rb') as fd:
+            self._mm = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            header = self._read_header(path)
+        except ValueError:
+            self._mm.close()
+            raise
+        self._offsets = {}
+        self._lengths = {}
+        for i, name in enumerate(_SECTIONS):
+            self._offsets[name] = header[2 + 2 * i]
+            self._lengths[name] = header[3 + 2 * i]
+        self._num_flows = self._lengths['flow_types']
+        self._strings = {}
+        self._pairs = {}
+
+    def _read_header(self, path):
+        if self._mm.size() < _HEADER.size:
+            raise ValueError('%s is not a flow store' % path)
+        header = _HEADER.unpack_from(self._mm, 0)
+        if header[0] != MAGIC:
+            raise ValueError('%s is not a flow store' % path)
+        if header[1] != VERSION:
+            raise ValueError('Unsupported flow store version %d' % header[1])
+        return header
+
+    def _uint32(self, section, index):
+        return _UINT32.unpack_from(self._mm,
+                                   self._offsets[section] + 4 * index)[0]
+
+    def _string(self, string_id):
+        s = self._strings.get(string_id)
+        if s is None:
+            start = self._uint32('str_offsets', string_id)
+            end = self._uint32('str_offsets', string_id + 1)
+            base = self._offsets['str_data']
+            s = self._mm[base + start:base + end].decode('utf-8')
+            self._strings[string_id] = s
+        return s
+
+    def _pair(self, pair_id):
+        if pair_id == NO_PAIR:
+            return None
+        pair = self._pairs.get(pair_id)
+        if pair is None:
+            start = self._uint32('pair_ifaces', pair_id)
+            end = self._uint32('pair_ifaces', pair_id + 1)
+            iface_ids = struct.unpack_from(
+                '<%dI' % (end - start), self._mm,
+                self._offsets['iface_refs'] + 4 * start)
+            pair = DeviceIfaceListPair(
+                self._string(self._uint32('pair_devices', pair_id)),
+                [self._string(i) for i in iface_ids])
+            self._pairs[pair_id] = pair
+        return pair
+
+    def _check_index(self, index):
+        if index < 0:
+            index += self._num_flows
+        if not 0 <= index < self._num_flows:
+            raise IndexError('flow index out of range')
+        return index
+
+    def get_flow_type(self, index):
+        """
+        @param {int} index
+        @return {str}: One of the members of flow.FlowType
+        """
+        index = self._check_index(index)
+        type_code = ord(self._mm[self._offsets['flow_types'] + index])
+        return self._string(self._uint32('type_names', type_code))
+
+    def get_unexploded_path(self, index):
+        """
+        @param {int} index
+        @return {AggregatedLinksPath}
+        """
+        index = self._check_index(index)
+        start = self._uint32('flow_hops', index)
+        end = self._uint32('flow_hops', index + 1)
+        pair_ids = struct.unpack_from('<%dI' % (2 * (end - start)),
+                                      self._mm,
+                                      self._offsets['hops'] + 8 * start)
+        hops = []
+        for i in xrange(0, len(pair_ids), 2):
+            hops.append(Hop(self._pair(pair_ids[i]),
+                            self._pair(pair_ids[i + 1])))
+        return AggregatedLinksPath(hops)
+
+    def get_flow(self, index):
+        """
+        @param {int} index
+        @return {flow.Flow}
+        """
+        return Flow(self.get_flow_type(index),
+                    self.get_unexploded_path(index))
+
+    def __len__(self):
+        return self._num_flows
+
+    def __getitem__(self, index):
+        return self.get_flow(index)
+
+    def __iter__(self):
+        for index in xrange(self._num_flows):
+            yield self.get_flow(index)
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
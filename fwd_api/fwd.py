@@ -12,10 +12,12 @@ Helper functions to run API calls and verify JSON output.
 
 @contact:    support@forwardnetworks.com
 '''
+import copy
 import mimetypes
 import os
 import re
 import ssl
+import threading
 import time
 import json
 
@@ -25,12 +27,22 @@ from requests.auth import HTTPBasicAuth
 from requests.exceptions import (MissingSchema, ConnectionError, SSLError,
                                  InvalidURL)
 from requests.packages.urllib3.poolmanager import PoolManager
+from alias import AliasSyncSummary, RawAlias
+from canonical import canonical_json, fingerprint
+from concurrency import (BatchResult, DEFAULT_MAX_CONCURRENCY,
+                         DEFAULT_RETRIES, call_with_retries, run_concurrently,
+                         run_concurrently_ordered)
 from flow import FlowsResponse
-from fwd_api.check import NetworkCheckResult, Check
+from json_stream import CHUNK_SIZE, iter_json_array
+from fwd_api.check import (NetworkCheckResult, NetworkCheckStatus, Check,
+                           CheckBatchSummary, RawCheck)
 from fwd_api.network import Network, Snapshot
 from fwd_api.notification import Notification
 from ifaces_response import IfacesResponse
+from inventory import Inventory
 from devices_response import DevicesResponse
+from disk_cache import make_key
+from validation import check_batch
 
 try:
     # Suppress InsecureRequestWarning
@@ -52,6 +64,58 @@ def truncate(s, first_n=1000, last_n=1000):
 # https://github.com/kennethreitz/requests/issues/1083#issuecomment-11853729
 DEFAULT_POOLBLOCK = False
 
+# Bounds, in seconds, of the adaptive polling interval of
+# Fwd.wait_for_checks
+DEFAULT_MIN_POLL_INTERVAL = 0.5
+DEFAULT_MAX_POLL_INTERVAL = 30.0
+
+# Fwd.wait_for_checks polls checks one by one when at most this many
+# are pending, instead of fetching every check of the snapshot
+_MAX_CHECKS_POLLED_ONE_BY_ONE = 3
+
+# copy_checks uploads source checks in batches of max_concurrency times
+# this many
+COPY_BATCH_SIZE_PER_UPLOAD = 16
+
+# Number of connections kept open per host. Should be at least the
+# concurrency used by batch operations.
+DEFAULT_POOL_MAXSIZE = 10
+
+
+class HTTPStatusError(Exception):
+    '''Raised when the server responds with an unexpected status code'''
+
+    def __init__(self, message, status_code):
+        super(HTTPStatusError, self).__init__(message)
+        self.status_code = status_code
+
+
+class HTTPConnectionError(Exception):
+    '''Raised when the server cannot be reached'''
+
+
+def is_transient_error(e):
+    '''
+    @param {Exception} e: Raised by an HTTPApi request
+    @return {bool}: True if repeating the request may succeed, i.e., on
+    connection errors and server-side (5xx) errors
+    '''
+    return (isinstance(e, HTTPConnectionError) or
+            (isinstance(e, HTTPStatusError) and e.status_code >= 500))
+
+
+def _has_json_error(r):
+    '''
+    @param {requests.Response} r
+    @return {bool}: True unless the body is JSON without an 'error'
+    field
+    '''
+    try:
+        body = r.json()
+    except ValueError:
+        return True
+    return isinstance(body, dict) and 'error' in body
+
 
 class MyAdapter(HTTPAdapter):
     def init_poolmanager(self, connections, maxsize, block=DEFAULT_POOLBLOCK):
@@ -63,7 +127,8 @@ class HTTPApi(object):
     '''Object to abstract access to an HTTP API, optionally with SSL.'''
 
     def __init__(self, url, username, password, verbose=False, verify=True,
-                 verify_ssl_cert=True):
+                 verify_ssl_cert=True, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 conditional_requests=False, single_flight=None):
         """
         @param {string} url: base URL to which we should connect
         @param {string} username
@@ -72,6 +137,14 @@ class HTTPApi(object):
         @param {boolean} verify
         @param {boolean} verify_ssl_cert: verify the provided SSL cert. Use
         with care!
+        @param {int} pool_maxsize: Number of pooled connections to the
+        server, shared by concurrent requests
+        @param {boolean} conditional_requests: Revalidate the responses of
+        get_decoded with If-None-Match and If-Modified-Since, reusing the
+        decoded object when the server answers 304 Not Modified
+        @param {SingleFlight} single_flight [optional]: Coalesces
+        identical get_decoded calls made concurrently by several threads
+        into one request
         """
         self.url = url
         self.verbose = verbose
@@ -84,7 +157,14 @@ class HTTPApi(object):
 
         # Use session adapter for TLSv1
         self.session = requests.Session()
-        self.session.mount('https://', MyAdapter())
+        self.session.mount('https://', MyAdapter(pool_maxsize=pool_maxsize))
+        self.session.mount('http://', HTTPAdapter(pool_maxsize=pool_maxsize))
+
+        self.conditional_requests = conditional_requests
+        # (etag, last_modified, decoded object) by request, see get_decoded
+        self._validators = {}
+        self._validators_lock = threading.Lock()
+        self.single_flight = single_flight
 
     def request(self, method, api_url_suffix, verbose=False, **kwargs):
         """Constructs and sends an http request of given method type
@@ -103,10 +183,13 @@ class HTTPApi(object):
         string for the request
         @param {dict} data: dictionary, bytes, or file-like object to
         send in the body of the request
+        @param {bool} allow_not_modified: Do not raise on 304 responses
+        to conditional requests
         @return: requests.Response object that contains the server's response
         to the http request
         """
         verbose = verbose or self.verbose
+        allow_not_modified = kwargs.pop('allow_not_modified', False)
         # Wrap the API call with the base server url to create request address
         addr = self.url + api_url_suffix
         if verbose:
@@ -137,15 +220,16 @@ class HTTPApi(object):
                             'to numeric IPs, which cannot match certificates '
                             'that are defined for named URLs.' % se)
         except ConnectionError:
-            raise Exception('Connection error to %s; please verify the URL '
-                            'and your Internet connection and try again.' %
-                            self.url)
+            raise HTTPConnectionError(
+                'Connection error to %s; please verify the URL and your '
+                'Internet connection and try again.' % self.url)
 
-        if verbose:
+        # Reading the content of a streamed response would load it all
+        if verbose and not kwargs.get('stream'):
             print truncate(r.content)
 
         # Validate and return response
-        if self.verify:
+        if self.verify and not (allow_not_modified and r.status_code == 304):
             self.verify_status_code(r)
         return r
 
@@ -162,6 +246,80 @@ class HTTPApi(object):
         return self.request('get', api_url_suffix, verbose=verbose,
                             headers=headers, params=params)
 
+    def get_decoded(self, api_url_suffix, decode, headers=None, params=None,
+                    verbose=False, decode_key=None, reuse=True):
+        '''Sends an http GET request and decodes the response
+
+        With conditional_requests, the validators (ETag and Last-Modified
+        headers) of the last response are sent along, and the object
+        decoded from that response is returned as is when the server
+        answers 304 Not Modified. Callers must not modify it.
+
+        With a single_flight, threads requesting the same resource at
+        once share one request and its decoded object, and so may calls
+        made within its ttl unless reuse is False.
+
+        @param {function} decode: Called with the requests.Response of
+        a successful request, returns the decoded object
+        @param decode_key [optional]: Hashable value telling apart
+        different decodings of the same resource
+        @param {bool} reuse: See SingleFlight.do
+        @return: The decoded object
+        '''
+        key = (api_url_suffix,
+               tuple(sorted((params or {}).iteritems())), decode_key)
+        return self._coalesce(key, lambda: self._get_decoded(
+            key, api_url_suffix, decode, headers, params, verbose),
+            verbose=verbose, reuse=reuse)
+
+    def _coalesce(self, key, func, verbose=False, reuse=True):
+        '''
+        @param {bool} verbose: Verbose calls are only shared with each
+        other, so that their callers see the request details printed
+        @return: func(), shared with concurrent calls with the same key if
+        single_flight is set
+        '''
+        if self.single_flight is None:
+            return func()
+        return self.single_flight.do((key, bool(verbose)), func,
+                                     reuse=reuse)
+
+    def _get_decoded(self, key, api_url_suffix, decode, headers, params,
+                     verbose):
+        if not self.conditional_requests:
+            return decode(self.get(api_url_suffix, headers=headers,
+                                   params=params, verbose=verbose))
+
+        with self._validators_lock:
+            cached = self._validators.get(key)
+        headers = dict(headers or {})
+        if cached is not None:
+            etag, last_modified, _ = cached
+            if etag is not None:
+                headers['If-None-Match'] = etag
+            if last_modified is not None:
+                headers['If-Modified-Since'] = last_modified
+        r = self.request('get', api_url_suffix, verbose=verbose,
+                         headers=headers, params=params,
+                         allow_not_modified=cached is not None)
+        if r.status_code == 304 and cached is not None:
+            return cached[2]
+
+        decoded = decode(r)
+        etag = r.headers.get('ETag')
+        last_modified = r.headers.get('Last-Modified')
+        with self._validators_lock:
+            if r.status_code == 200 and (etag or last_modified):
+                self._validators[key] = (etag, last_modified, decoded)
+            else:
+                self._validators.pop(key, None)
+        return decoded
+
+    def clear_validators(self):
+        '''Forget the responses remembered by get_decoded'''
+        with self._validators_lock:
+            self._validators.clear()
+
     def post(self, api_url_suffix, data=None, headers=None, params=None,
              files=None, verbose=False):
         '''Constructs and sends an http POST request
@@ -242,24 +400,24 @@ class HTTPApi(object):
         if r.status_code == status_code:
             return
         elif r.status_code == 401:
-            raise Exception('%sUser authentication error; please check '
-                            '"username", and "password" parameters and try '
-                            'again.' % err_prefix)
+            message = ('%sUser authentication error; please check '
+                       '"username", and "password" parameters and try '
+                       'again.' % err_prefix)
         elif r.status_code == 404:
-            raise Exception('%sURL not found %s' %
-                            (err_prefix, r.url))
+            message = '%sURL not found %s' % (err_prefix, r.url)
         elif r.status_code == 400:
-            raise Exception('%sBad request to server %s; contents: %s' %
-                            (err_prefix, r.url, r.content))
+            message = ('%sBad request to server %s; contents: %s' %
+                       (err_prefix, r.url, r.content))
         elif r.status_code == 405:
-            raise Exception('%sMethod not allowed; contents: %s' %
-                            (err_prefix, r.content))
+            message = ('%sMethod not allowed; contents: %s' %
+                       (err_prefix, r.content))
         elif r.status_code == 500:
-            raise Exception('%sInternal server error to %s; contents:\n%s' %
-                            (err_prefix, r.url, r.content))
+            message = ('%sInternal server error to %s; contents:\n%s' %
+                       (err_prefix, r.url, r.content))
         else:
-            raise Exception('%sReceived http status code %d from server' %
-                            (err_prefix, r.status_code))
+            message = ('%sReceived http status code %d from server' %
+                       (err_prefix, r.status_code))
+        raise HTTPStatusError(message, r.status_code)
 
     def set_headers(self, headers, kwargs):
         '''Hook to set initial header values.'''
@@ -369,7 +527,9 @@ class Fwd(HTTPJSONApi):
     '''
 
     def __init__(self, url, username, password, verbose=True, verify=True,
-                 verify_ssl_cert=True):
+                 verify_ssl_cert=True, search_cache=None,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, disk_cache=None,
+                 conditional_requests=False, single_flight=None):
         '''
         @param {string} url: base URL to which we should connect
         @param {string} username
@@ -379,11 +539,72 @@ class Fwd(HTTPJSONApi):
         'error' in the JSON response.
         @param {boolean} verify_ssl_cert: verify the provided SSL cert? Use
         with care!
+        @param {SearchResultCache} search_cache [optional]: Cache of
+        get_flows results. Results are keyed by server, user, snapshot
+        id and canonical query, which is always safe since snapshots
+        never change, and lets Fwd objects for several servers or users
+        share a cache.
+        @param {int} pool_maxsize: Number of pooled connections to the
+        server. Raise it along with max_concurrency of batch calls.
+        @param {DiskCache} disk_cache [optional]: Persistent cache of
+        the devices, interfaces and flow search results of snapshots.
+        Checks are not cached since their status changes.
+        @param {boolean} conditional_requests: Revalidate networks,
+        snapshots, notifications and checks instead of downloading them
+        again when unchanged (see HTTPApi.get_decoded). The networks,
+        snapshots, notifications, checks and collector status returned
+        for unchanged resources are shallow copies, whose elements are
+        shared between calls.
+        @param {SingleFlight} single_flight [optional]: Coalesces
+        identical requests for devices, interfaces, networks, snapshots,
+        notifications, checks and collector status made concurrently by
+        several threads. Its ttl lets results be reused by calls made
+        shortly after, e.g., by many pollers of get_collector_status.
+        Checks are never reused past their request, since their status
+        is polled.
         '''
         super(Fwd, self).__init__(url=url, username=username,
                                   password=password, verbose=verbose,
                                   verify=verify,
-                                  verify_ssl_cert=verify_ssl_cert)
+                                  verify_ssl_cert=verify_ssl_cert,
+                                  pool_maxsize=pool_maxsize,
+                                  conditional_requests=conditional_requests,
+                                  single_flight=single_flight)
+        self.search_cache = search_cache
+        self.disk_cache = disk_cache
+
+    def _get_snapshot_data(self, snapshot_id, api_url_suffix, verbose=False,
+                           headers=None, data=None, err_prefix=None):
+        '''Fetch data of a snapshot that never changes, through the disk
+        cache if any
+
+        @param {str} data [optional]: Body of a POST request. A GET is
+        sent if None.
+        @param {str} err_prefix [optional]: If given, responses with an
+        error status or an 'error' field raise an Exception with this
+        message prefix. Such responses are never cached.
+        @return {str}: Response body
+        '''
+        key = None
+        if self.disk_cache is not None:
+            # Users may not see the same devices and flows
+            key = make_key(self.url, self.username, snapshot_id,
+                           api_url_suffix, data)
+            body = self.disk_cache.get(key)
+            if body is not None:
+                return body
+        if data is None:
+            r = self.get(api_url_suffix, verbose=verbose, headers=headers)
+        else:
+            r = self.post(api_url_suffix, data=data, verbose=verbose,
+                          headers=headers)
+        if err_prefix is not None:
+            self.verify_status_code(r, err_prefix)
+            self.verify_json_error(r, err_prefix)
+        if (key is not None and r.status_code == 200 and
+                (err_prefix is not None or not _has_json_error(r))):
+            self.disk_cache.put(key, r.content)
+        return r.content
 
     def upload_alias(self, alias, snapshot_id, verbose=True):
         '''Upload alias to snapshot
@@ -394,10 +615,76 @@ class Fwd(HTTPJSONApi):
         headers = {
             'Content-type': 'application/json'
         }
-        self.put(alias.get_upload_url_suffix_str(snapshot_id),
+        self.put(alias._get_upload_url_suffix_str(snapshot_id),
                  data=json.dumps(alias._to_alias_dict()), verbose=verbose,
                  headers=headers)
 
+    def get_aliases(self, snapshot_id, verbose=False):
+        '''Get the aliases of a snapshot
+
+        @param {int} snapshot_id
+        @return {RawAlias[]}
+        '''
+        headers = {
+            'Accept': 'application/json, text/*',
+            }
+        response = self.get('/api/snapshots/%d/aliases' % snapshot_id,
+                            verbose=verbose, headers=headers)
+        return [RawAlias(a) for a in response.json()]
+
+    def sync_aliases(self, aliases, snapshot_id,
+                     max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                     retries=DEFAULT_RETRIES, validate=True, verbose=False):
+        '''Make the aliases of a snapshot match the given definitions
+
+        Fetches the aliases of the snapshot once and uploads only the
+        aliases that are missing or differ, concurrently. Aliases of the
+        snapshot that are not given are left as they are.
+
+        @param {_Alias[]} aliases: Names must be unique
+        @param {int} snapshot_id
+        @param {int} max_concurrency: Maximum number of uploads in flight
+        @param {int} retries: Retries per alias of transient failures
+        @param {bool} validate: Validate every alias locally first, as
+        for upload_checks
+        @return {AliasSyncSummary}
+        '''
+        aliases = list(aliases)
+        if validate:
+            check_batch(aliases)
+        existing = dict((a.get_name(), a.get_definition_hash())
+                        for a in self.get_aliases(snapshot_id, verbose))
+        unchanged = []
+        to_upload = []
+        for alias in aliases:
+            if existing.get(alias.get_name()) == alias.get_definition_hash():
+                unchanged.append(alias.get_name())
+            else:
+                to_upload.append(alias)
+
+        def upload(alias):
+            r = self.put(alias._get_upload_url_suffix_str(snapshot_id),
+                         data=canonical_json(alias._to_alias_dict()),
+                         verbose=verbose,
+                         headers={'Content-type': 'application/json'})
+            self.verify_status_code(r, 'Error uploading alias %s: ' %
+                                    alias.get_name())
+
+        created = []
+        updated = []
+        failures = []
+        for result in run_concurrently_ordered(
+                upload, to_upload, max_concurrency=max_concurrency,
+                retries=retries, retry_if=is_transient_error):
+            name = result.get_request().get_name()
+            if not result.is_success():
+                failures.append(result)
+            elif name in existing:
+                updated.append(name)
+            else:
+                created.append(name)
+        return AliasSyncSummary(created, updated, unchanged, failures)
+
     def upload_check(self, check, snapshot_id, verbose=True):
         '''Upload check to snapshot
 
@@ -409,7 +696,7 @@ class Fwd(HTTPJSONApi):
             'Content-type': 'application/json'
         }
         response = self.post(Check.get_upload_url_suffix_str(snapshot_id),
-                             data=json.dumps(check.to_check_dict()), verbose=verbose,
+                             data=check.to_check_json(), verbose=verbose,
                              headers=headers)
         return NetworkCheckResult.from_json(response.json())
 
@@ -427,6 +714,269 @@ class Fwd(HTTPJSONApi):
                                verbose=verbose, headers=headers)
         return response.status_code is 200
 
+    def upload_checks(self, checks, snapshot_id,
+                      max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                      retries=DEFAULT_RETRIES, skip_existing=False,
+                      validate=True, verbose=False):
+        '''Upload many checks to a snapshot concurrently
+
+        A failed upload does not abort the others. Connection errors and
+        server errors (5xx) are retried. Since the server may have
+        created the check even though its response was lost, the checks
+        of the snapshot are listed again before retrying, and a check
+        with the same definition created since the batch started is
+        reported instead of uploading a duplicate. Retries that fail
+        around the same time share one listing.
+
+        @param {check.Check[]} checks
+        @param {int} snapshot_id
+        @param {int} max_concurrency: Maximum number of uploads in flight
+        @param {int} retries: Retries per check of transient failures
+        @param {bool} skip_existing: Fetch the checks of the snapshot
+        first and upload only checks whose definition hash matches
+        neither an existing check nor an earlier check of the batch.
+        Skipped checks get the result of the matching check.
+        @param {bool} validate: Validate every check locally first and
+        raise a validation.ValidationError listing all problems, without
+        uploading anything, if some are invalid
+        @return {CheckBatchSummary}: Uploaded NetworkCheckResult-s by
+        status, and failures
+        '''
+        checks = list(checks)
+        if validate:
+            check_batch(checks)
+
+        # Ids of the checks that existed before the batch, and of those
+        # it created, so that a retry only reuses a check created by an
+        # earlier attempt of the same upload
+        known_ids = set()
+
+        if not skip_existing:
+            if retries > 0 and checks:
+                known_ids.update(long(c['id']) for c in
+                                 self.iter_checks_json(snapshot_id, verbose))
+            return CheckBatchSummary(self._upload_checks(
+                checks, snapshot_id, known_ids, max_concurrency, retries,
+                verbose))
+
+        existing = {}
+        for result in self.iter_checks(snapshot_id, hash_definitions=True,
+                                       verbose=verbose):
+            known_ids.add(result.get_check_id())
+            existing.setdefault(result.get_definition_hash(), result)
+        hashes = [c.get_definition_hash() for c in checks]
+        # Index of the check uploaded for each new definition hash
+        first_index = {}
+        for i, definition_hash in enumerate(hashes):
+            if definition_hash not in existing:
+                first_index.setdefault(definition_hash, i)
+        to_upload = sorted(first_index.itervalues())
+        uploaded = dict(zip(to_upload, self._upload_checks(
+            [checks[i] for i in to_upload], snapshot_id, known_ids,
+            max_concurrency, retries, verbose)))
+        results = []
+        skipped = []
+        for i, (check, definition_hash) in enumerate(zip(checks, hashes)):
+            if definition_hash in existing:
+                results.append(BatchResult(i, check,
+                                           existing[definition_hash]))
+            else:
+                match = uploaded[first_index[definition_hash]]
+                results.append(BatchResult(i, check, match.get_result(),
+                                           match.get_error()))
+            if i not in uploaded:
+                skipped.append(i)
+        return CheckBatchSummary(results, skipped)
+
+    def _upload_checks(self, checks, snapshot_id, known_ids,
+                       max_concurrency, retries, verbose):
+        '''Upload checks concurrently, retrying transient failures
+        without creating duplicates (see upload_checks)
+
+        @param {set} known_ids: Ids of the checks of the snapshot that
+        retries must not report as created by the upload. Updated with
+        the ids of the created checks.
+        @return {BatchResult[]}: In check order
+        '''
+        headers = {
+            'Content-type': 'application/json'
+        }
+        url_suffix = Check.get_upload_url_suffix_str(snapshot_id)
+        lock = threading.Lock()
+        # Checks of the last listing that are not in known_ids, by
+        # definition hash. Listings are numbered so that a retry only
+        # relists if no listing started since its attempt failed.
+        listing = {'number': 0, 'unknown': {}}
+        listing_lock = threading.Lock()
+
+        def find_created(definition_hash, failed_after_listing):
+            with listing_lock:
+                if listing['number'] == failed_after_listing:
+                    listing['number'] += 1
+                    unknown = {}
+                    for result in self.iter_checks(
+                            snapshot_id, keep_raw_json=True,
+                            hash_definitions=True, verbose=verbose):
+                        with lock:
+                            if result.get_check_id() in known_ids:
+                                continue
+                        unknown.setdefault(result.get_definition_hash(),
+                                           []).append(result)
+                    listing['unknown'] = unknown
+                candidates = listing['unknown'].get(definition_hash, [])
+                while candidates:
+                    result = candidates.pop(0)
+                    with lock:
+                        if result.get_check_id() not in known_ids:
+                            known_ids.add(result.get_check_id())
+                            return result
+            return None
+
+        def upload(check):
+            # Number of the last listing started before the last failed
+            # attempt, None before the first attempt
+            failed_after_listing = [None]
+
+            def attempt():
+                if failed_after_listing[0] is not None:
+                    created = find_created(check.get_definition_hash(),
+                                           failed_after_listing[0])
+                    if created is not None:
+                        return created
+                try:
+                    r = self.post(url_suffix, data=check.to_check_json(),
+                                  verbose=verbose, headers=headers)
+                    self.verify_status_code(r, 'Error uploading check: ')
+                except:
+                    failed_after_listing[0] = listing['number']
+                    raise
+                result = NetworkCheckResult.from_json(r.json())
+                with lock:
+                    known_ids.add(result.get_check_id())
+                return result
+
+            return call_with_retries(attempt, retries=retries,
+                                     retry_if=is_transient_error)
+
+        return run_concurrently_ordered(upload, checks,
+                                        max_concurrency=max_concurrency)
+
+    def copy_checks(self, src_snapshot_id, dst_snapshot_id,
+                    check_types=None, name_pattern=None,
+                    max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                    retries=DEFAULT_RETRIES, verbose=False):
+        '''Copy checks from one snapshot to another
+
+        Checks whose definition already exists in the destination
+        snapshot are not uploaded again; they map to the existing check.
+        Source checks are streamed and uploaded in batches of
+        max_concurrency * COPY_BATCH_SIZE_PER_UPLOAD, so only one batch
+        of definitions is held in memory at a time.
+
+        @param {int} src_snapshot_id
+        @param {int} dst_snapshot_id
+        @param {NetworkCheckType[]} check_types [optional]: Copy only
+        checks of these types
+        @param {str} name_pattern [optional]: Copy only checks whose
+        name matches this regular expression (see re.search)
+        @param {int} max_concurrency: Maximum number of uploads in flight
+        @param {int} retries: Retries per check of transient failures
+        @return {dict}: Destination check id by source check id. Checks
+        that failed to copy map to None.
+        '''
+        name_regex = None
+        if name_pattern is not None:
+            name_regex = re.compile(name_pattern)
+        known_ids = set()
+        # Destination check id by definition hash
+        dst_ids = {}
+        for result in self.iter_checks(dst_snapshot_id, hash_definitions=True,
+                                       verbose=verbose):
+            known_ids.add(result.get_check_id())
+            dst_ids.setdefault(result.get_definition_hash(),
+                               result.get_check_id())
+
+        id_map = {}
+        # Source check ids by definition hash, and check to upload per
+        # definition hash, of the current batch
+        pending_src_ids = {}
+        pending_checks = []
+
+        def flush():
+            results = self._upload_checks(
+                pending_checks, dst_snapshot_id, known_ids, max_concurrency,
+                retries, verbose)
+            for check, batch_result in zip(pending_checks, results):
+                definition_hash = check.get_definition_hash()
+                dst_id = None
+                if batch_result.is_success():
+                    dst_id = batch_result.get_result().get_check_id()
+                    dst_ids[definition_hash] = dst_id
+                for src_id in pending_src_ids[definition_hash]:
+                    id_map[src_id] = dst_id
+            pending_src_ids.clear()
+            del pending_checks[:]
+
+        batch_size = max_concurrency * COPY_BATCH_SIZE_PER_UPLOAD
+        for result in self.iter_checks(src_snapshot_id, keep_raw_json=True,
+                                       verbose=verbose):
+            if (check_types is not None and
+                    result.get_check_type() not in check_types):
+                continue
+            if (name_regex is not None and
+                    not name_regex.search(result.get_name() or '')):
+                continue
+            check = RawCheck.from_result(result)
+            definition_hash = check.get_definition_hash()
+            if definition_hash in dst_ids:
+                id_map[result.get_check_id()] = dst_ids[definition_hash]
+                continue
+            if definition_hash not in pending_src_ids:
+                pending_src_ids[definition_hash] = []
+                pending_checks.append(check)
+            pending_src_ids[definition_hash].append(result.get_check_id())
+            if len(pending_checks) >= batch_size:
+                flush()
+        if pending_checks:
+            flush()
+        return id_map
+
+    def delete_checks(self, check_ids, snapshot_id,
+                      max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                      retries=DEFAULT_RETRIES, verbose=False):
+        '''Delete many checks from a snapshot concurrently
+
+        @param {int[]} check_ids
+        @param {int} snapshot_id
+        @return {CheckBatchSummary}: get_succeeded returns the deleted
+        check ids. A check not found when retrying counts as deleted,
+        since the server may have deleted it even though its response
+        was lost.
+        '''
+        def delete(check_id):
+            attempts = [0]
+
+            def attempt():
+                attempts[0] += 1
+                try:
+                    r = self.delete(
+                        Check.get_delete_url_suffix_str(snapshot_id,
+                                                        check_id),
+                        verbose=verbose,
+                        headers={'Content-type': 'application/json'})
+                    self.verify_status_code(
+                        r, 'Error deleting check %d: ' % check_id)
+                except HTTPStatusError as e:
+                    if e.status_code != 404 or attempts[0] == 1:
+                        raise
+                return check_id
+
+            return call_with_retries(attempt, retries=retries,
+                                     retry_if=is_transient_error)
+
+        return CheckBatchSummary(run_concurrently_ordered(
+            delete, check_ids, max_concurrency=max_concurrency))
+
     def get_check(self, snapshot_id, check_id, verbose=True):
         """Get check details
 
@@ -438,6 +988,64 @@ class Fwd(HTTPJSONApi):
         response = self.get(url_suffix, verbose=verbose)
         return NetworkCheckResult.from_json(response.json())
 
+    def wait_for_checks(self, snapshot_id, check_ids, timeout=None,
+                        min_interval=DEFAULT_MIN_POLL_INTERVAL,
+                        max_interval=DEFAULT_MAX_POLL_INTERVAL,
+                        verbose=False):
+        '''Wait for the server to evaluate checks
+
+        Each round fetches all checks of the snapshot with one request,
+        unless only a few checks are pending, which are then fetched one
+        by one. The interval between rounds starts at min_interval,
+        doubles after every round in which no check completed, and
+        returns to min_interval when some did.
+
+        @param {int} snapshot_id
+        @param {int[]} check_ids
+        @param {float} timeout [optional]: Seconds after which to raise
+        an exception if some checks are still not evaluated. Checks are
+        polled one last time at the deadline.
+        @param {float} min_interval: Seconds between rounds, at least
+        @param {float} max_interval: Seconds between rounds, at most
+        @return {generator}: Yields the NetworkCheckResult of each check
+        once its status is not NONE, in completion order
+        '''
+        pending = set(check_ids)
+        deadline = None if timeout is None else time.time() + timeout
+        interval = min_interval
+        while pending:
+            if len(pending) <= _MAX_CHECKS_POLLED_ONE_BY_ONE:
+                results = [self.get_check(snapshot_id, check_id, verbose)
+                           for check_id in sorted(pending)]
+            else:
+                results = [r for r in self.iter_checks(snapshot_id,
+                                                       verbose=verbose)
+                           if r.get_check_id() in pending]
+                missing = pending.difference(r.get_check_id()
+                                             for r in results)
+                if missing:
+                    raise Exception('Checks %s not found in snapshot %d' %
+                                    (sorted(missing), snapshot_id))
+            done = [r for r in results
+                    if r.get_status() != NetworkCheckStatus.NONE]
+            for result in done:
+                pending.discard(result.get_check_id())
+                yield result
+            if not pending:
+                return
+            if done:
+                interval = min_interval
+            if deadline is None:
+                time.sleep(interval)
+            else:
+                now = time.time()
+                if now >= deadline:
+                    raise Exception('Timed out waiting for the evaluation '
+                                    'of checks %s' % sorted(pending))
+                time.sleep(min(interval, deadline - now))
+            if not done:
+                interval = min(interval * 2, max_interval)
+
     def set_network_collector(self, network_id, username, verbose=True):
         '''Issue a request to associate a network with a collector with
         user username
@@ -478,8 +1086,10 @@ class Fwd(HTTPJSONApi):
         attached to this network.
         '''
         url_suffix = '/api/networks/%d/collector/status' % network_id
-        response = self.get(url_suffix, verbose=verbose)
-        return CollectorStatus._from_server_json_resp(response.content)
+        return copy.copy(self.get_decoded(
+            url_suffix,
+            lambda r: CollectorStatus._from_server_json_resp(r.content),
+            verbose=verbose))
 
     def non_blocking_collection_request(self, network_id, verbose=True):
         '''Send a request to server to collect a snapshot
@@ -586,13 +1196,13 @@ class Fwd(HTTPJSONApi):
         @return {list}: List of network objects.
         '''
         url_suffix = '/api/networks'
-        response = self.get(url_suffix, verbose=verbose)
-        result = []
-        for network in response.json():
-            result.append(Network.from_json(network))
-        return result
+        return list(self.get_decoded(
+            url_suffix,
+            lambda r: [Network.from_json(network) for network in r.json()],
+            verbose=verbose))
 
-    def get_flows(self, search_builder, snapshot_id, verbose=False):
+    def get_flows(self, search_builder, snapshot_id, verbose=False,
+                  retain_header_space=False):
         '''
         Note that this method will only return at most 100 flows,
         regardless of how many total flows are actually in the
@@ -601,19 +1211,149 @@ class Fwd(HTTPJSONApi):
         if the network has more flows than were returned in this
         response.
 
+        @param {bool} retain_header_space: Keep each hop's header space
+        (see Flow.from_json)
+        @return: FlowsResponse
+        '''
+        return self._get_flows_for_query(search_builder.canonical_json(),
+                                         snapshot_id, verbose,
+                                         retain_header_space)
+
+    def get_flows_batch(self, search_builders, snapshot_id,
+                        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                        verbose=False, retain_header_space=False,
+                        stream=False):
+        '''Run many flow searches concurrently
+
+        Searches with equal canonical queries are sent only once and
+        share their FlowsResponse. A failed search does not affect the
+        others: its BatchResult carries the exception instead.
+
+        @param {SearchBuilder[]} search_builders
+        @param {int} snapshot_id
+        @param {int} max_concurrency: Maximum number of searches in flight
+        @param {bool} retain_header_space: See get_flows
+        @param {bool} stream: If True, return a generator that yields
+        results as searches complete instead of a list
+        @return {BatchResult[] or generator}: One BatchResult per search
+        builder whose result is a FlowsResponse. Unless stream is set,
+        results are in the order of search_builders.
+        '''
+        search_builders = list(search_builders)
+        return self._get_flows_for_queries(
+            search_builders, [b.canonical_json() for b in search_builders],
+            snapshot_id, max_concurrency, verbose, retain_header_space,
+            stream)
+
+    def get_flows_prepared(self, prepared_search, bindings, snapshot_id,
+                           max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                           verbose=False, retain_header_space=False,
+                           stream=False):
+        '''Run a prepared search for many sets of values concurrently
+
+        @param {PreparedSearch} prepared_search
+        @param {iterable} bindings: See PreparedSearch.bind_many
+        @param {int} snapshot_id
+        @return {BatchResult[] or generator}: As for get_flows_batch,
+        with each binding as the request of its BatchResult
+        '''
+        bindings = list(bindings)
+        return self._get_flows_for_queries(
+            bindings, list(prepared_search.bind_many(bindings)),
+            snapshot_id, max_concurrency, verbose, retain_header_space,
+            stream)
+
+    def _get_flows_for_queries(self, requests, query_jsons, snapshot_id,
+                               max_concurrency, verbose, retain_header_space,
+                               stream):
+        '''Shared implementation of the batch flow searches
+
+        @param {list} requests: Batch items reported in BatchResults
+        @param {str[]} query_jsons: Canonical JSON query per request
+        '''
+        indices_by_query = {}
+        for i, query_json in enumerate(query_jsons):
+            indices_by_query.setdefault(query_json, []).append(i)
+
+        def get_flows_for_query(query_json):
+            return self._get_flows_for_query(query_json, snapshot_id,
+                                             verbose, retain_header_space)
+
+        def fan_out():
+            for query_result in run_concurrently(
+                    get_flows_for_query, indices_by_query.keys(),
+                    max_concurrency):
+                for i in indices_by_query[query_result.get_request()]:
+                    yield BatchResult(i, requests[i],
+                                      query_result.get_result(),
+                                      query_result.get_error())
+
+        if stream:
+            return fan_out()
+        results = list(fan_out())
+        results.sort(key=lambda r: r.get_index())
+        return results
+
+    def get_flows_sharded(self, shards, snapshot_id,
+                          max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                          verbose=False, retain_header_space=False,
+                          disjoint=False):
+        '''Run the shards of a search in parallel and merge their results
+
+        @param {SearchBuilder[]} shards: E.g., as generated by the
+        search_planner module
+        @param {int} snapshot_id
+        @param {int} max_concurrency: Maximum number of shards in flight
+        @param {bool} retain_header_space: See get_flows
+        @param {bool} disjoint: True if the shards match disjoint sets of
+        flows, e.g., if only split_by_device and split_by_flow_type
+        generated them
+        @return {FlowsResponse}: Merged response without the flows
+        returned by several shards, see FlowsResponse.merge. The total
+        flows of all shards are summed, which is an UPPER_BOUND unless
+        the shards are disjoint.
+        '''
+        results = self.get_flows_batch(shards, snapshot_id, max_concurrency,
+                                       verbose, retain_header_space)
+        for result in results:
+            if not result.is_success():
+                raise Exception('Error getting flows for shard %d of %d: %s'
+                                % (result.get_index(), len(results),
+                                   result.get_error()))
+        return FlowsResponse.merge((r.get_result() for r in results),
+                                   disjoint)
+
+    def _get_flows_for_query(self, query_json, snapshot_id, verbose=False,
+                             retain_header_space=False):
+        '''Run a flows search whose body is already serialized
+
+        @param {str} query_json: Canonical JSON query, e.g., the output of
+        SearchBuilder.canonical_json
         @return: FlowsResponse
         '''
+        cache_key = None
+        if self.search_cache is not None:
+            # Users may not see the same flows
+            cache_key = fingerprint([self.url.rstrip('/'), self.username,
+                                     query_json, retain_header_space])
+            cached = self.search_cache.get(snapshot_id, cache_key)
+            if cached is not None:
+                return cached
+
         headers = {
             'Content-type': 'application/json',
             'Accept': 'application/json, text/*',
         }
-        r = self.post('/api/snapshots/%d/flows' % (snapshot_id),
-                      data=json.dumps(search_builder.build_query()),
-                      verbose=verbose, headers=headers)
-        err_prefix = "Error getting flows: "
-        self.verify_status_code(r, err_prefix)
-        self.verify_json_error(r, err_prefix)
-        return FlowsResponse.from_json(r.json())
+        body = self._get_snapshot_data(
+            snapshot_id, '/api/snapshots/%d/flows' % (snapshot_id),
+            verbose=verbose, headers=headers, data=query_json,
+            err_prefix="Error getting flows: ")
+        flows_response = FlowsResponse.from_json(json.loads(body),
+                                                 retain_header_space)
+        if cache_key is not None:
+            self.search_cache.put(snapshot_id, cache_key, flows_response,
+                                  len(body))
+        return flows_response
 
     def take_snapshot(self, network_id, devices, verbose=False):
         """
@@ -700,8 +1440,9 @@ class Fwd(HTTPJSONApi):
         @return {Network}: Network object.
         '''
         url_suffix = '/api/networks/%d/snapshots' % network_id
-        response = self.get(url_suffix, verbose=verbose)
-        return Network.from_json(response.json())
+        return copy.copy(self.get_decoded(
+            url_suffix, lambda r: Network.from_json(r.json()),
+            verbose=verbose))
 
     def get_ifaces(self, snapshot_id, device_id, verbose=False):
         '''Get interfaces from device on target snapshot
@@ -713,10 +1454,42 @@ class Fwd(HTTPJSONApi):
         headers = {
             'Accept': 'application/json, text/*',
             }
-        response = self.get('/api/snapshots/' + str(snapshot_id) +
-                            '/devices/' + str(device_id) + '/interfaces',
-                            verbose=verbose, headers=headers)
-        return IfacesResponse.from_json(response.json())
+        url_suffix = ('/api/snapshots/' + str(snapshot_id) +
+                      '/devices/' + str(device_id) + '/interfaces')
+        return self._coalesce((url_suffix,), lambda: IfacesResponse.from_json(
+            json.loads(self._get_snapshot_data(snapshot_id, url_suffix,
+                                               verbose=verbose,
+                                               headers=headers))),
+            verbose=verbose)
+
+    def get_inventory(self, snapshot_id,
+                      max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                      retries=DEFAULT_RETRIES, verbose=False):
+        '''Get the devices of a snapshot and the interfaces of each
+
+        Interfaces are fetched concurrently. Devices whose interfaces
+        cannot be fetched are reported by Inventory.get_errors.
+
+        @param {int} snapshot_id
+        @param {int} max_concurrency: Maximum number of requests in flight
+        @param {int} retries: Retries per device of transient failures
+        @return {Inventory}
+        '''
+        devices_response = self.get_devices(snapshot_id, verbose)
+        ifaces_by_device_name = {}
+        errors_by_device_name = {}
+        for result in run_concurrently(
+                lambda d: self.get_ifaces(snapshot_id, d.get_id(), verbose),
+                devices_response.get_device_response_list(),
+                max_concurrency=max_concurrency, retries=retries,
+                retry_if=is_transient_error):
+            device_name = result.get_request().get_name()
+            if result.is_success():
+                ifaces_by_device_name[device_name] = result.get_result()
+            else:
+                errors_by_device_name[device_name] = result.get_error()
+        return Inventory(devices_response, ifaces_by_device_name,
+                         errors_by_device_name)
 
     def get_devices(self, snapshot_id, verbose=False):
         '''Get devices from target snapshot
@@ -727,9 +1500,12 @@ class Fwd(HTTPJSONApi):
         headers = {
             'Accept': 'application/json, text/*',
             }
-        response = self.get('/api/snapshots/' + str(snapshot_id) + '/devices/',
-                            verbose=verbose, headers=headers)
-        return DevicesResponse.from_json(response.json())
+        url_suffix = '/api/snapshots/' + str(snapshot_id) + '/devices/'
+        return self._coalesce((url_suffix,), lambda: DevicesResponse.from_json(
+            json.loads(self._get_snapshot_data(snapshot_id, url_suffix,
+                                               verbose=verbose,
+                                               headers=headers))),
+            verbose=verbose)
 
     def get_notifications(self, max=10, verbose=False):
         '''Gets up to max of the logged-in user's notifications
@@ -737,17 +1513,67 @@ class Fwd(HTTPJSONApi):
         headers = {
             'Accept': 'application/json, text/*',
             }
-        response = self.get('/api/notifications?max=' + str(max), verbose=verbose, headers=headers)
-        return Notification.from_json(response.json())
+        return copy.copy(self.get_decoded(
+            '/api/notifications?max=' + str(max),
+            lambda r: Notification.from_json(r.json()),
+            verbose=verbose, headers=headers))
 
-    def get_checks(self, snapshot_id, verbose=False):
+    def get_checks(self, snapshot_id, verbose=False, keep_raw_json=True):
         '''Gets all checks of a snapshot
+
+        @param {bool} keep_raw_json: See NetworkCheckResult.from_json
         '''
+        url_suffix = '/api/snapshots/%d/checks' % snapshot_id
+        if not self.conditional_requests:
+            # Same key as get_decoded
+            return list(self._coalesce(
+                (url_suffix, (), keep_raw_json),
+                lambda: list(self.iter_checks(snapshot_id, keep_raw_json,
+                                              verbose=verbose)),
+                verbose=verbose, reuse=False))
         headers = {
             'Accept': 'application/json, text/*',
             }
-        response = self.get('/api/snapshots/' + str(snapshot_id) + '/checks', verbose=verbose, headers=headers)
-        checks = []
-        for check in response.json():
-            checks.append(NetworkCheckResult.from_json(check))
-        return checks
+        return list(self.get_decoded(
+            url_suffix,
+            lambda r: [NetworkCheckResult.from_json(c, keep_raw_json)
+                       for c in r.json()],
+            verbose=verbose, headers=headers, decode_key=keep_raw_json,
+            reuse=False))
+
+    def iter_checks(self, snapshot_id, keep_raw_json=False,
+                    hash_definitions=False, verbose=False):
+        '''Stream the checks of a snapshot
+
+        Unlike get_checks, only the id, name, type and status of each
+        check are kept by default.
+
+        @param {int} snapshot_id
+        @param {bool} keep_raw_json: See NetworkCheckResult.from_json
+        @param {bool} hash_definitions: See NetworkCheckResult.from_json
+        @return {generator}: Yields a NetworkCheckResult per check
+        '''
+        for check_json in self.iter_checks_json(snapshot_id, verbose):
+            yield NetworkCheckResult.from_json(check_json, keep_raw_json,
+                                               hash_definitions)
+
+    def iter_checks_json(self, snapshot_id, verbose=False):
+        '''Stream the checks of a snapshot as returned by the server
+
+        @param {int} snapshot_id
+        @return {generator}: Yields the JSON dictionary of each check,
+        decoding the response incrementally
+        '''
+        headers = {
+            'Accept': 'application/json, text/*',
+            }
+        response = self.request('get',
+                                '/api/snapshots/%d/checks' % snapshot_id,
+                                verbose=verbose, headers=headers,
+                                stream=True)
+        try:
+            for check_json in iter_json_array(
+                    response.iter_content(CHUNK_SIZE)):
+                yield check_json
+        finally:
+            response.close()
@@ -1,16 +1,135 @@
 import abc
+import weakref
+
+import canonical
+from prefix_set import PrefixSet, is_prefix
+
+
+class _FilterMeta(abc.ABCMeta):
+    """Freezes filters once their constructor returns
+    """
+
+    def __call__(cls, *args, **kwargs):
+        obj = super(_FilterMeta, cls).__call__(*args, **kwargs)
+        object.__setattr__(obj, '_frozen', True)
+        return obj
 
 
 class Filter(object):
     """Parent class for objects that restrict results returned by server
+
+    Filters are immutable. Their canonical JSON form is serialized once
+    and cached, and filters compare and hash by it, so structurally
+    equal filters are interchangeable.
     """
-    __metaclass__ = abc.ABCMeta
+    __metaclass__ = _FilterMeta
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get('_frozen'):
+            raise AttributeError('%s is immutable' % type(self).__name__)
+        object.__setattr__(self, name, value)
+
+    def _cache(self, name, compute):
+        value = self.__dict__.get(name)
+        if value is None:
+            value = compute()
+            object.__setattr__(self, name, value)
+        return value
 
     @abc.abstractmethod
     def as_dict(self):
         """Return json-izable dictionary of a filter
         """
 
+    def as_json(self):
+        """Return canonical JSON serialization of a filter (see
+        canonical.canonical_json)
+        """
+        return self._cache(
+            '_json', lambda: canonical.canonical_json(self.as_dict()))
+
+    def fingerprint(self):
+        """Return stable hash that is equal for equal filters
+        """
+        return self._cache(
+            '_fingerprint', lambda: canonical.fingerprint_json(self.as_json()))
+
+    def __eq__(self, other):
+        return (type(self) is type(other) and
+                self.as_json() == other.as_json())
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.as_json())
+
+
+# Canonical instance of every interned filter, by type and JSON form
+_interned_filters = weakref.WeakValueDictionary()
+
+
+def intern_filter(f):
+    """Return the canonical instance of filters equal to f
+
+    Interning lets filters that are reused across many checks or
+    searches share one object, and with it their cached serialized
+    forms.
+
+    @param {Filter} f: Can be None
+    @return {Filter}
+    """
+    if f is None:
+        return None
+    key = (type(f), f.as_json())
+    interned = _interned_filters.get(key)
+    if interned is None:
+        _interned_filters[key] = interned = f
+    return interned
+
+
+class Placeholder(object):
+    """Stands in for a packet field value that is supplied later, when
+    a prepared_search.PreparedSearch is bound
+    """
+
+    def __init__(self, name, ipv6=False):
+        """
+        @param {str} name: Name used to bind a value to this placeholder
+        @param {bool} ipv6: For IP address fields, whether bound values
+        are IPv6 rather than IPv4 addresses
+        """
+        self._name = name
+        self._ipv6 = ipv6
+
+    def get_name(self):
+        return self._name
+
+    def is_ipv6(self):
+        return self._ipv6
+
+    def _canonical_form(self):
+        return {'placeholder': self._name, 'ipv6': self._ipv6}
+
+    def __eq__(self, other):
+        return (isinstance(other, Placeholder) and
+                self._name == other._name and self._ipv6 == other._ipv6)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self._name, self._ipv6))
+
+    def __repr__(self):
+        return 'Placeholder(%r)' % self._name
+
+
+def _is_ipv6_value(val):
+    if isinstance(val, Placeholder):
+        return val.is_ipv6()
+    return ':' in val
+
 
 class _PacketField(object):
     """Parent class for all packet headers
@@ -18,11 +137,17 @@ class _PacketField(object):
     def __init__(self, field_name, val):
         """
         @param {str} field_name
-        @param {int or str} val
+        @param {int or str or Placeholder} val
         """
         self._field_name = field_name
         self._val = val
 
+    def get_field_name(self):
+        return self._field_name
+
+    def get_value(self):
+        return self._val
+
     def add_clauses_to_packet_filter_dict(self, d):
         """Add any clauses for this field to the passed-in dictionary
         @param {dict} d
@@ -30,6 +155,17 @@ class _PacketField(object):
         d[self._field_name] = [self._val]
         return d
 
+    def __eq__(self, other):
+        return (type(self) is type(other) and
+                self._field_name == other._field_name and
+                self._val == other._val)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((type(self), self._field_name, self._val))
+
 
 class IpSrcField(_PacketField):
     def __init__(self, val):
@@ -37,7 +173,7 @@ class IpSrcField(_PacketField):
         @param {str} val
         """
         super(IpSrcField, self).__init__(
-            'ipv6_src' if ':' in val else 'ipv4_src', val)
+            'ipv6_src' if _is_ipv6_value(val) else 'ipv4_src', val)
 
 
 class IpDstField(_PacketField):
@@ -46,7 +182,7 @@ class IpDstField(_PacketField):
         @param {str} val
         """
         super(IpDstField, self).__init__(
-            'ipv6_dst' if ':' in val else 'ipv4_dst', val)
+            'ipv6_dst' if _is_ipv6_value(val) else 'ipv4_dst', val)
 
 
 class IpProtoField(_PacketField):
@@ -179,6 +315,15 @@ class HostFilter(LocationFilter):
             'values': [self._host_specifier],
         }
 
+    def get_prefix_set(self):
+        """
+        @return {prefix_set.PrefixSet}: Addresses matched by the filter
+        if it is an IP address or block, otherwise an empty set
+        """
+        if is_prefix(self._host_specifier):
+            return PrefixSet([self._host_specifier])
+        return PrefixSet()
+
 
 class DeviceFilter(LocationFilter):
     """Location filter restricting search to a specific device
@@ -268,7 +413,7 @@ class NotFilter(Filter):
     """
 
     def __init__(self, clause):
-        self._clause = clause
+        self._clause = intern_filter(clause)
 
     def as_dict(self):
         return {
@@ -287,8 +432,8 @@ class EndpointFilter(Filter):
 
         Note one of location or headers must be specified.
         """
-        self._location = location
-        self._headers = list(headers) if headers else None
+        self._location = intern_filter(location)
+        self._headers = map(intern_filter, headers) if headers else None
         if self._location is None and self._headers is None:
             raise ValueError('Cannot create EndpointFilter with empty ' +
                              'location and headers')
@@ -300,5 +445,5 @@ class EndpointFilter(Filter):
         if self._location:
             result['location'] = self._location.as_dict()
         if self._headers:
-            result['headers'] = map(lambda h: h.as_dict(), self._headers)
+            result['headers'] = [h.as_dict() for h in self._headers]
         return result
@@ -0,0 +1,376 @@
+'''
+Compact ternary bitvector encoding of the header spaces (in_hs/out_hs)
+that the Forward server attaches to every hop of a flow.
+
+A header space is a union of "minuend" cubes minus a union of
+"subtrahend" cubes. Each cube is a (value, mask) pair of integers
+that packs every supported header field at a fixed bit offset (see
+FIELD_LAYOUT); a mask bit of 1 means the corresponding value bit is
+significant, a 0 means "don't care".
+'''
+
+import addr
+
+# (field name, width in bits). vlan_vid uses the OpenFlow encoding: bit
+# 12 is set for tagged packets, so "untagged" is 0 with all bits
+# significant.
+FIELD_LAYOUT = [
+    ('eth_type', 16),
+    ('ip_version', 4),
+    ('vlan_vid', 13),
+    ('vlan_pcp', 3),
+    ('vlan_dei', 1),
+    ('mac_src', addr.MAC_BITS),
+    ('mac_dst', addr.MAC_BITS),
+    ('ipv4_src', addr.IPV4_BITS),
+    ('ipv4_dst', addr.IPV4_BITS),
+    ('ipv6_src', addr.IPV6_BITS),
+    ('ipv6_dst', addr.IPV6_BITS),
+    ('ip_proto', 8),
+    ('tp_src', 16),
+    ('tp_dst', 16),
+    ('icmp_type', 8),
+    ('icmp_code', 8),
+]
+
+FIELD_NAMES = frozenset(name for name, _ in FIELD_LAYOUT)
+
+VLAN_PRESENT = 0x1000
+VLAN_UNTAGGED = 'untagged'
+
+_FIELD_WIDTHS = dict(FIELD_LAYOUT)
+_FIELD_OFFSETS = {}
+_offset = 0
+for _name, _width in reversed(FIELD_LAYOUT):
+    _FIELD_OFFSETS[_name] = _offset
+    _offset += _width
+del _name, _width, _offset
+
+# A cube matching every packet
+FULL_CUBE = (0, 0)
+
+
+def _range_to_prefixes(lo, hi, width):
+    '''Split the inclusive range [lo, hi] into (value, mask) prefixes.
+    '''
+    full = (1 << width) - 1
+    result = []
+    while lo <= hi:
+        # Largest aligned block starting at lo that fits in the range
+        size = lo & -lo if lo else 1 << width
+        while lo + size - 1 > hi:
+            size >>= 1
+        result.append((lo, full & ~(size - 1)))
+        lo += size
+    return result
+
+
+def _parse_int_token(token, width):
+    '''
+    @return {list}: (value, mask) pairs in field-local bit positions
+    '''
+    full = (1 << width) - 1
+    if '-' in token:
+        lo_str, hi_str = token.split('-', 1)
+        lo, hi = int(lo_str, 0), int(hi_str, 0)
+    else:
+        lo = hi = int(token, 0)
+    if lo < 0 or hi > full or lo > hi:
+        raise ValueError('Value %s out of range' % token)
+    if lo == hi:
+        return [(lo, full)]
+    return _range_to_prefixes(lo, hi, width)
+
+
+def _parse_token(field_name, token):
+    width = _FIELD_WIDTHS[field_name]
+    full = (1 << width) - 1
+    if token in ('*', 'any'):
+        return [(0, 0)]
+    if field_name in ('ipv4_src', 'ipv4_dst', 'ipv6_src', 'ipv6_dst'):
+        bits, value, prefix_len = addr.parse_prefix(token)
+        if bits != width:
+            raise ValueError('Address family mismatch for %s: %s' %
+                             (field_name, token))
+        return [(value, addr.prefix_mask(bits, prefix_len))]
+    if field_name in ('mac_src', 'mac_dst'):
+        return [(addr.parse_mac(token), full)]
+    if field_name == 'vlan_vid':
+        if token == VLAN_UNTAGGED:
+            return [(0, full)]
+        return [(VLAN_PRESENT | value, VLAN_PRESENT | mask)
+                for value, mask in _parse_int_token(token, width - 1)]
+    return _parse_int_token(token, width)
+
+
+def _parse_field(field_name, field_value):
+    '''
+    @param {str} field_name
+    @param {str or list} field_value: Comma-separated string of values,
+    as returned by the server, or a list of values.
+    @return {list}: (value, mask) pairs shifted into field position
+    '''
+    if isinstance(field_value, (list, tuple)):
+        tokens = [str(v) for v in field_value]
+    else:
+        tokens = str(field_value).split(',')
+    offset = _FIELD_OFFSETS[field_name]
+    result = []
+    for token in tokens:
+        for value, mask in _parse_token(field_name, token.strip()):
+            result.append((value << offset, mask << offset))
+    return result
+
+
+def check_field_value(field_name, field_value):
+    '''Raise ValueError unless field_value is valid for field_name
+
+    Fields that are not in FIELD_LAYOUT (e.g., in_port or ip_dscp) are
+    valid header fields that this module does not model; their values
+    are not checked.
+
+    @param {str} field_name
+    @param {str or list} field_value: See _parse_field
+    '''
+    if field_name in _FIELD_WIDTHS:
+        _parse_field(field_name, field_value)
+
+
+def _cubes_from_fields(fields_dict):
+    '''
+    @return {tuple}: (cubes, exact). Fields that are not in
+    FIELD_LAYOUT (e.g., in_port or metadata) are ignored; values that
+    cannot be encoded (e.g., symbolic "host_mac") leave the field
+    unconstrained and make the result inexact.
+    '''
+    cubes = [FULL_CUBE]
+    exact = True
+    for field_name, field_value in fields_dict.iteritems():
+        if field_name not in _FIELD_WIDTHS:
+            continue
+        try:
+            field_cubes = _parse_field(field_name, field_value)
+        except ValueError:
+            exact = False
+            continue
+        cubes = [(value | f_value, mask | f_mask)
+                 for value, mask in cubes
+                 for f_value, f_mask in field_cubes]
+    return cubes, exact
+
+
+def _intersect(a, b):
+    '''
+    @return {tuple or None}: Intersection of cubes a and b, or None if
+    they are disjoint.
+    '''
+    a_value, a_mask = a
+    b_value, b_mask = b
+    if (a_value ^ b_value) & a_mask & b_mask:
+        return None
+    return (a_value | b_value, a_mask | b_mask)
+
+
+def _is_subset(a, b):
+    '''
+    @return {bool}: True if cube a is contained in cube b
+    '''
+    a_value, a_mask = a
+    b_value, b_mask = b
+    return not (b_mask & ~a_mask) and not ((a_value ^ b_value) & b_mask)
+
+
+def _subtract(a, b):
+    '''
+    @return {list}: Disjoint cubes covering a \\ b
+    '''
+    if _intersect(a, b) is None:
+        return [a]
+    if _is_subset(a, b):
+        return []
+    b_value, b_mask = b
+    value, mask = a
+    free = b_mask & ~mask
+    result = []
+    while free:
+        bit = free & -free
+        # Packets that differ from b on this bit and agree with b on
+        # every bit handled so far
+        result.append((value | (bit & ~b_value), mask | bit))
+        value |= b_value & bit
+        mask |= bit
+        free ^= bit
+    return result
+
+
+def _subtract_all(cubes, subtrahend):
+    remaining = list(cubes)
+    for sub in subtrahend:
+        if not remaining:
+            break
+        next_remaining = []
+        for cube in remaining:
+            next_remaining.extend(_subtract(cube, sub))
+        remaining = next_remaining
+    return remaining
+
+
+class HeaderSpace(object):
+    """Set of packet headers encoded as ternary bitvectors
+
+    Note that header spaces are immutable; operations return new
+    objects.
+    """
+
+    def __init__(self, minuend, subtrahend=(), exact=True):
+        """
+        @param {tuple[]} minuend: (value, mask) cubes whose union is
+        included in this header space
+        @param {tuple[]} subtrahend: (value, mask) cubes whose union is
+        excluded from this header space
+        @param {bool} exact: False if some server values could not be
+        encoded, in which case this header space over-approximates the
+        server's.
+        """
+        self._minuend = tuple(minuend)
+        self._subtrahend = tuple(subtrahend)
+        self._exact = exact
+
+    @classmethod
+    def from_json(cls, hs_json, cache=None):
+        """
+        @param {dict} hs_json: E.g., the "in_hs" entry of a hop, with
+        "minuend" and "subtrahend" keys
+        @param {dict} cache [optional]: Used to share HeaderSpace
+        objects between identical hs_json values.
+        """
+        if cache is not None:
+            key = (tuple(sorted(hs_json['minuend'].iteritems())),
+                   tuple(tuple(sorted(s.iteritems()))
+                         for s in hs_json['subtrahend']))
+            cached = cache.get(key)
+            if cached is None:
+                cached = cache[key] = cls.from_json(hs_json)
+            return cached
+
+        minuend, exact = _cubes_from_fields(hs_json['minuend'])
+        subtrahend = []
+        for sub_json in hs_json['subtrahend']:
+            sub_cubes, sub_exact = _cubes_from_fields(sub_json)
+            if not sub_exact:
+                # Dropping a term we cannot encode keeps the result an
+                # over-approximation.
+                exact = False
+                continue
+            subtrahend.extend(sub_cubes)
+        return cls(minuend, subtrahend, exact)
+
+    @classmethod
+    def from_fields(cls, fields_dict):
+        """
+        Example: HeaderSpace.from_fields({'ipv4_dst': '10.0.0.0/8',
+                                          'tp_dst': ['80', '443']})
+
+        @param {dict} fields_dict: Field name to value, comma-separated
+        values or list of values
+        """
+        for field_name in fields_dict:
+            if field_name not in _FIELD_WIDTHS:
+                raise ValueError('Unsupported header field: %s' % field_name)
+        cubes = [FULL_CUBE]
+        for field_name, field_value in fields_dict.iteritems():
+            field_cubes = _parse_field(field_name, field_value)
+            cubes = [(value | f_value, mask | f_mask)
+                     for value, mask in cubes
+                     for f_value, f_mask in field_cubes]
+        return cls(cubes)
+
+    @classmethod
+    def all(cls):
+        return cls([FULL_CUBE])
+
+    def get_minuend(self):
+        return list(self._minuend)
+
+    def get_subtrahend(self):
+        return list(self._subtrahend)
+
+    def is_exact(self):
+        return self._exact
+
+    def intersect(self, other):
+        """
+        @param {HeaderSpace} other
+        @return {HeaderSpace}
+        """
+        minuend = []
+        for a in self._minuend:
+            for b in other._minuend:
+                cube = _intersect(a, b)
+                if cube is not None:
+                    minuend.append(cube)
+        return HeaderSpace(minuend, self._subtrahend + other._subtrahend,
+                           self._exact and other._exact)
+
+    def subtract(self, other):
+        """
+        @param {HeaderSpace} other
+        @return {HeaderSpace}
+        """
+        # (A - X) - (B - Y) = (A - X - B) + (A - X) & Y
+        remaining = _subtract_all(self._minuend, self._subtrahend)
+        minuend = _subtract_all(remaining, other._minuend)
+        for cube in remaining:
+            for sub in other._subtrahend:
+                overlap = _intersect(cube, sub)
+                if overlap is not None:
+                    minuend.append(overlap)
+        return HeaderSpace(minuend, (), self._exact and other._exact)
+
+    def is_empty(self):
+        for cube in self._minuend:
+            relevant = [s for s in self._subtrahend
+                        if _intersect(cube, s) is not None]
+            if _subtract_all([cube], relevant):
+                return False
+        return True
+
+    def intersects(self, other):
+        """
+        @return {bool}: True if some packet is in both header spaces
+        """
+        return not self.intersect(other).is_empty()
+
+    def is_subset(self, other):
+        """
+        @return {bool}: True if every packet in this header space is
+        also in other
+        """
+        remaining = _subtract_all(self._minuend, self._subtrahend)
+        if _subtract_all(remaining, other._minuend):
+            return False
+        for cube in remaining:
+            for sub in other._subtrahend:
+                if _intersect(cube, sub) is not None:
+                    return False
+        return True
+
+    def contains(self, other):
+        """
+        @return {bool}: True if every packet in other is also in this
+        header space
+        """
+        return other.is_subset(self)
+
+    def __eq__(self, other):
+        return (isinstance(other, HeaderSpace) and
+                self._exact == other._exact and
+                set(self._minuend) == set(other._minuend) and
+                set(self._subtrahend) == set(other._subtrahend))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((frozenset(self._minuend), frozenset(self._subtrahend),
+                     self._exact))
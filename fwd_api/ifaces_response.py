@@ -5,6 +5,7 @@ class IfaceResponse(object):
     def __init__(self, primary_name, alias_names, member_ports):
         self._primary_name = primary_name
         self._alias_names = list(alias_names)
+        self._alias_name_set = frozenset(self._alias_names)
         self._member_ports = list(member_ports)
 
     @classmethod
@@ -15,7 +16,16 @@ class IfaceResponse(object):
             json_dict['memberPorts'] if 'memberPorts' in json_dict else [])
 
     def matches_name(self, name):
-        return name in self._alias_names
+        return name in self._alias_name_set
+
+    def get_primary_name(self):
+        return self._primary_name
+
+    def get_alias_names(self):
+        return list(self._alias_names)
+
+    def get_member_port_names(self):
+        return list(self._member_ports)
 
     def get_member_ports(self, device_name):
         """
@@ -37,15 +47,29 @@ class IfacesResponse(object):
         @param {IfaceResponse[]} iface_response_list
         """
         self._iface_response_list = list(iface_response_list)
+        # First interface of each alias name and member port, as found
+        # by a linear scan
+        self._by_alias_name = {}
+        self._by_member_port = {}
+        for iface_response in reversed(self._iface_response_list):
+            for name in iface_response.get_alias_names():
+                self._by_alias_name[name] = iface_response
+            for port in iface_response.get_member_port_names():
+                self._by_member_port[port] = iface_response
 
     def get_iface_response_list(self):
         return list(self._iface_response_list)
 
     def get_by_iface_name(self, iface_name):
-        for iface_response in self._iface_response_list:
-            if iface_response.matches_name(iface_name):
-                return iface_response
-        return None
+        return self._by_alias_name.get(iface_name)
+
+    def get_parent_by_member_port(self, member_port_name):
+        """
+        @param {str} member_port_name
+        @return {IfaceResponse or None}: Port channel (or other aggregate
+        interface) having member_port_name as member port
+        """
+        return self._by_member_port.get(member_port_name)
 
     @classmethod
     def from_json(cls, json_dict):
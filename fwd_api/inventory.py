@@ -0,0 +1,98 @@
+'''
+Indexed inventory of the devices and interfaces of a snapshot, as
+returned by Fwd.get_inventory.
+
+    inventory = fwd.get_inventory(snapshot_id)
+    inventory.to_device_iface_pair('veos-0', 'ethernet1')
+    # DeviceIfacePair('veos-0', 'et1')
+'''
+
+
+class Inventory(object):
+    """Devices of a snapshot and their interfaces
+    """
+
+    def __init__(self, devices_response, ifaces_by_device_name,
+                 errors_by_device_name=None):
+        """
+        @param {DevicesResponse} devices_response
+        @param {dict} ifaces_by_device_name: IfacesResponse by device name
+        @param {dict} errors_by_device_name [optional]: Exceptions raised
+        fetching the interfaces of devices missing from
+        ifaces_by_device_name
+        """
+        self._devices_response = devices_response
+        self._ifaces_by_device_name = dict(ifaces_by_device_name)
+        self._errors_by_device_name = dict(errors_by_device_name or {})
+
+    def get_devices_response(self):
+        return self._devices_response
+
+    def get_device(self, device_name):
+        """
+        @return {DeviceResponse or None} if device does not exist
+        """
+        return self._devices_response.get_device_response_by_name(
+            device_name)
+
+    def get_device_names(self):
+        return [d.get_name()
+                for d in self._devices_response.get_device_response_list()]
+
+    def get_ifaces(self, device_name):
+        """
+        @return {IfacesResponse or None}: None if the device does not
+        exist or its interfaces could not be fetched
+        """
+        return self._ifaces_by_device_name.get(device_name)
+
+    def get_errors(self):
+        """
+        @return {dict}: Exceptions raised fetching interfaces, by device
+        name
+        """
+        return dict(self._errors_by_device_name)
+
+    def is_complete(self):
+        return not self._errors_by_device_name
+
+    def get_iface(self, device_name, iface_name):
+        """
+        @param {str} iface_name: Any name of the interface, e.g., "et1" or
+        "ethernet1"
+        @return {IfaceResponse or None}
+        """
+        ifaces = self.get_ifaces(device_name)
+        if ifaces is None:
+            return None
+        return ifaces.get_by_iface_name(iface_name)
+
+    def to_device_iface_pair(self, device_name, iface_name):
+        """
+        @return {DeviceIfacePair or None}: Pair with the primary name of
+        the interface
+        """
+        iface = self.get_iface(device_name, iface_name)
+        if iface is None:
+            return None
+        return iface.to_device_iface_pair(device_name)
+
+    def get_member_ports(self, device_name, iface_name):
+        """
+        @return {DeviceIfaceListPair or None}: Member ports of an
+        aggregate interface such as a port channel
+        """
+        iface = self.get_iface(device_name, iface_name)
+        if iface is None:
+            return None
+        return iface.get_member_ports(device_name)
+
+    def get_port_channel(self, device_name, member_port_name):
+        """
+        @return {IfaceResponse or None}: Aggregate interface having
+        member_port_name as member port
+        """
+        ifaces = self.get_ifaces(device_name)
+        if ifaces is None:
+            return None
+        return ifaces.get_parent_by_member_port(member_port_name)
@@ -0,0 +1,168 @@
+'''
+Incremental decoding of JSON arrays, one element at a time.
+
+    response = session.get(url, stream=True)
+    for element in iter_json_array(response.iter_content(CHUNK_SIZE)):
+        ...
+
+Only the element being decoded and the current chunk are held in
+memory. The end of each element is found by scanning every byte once,
+and the element is then decoded once, so elements spanning many chunks
+cost time linear in their size.
+'''
+
+import json
+import re
+
+# Size, in bytes, of the chunks read from streamed responses
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Characters that change the scanner's state outside and inside strings
+_STRUCTURAL = re.compile(r'[\[\]{}"]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+# Characters that end numbers, true, false and null
+_SCALAR_END = re.compile(r'[ \t\n\r,\]}]')
+
+
+class _Reader(object):
+    '''Reads JSON values from an iterator of string chunks
+    '''
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buf = ''
+        self._pos = 0
+        self._decoder = json.JSONDecoder()
+
+    def _next_chunk(self):
+        '''Replace the buffer, which must be consumed, by the next
+        non-empty chunk
+
+        @return {bool}: False at the end of the input
+        '''
+        for chunk in self._chunks:
+            if chunk:
+                self._buf = chunk
+                self._pos = 0
+                return True
+        self._buf = ''
+        self._pos = 0
+        return False
+
+    def peek(self):
+        '''
+        @return {str}: Next non-whitespace character, or '' at the end of
+        the input
+        '''
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._next_chunk():
+                return ''
+
+    def expect(self, chars):
+        '''Consume the next non-whitespace character
+
+        @param {str} chars: Characters allowed next
+        @return {str}: The consumed character
+        '''
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError('Expected one of %r in JSON array, found %r' %
+                             (chars, c))
+        self._pos += 1
+        return c
+
+    def _scan_value(self):
+        '''Consume the value starting at the next non-whitespace
+        character
+
+        @return {str}: Text of the value
+        '''
+        first = self.peek()
+        is_scalar = first not in '[{"'
+        parts = []
+        depth = 0
+        in_string = False
+        # True if the previous chunk ended with a backslash in a string
+        escaped = False
+        start = scan = self._pos
+        while True:
+            buf = self._buf
+            if escaped:
+                scan += 1
+                escaped = False
+            end = None
+            while end is None and scan < len(buf):
+                if is_scalar:
+                    m = _SCALAR_END.search(buf, scan)
+                    if m is None:
+                        break
+                    end = m.start()
+                    break
+                regex = _STRING_SPECIAL if in_string else _STRUCTURAL
+                m = regex.search(buf, scan)
+                if m is None:
+                    break
+                c = m.group()
+                scan = m.end()
+                if in_string:
+                    if c == '\\':
+                        if scan == len(buf):
+                            escaped = True
+                        else:
+                            scan += 1
+                    else:
+                        in_string = False
+                        if depth == 0:
+                            end = scan
+                elif c == '"':
+                    in_string = True
+                elif c in '[{':
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        end = scan
+            if end is not None:
+                parts.append(buf[start:end])
+                self._pos = end
+                return ''.join(parts)
+            parts.append(buf[start:])
+            self._pos = len(buf)
+            if not self._next_chunk():
+                if is_scalar:
+                    return ''.join(parts)
+                raise ValueError('Unterminated value in JSON array')
+            start = scan = 0
+
+    def decode_value(self):
+        text = self._scan_value()
+        value, end = self._decoder.raw_decode(text)
+        if end != len(text):
+            raise ValueError('Invalid value in JSON array: %r' %
+                             text[:100])
+        return value
+
+
+def iter_json_array(chunks):
+    '''
+    @param {iterable} chunks: Strings that concatenate to a JSON array,
+    e.g., requests.Response.iter_content(CHUNK_SIZE)
+    @return {generator}: Yields the decoded elements of the array
+    '''
+    reader = _Reader(chunks)
+    reader.expect('[')
+    if reader.peek() == ']':
+        reader.expect(']')
+    else:
+        while True:
+            yield reader.decode_value()
+            if reader.expect(',]') == ']':
+                break
+    if reader.peek():
+        raise ValueError('Extra data after JSON array')
@@ -0,0 +1,220 @@
+'''
+Local evaluation of search filters against flows that were already
+fetched from the server.
+
+Filters are compiled from their json-izable dictionary form (see
+fwd_filter) into predicates over flow.Flow objects, so the same
+filters that scope a server search can refine its result in-process:
+
+    predicate = compile_search(search_builder)
+    matching = filter_flows(flows_response.get_flows_list(), predicate)
+
+Header filters are evaluated against the header spaces retained with
+retain_header_space=True. Filters that need server-side state (host
+filters and alias filters) cannot be evaluated locally and raise
+ValueError at compile time.
+'''
+
+from header_space import HeaderSpace
+
+FROM = 'from'
+TO = 'to'
+
+_LOCATION_TYPES = set(['DeviceFilter', 'InterfaceFilter', 'HostFilter',
+                       'HostAliasFilter', 'DeviceAliasFilter',
+                       'InterfaceAliasFilter'])
+_HEADER_TYPES = set(['PacketFilter', 'PacketAliasFilter'])
+
+
+def _as_dict(filter_or_dict):
+    if isinstance(filter_or_dict, dict):
+        return filter_or_dict
+    return filter_or_dict.as_dict()
+
+
+def _innermost_type(filter_dict):
+    while filter_dict['type'] == 'NotFilter':
+        filter_dict = filter_dict['clause']
+    return filter_dict['type']
+
+
+def _endpoint_hop(flow, endpoint):
+    hops = flow.get_unexploded_path().get_hop_list()
+    if not hops:
+        return None, None
+    if endpoint == FROM:
+        return 0, hops[0]
+    return len(hops) - 1, hops[-1]
+
+
+def _endpoint_pair(hop, endpoint):
+    '''
+    @return {DeviceIfaceListPair or None}: Where packets enter the
+    network for FROM and where they leave it for TO.
+    '''
+    if endpoint == FROM:
+        return hop.get_ingress()
+    return hop.get_egress()
+
+
+def _endpoint_header_space(flow, endpoint):
+    hop_index, hop = _endpoint_hop(flow, endpoint)
+    if hop is None:
+        return None
+    if endpoint == TO:
+        egress = flow.get_egress_header_space(hop_index)
+        if egress is not None:
+            return egress
+    return flow.get_ingress_header_space(hop_index)
+
+
+def _compile_location(location_dict, endpoint):
+    '''
+    @return {function}: Predicate over flows
+    '''
+    filter_type = location_dict['type']
+    if filter_type == 'NotFilter':
+        clause = _compile_location(location_dict['clause'], endpoint)
+        return lambda flow: not clause(flow)
+
+    if filter_type == 'DeviceFilter':
+        device_names = frozenset(location_dict['values'])
+
+        def device_matches(flow):
+            hop = _endpoint_hop(flow, endpoint)[1]
+            # A flow's device is the same on ingress and egress of a hop
+            return (hop is not None and
+                    hop.get_ingress().get_device_name() in device_names)
+        return device_matches
+
+    if filter_type == 'InterfaceFilter':
+        device_ifaces = frozenset(tuple(v.split(' ', 1))
+                                  for v in location_dict['values'])
+
+        def iface_matches(flow):
+            hop = _endpoint_hop(flow, endpoint)[1]
+            pair = None if hop is None else _endpoint_pair(hop, endpoint)
+            if pair is None:
+                return False
+            device_name = pair.get_device_name()
+            for iface_name in pair.get_iface_names_list():
+                if (device_name, iface_name) in device_ifaces:
+                    return True
+            return False
+        return iface_matches
+
+    raise ValueError('%s cannot be evaluated locally' % filter_type)
+
+
+def _compile_header(header_dict):
+    '''
+    @return {tuple}: (negated, HeaderSpace)
+    '''
+    negated = False
+    while header_dict['type'] == 'NotFilter':
+        negated = not negated
+        header_dict = header_dict['clause']
+    if header_dict['type'] != 'PacketFilter':
+        raise ValueError('%s cannot be evaluated locally' %
+                         header_dict['type'])
+    return negated, HeaderSpace.from_fields(header_dict['values'])
+
+
+def _compile_headers(header_dicts, endpoint):
+    clauses = [_compile_header(h) for h in header_dicts]
+
+    def headers_match(flow):
+        hs = _endpoint_header_space(flow, endpoint)
+        if hs is None:
+            return False
+        for negated, clause in clauses:
+            if negated:
+                hs = hs.subtract(clause)
+            else:
+                hs = hs.intersect(clause)
+        return not hs.is_empty()
+    return headers_match
+
+
+def compile_endpoint_filter(filter_or_dict, endpoint):
+    '''
+    @param {Filter or dict} filter_or_dict: An EndpointFilter, or a
+    bare location or header filter, or the dictionary form of one.
+    @param {str} endpoint: FROM or TO
+    @return {function}: Predicate that takes a flow.Flow and returns
+    True if the flow matches the filter at the given endpoint
+    '''
+    if endpoint not in (FROM, TO):
+        raise ValueError('endpoint must be one of %s or %s' % (FROM, TO))
+    filter_dict = _as_dict(filter_or_dict)
+    location = None
+    headers = []
+    if filter_dict['type'] == 'EndpointFilter':
+        location = filter_dict.get('location')
+        headers = filter_dict.get('headers') or []
+    elif _innermost_type(filter_dict) in _HEADER_TYPES:
+        headers = [filter_dict]
+    elif _innermost_type(filter_dict) in _LOCATION_TYPES:
+        location = filter_dict
+    else:
+        raise ValueError('%s cannot be evaluated locally' %
+                         filter_dict['type'])
+
+    predicates = []
+    if location:
+        predicates.append(_compile_location(location, endpoint))
+    if headers:
+        predicates.append(_compile_headers(headers, endpoint))
+
+    def endpoint_matches(flow):
+        for predicate in predicates:
+            if not predicate(flow):
+                return False
+        return True
+    return endpoint_matches
+
+
+def compile_query(query_dict):
+    '''
+    @param {dict} query_dict: As returned by
+    search.SearchBuilder.build_query
+    @return {function}: Predicate over flow.Flow objects
+    '''
+    predicates = []
+    flow_types = query_dict.get('flowTypes')
+    if flow_types is not None:
+        flow_types = frozenset(flow_types)
+        predicates.append(lambda flow: flow.get_flow_type() in flow_types)
+    filters = query_dict.get('filters', {})
+    for endpoint in (FROM, TO):
+        if endpoint in filters:
+            predicates.append(
+                compile_endpoint_filter(filters[endpoint], endpoint))
+
+    def query_matches(flow):
+        for predicate in predicates:
+            if not predicate(flow):
+                return False
+        return True
+    return query_matches
+
+
+def compile_search(search_builder):
+    '''
+    @param {search.SearchBuilder} search_builder
+    @return {function}: Predicate over flow.Flow objects
+    '''
+    return compile_query(search_builder.build_query())
+
+
+def filter_flows(flows, predicate_or_search_builder):
+    '''
+    @param {Flow[]} flows: E.g., FlowsResponse.get_flows_list()
+    @param predicate_or_search_builder: A compiled predicate or a
+    search.SearchBuilder
+    @return {Flow[]}: Flows that match
+    '''
+    predicate = predicate_or_search_builder
+    if hasattr(predicate, 'build_query'):
+        predicate = compile_search(predicate)
+    return [flow for flow in flows if predicate(flow)]
@@ -33,7 +33,7 @@ class Network(object):
         return self._name
 
     def get_snapshots(self):
-        return self._snapshots
+        return list(self._snapshots)
 
 
 class Snapshot(object):
@@ -0,0 +1,233 @@
+'''
+Sets of IPv4 and IPv6 prefixes stored in binary radix tries.
+
+A PrefixSet always holds the minimal CIDR cover of the prefixes added
+to it: prefixes covered by another prefix are dropped and sibling
+prefixes are merged into their parent. Containment and overlap
+queries for a single prefix walk at most one node per prefix bit.
+
+    prefixes = PrefixSet(['10.0.0.0/25', '10.0.0.128/25', '10.0.0.7'])
+    prefixes.to_list()                  # ['10.0.0.0/24']
+    prefixes.contains('10.0.0.64/26')   # True
+'''
+
+import addr
+
+# Indices into trie nodes, which are [child_0, child_1, is_terminal]
+# lists. A terminal node covers every address below it, so it has no
+# children.
+_TERMINAL = 2
+
+
+def _new_node():
+    return [None, None, False]
+
+
+def _bits(value, bits, prefix_len):
+    '''Yield the first prefix_len bits of value, most significant first
+    '''
+    for i in range(prefix_len):
+        yield (value >> (bits - 1 - i)) & 1
+
+
+def _overlaps(a, b):
+    if a is None or b is None:
+        return False
+    if a[_TERMINAL] or b[_TERMINAL]:
+        return True
+    return _overlaps(a[0], b[0]) or _overlaps(a[1], b[1])
+
+
+def _covers(a, b):
+    '''True if trie a covers every address in trie b
+    '''
+    if b is None:
+        return True
+    if a is None:
+        return False
+    if a[_TERMINAL]:
+        return True
+    if b[_TERMINAL]:
+        return False
+    return _covers(a[0], b[0]) and _covers(a[1], b[1])
+
+
+class PrefixSet(object):
+    """Set of IPv4 and IPv6 addresses, stored as a minimal set of prefixes
+    """
+
+    def __init__(self, prefixes=()):
+        """
+        @param {iterable} prefixes: Address or subnet strings, e.g.,
+        "10.0.0.0/8" or "2001:db8::1"
+        """
+        self._roots = {
+            addr.IPV4_BITS: _new_node(),
+            addr.IPV6_BITS: _new_node(),
+        }
+        for prefix in prefixes:
+            self.add(prefix)
+
+    def add(self, prefix):
+        """
+        @param {str} prefix: Address or subnet
+        @return {bool}: False if prefix was already covered by the set
+        """
+        bits, value, prefix_len = addr.parse_prefix(prefix)
+        node = self._roots[bits]
+        path = []
+        for bit in _bits(value, bits, prefix_len):
+            if node[_TERMINAL]:
+                return False
+            path.append((node, bit))
+            if node[bit] is None:
+                node[bit] = _new_node()
+            node = node[bit]
+        if node[_TERMINAL]:
+            return False
+        node[0] = node[1] = None
+        node[_TERMINAL] = True
+        # Merge complete sibling pairs into their parent
+        for parent, _ in reversed(path):
+            if not (parent[0] and parent[0][_TERMINAL] and
+                    parent[1] and parent[1][_TERMINAL]):
+                break
+            parent[0] = parent[1] = None
+            parent[_TERMINAL] = True
+        return True
+
+    def _find(self, prefix):
+        '''
+        @return {tuple}: (covered, node) where covered is True if a
+        prefix of the set covers prefix, and node is the trie node for
+        prefix, or None if there are no set prefixes below it.
+        '''
+        bits, value, prefix_len = addr.parse_prefix(prefix)
+        node = self._roots[bits]
+        for bit in _bits(value, bits, prefix_len):
+            if node[_TERMINAL]:
+                return True, node
+            node = node[bit]
+            if node is None:
+                return False, None
+        return node[_TERMINAL], node
+
+    def contains(self, prefix):
+        """
+        @param {str} prefix: Address or subnet
+        @return {bool}: True if every address in prefix is in the set
+        """
+        return self._find(prefix)[0]
+
+    def overlaps(self, other):
+        """
+        @param {str or PrefixSet} other: Address, subnet or set
+        @return {bool}: True if some address is both in this set and in
+        other
+        """
+        if isinstance(other, PrefixSet):
+            return any(_overlaps(self._roots[bits], other._roots[bits])
+                       for bits in self._roots)
+        covered, node = self._find(other)
+        # Nodes only exist above set prefixes
+        return covered or node is not None
+
+    def is_subset(self, other):
+        """
+        @param {PrefixSet} other
+        @return {bool}: True if every address in this set is in other
+        """
+        return all(_covers(other._roots[bits], self._roots[bits])
+                   for bits in self._roots)
+
+    def __iter__(self):
+        """Yield the prefixes of the minimal cover, IPv4 first, each
+        family in address order
+        """
+        for bits in (addr.IPV4_BITS, addr.IPV6_BITS):
+            stack = [(self._roots[bits], 0, 0)]
+            while stack:
+                node, value, depth = stack.pop()
+                if node[_TERMINAL]:
+                    yield addr.format_prefix(bits, value << (bits - depth),
+                                             depth)
+                    continue
+                for bit in (1, 0):
+                    if node[bit] is not None:
+                        stack.append((node[bit], (value << 1) | bit,
+                                      depth + 1))
+
+    def to_list(self):
+        """
+        @return {str[]}: Minimal list of prefixes covering the set
+        """
+        return list(self)
+
+    def is_empty(self):
+        return not any(root[0] or root[1] or root[_TERMINAL]
+                       for root in self._roots.itervalues())
+
+
+def is_prefix(entry):
+    '''
+    @param {str} entry
+    @return {bool}: True if entry is an IP address or subnet
+    '''
+    try:
+        addr.parse_prefix(entry)
+        return True
+    except ValueError:
+        return False
+
+
+def collapse_prefixes(entries):
+    '''Replace the address and subnet entries of a list by their
+    minimal CIDR cover
+
+    @param {str[]} entries: Entries that are not addresses or subnets
+    (e.g., host names) are kept as is, in their original order, before
+    the collapsed prefixes.
+    @return {str[]}
+    '''
+    others = [e for e in entries if not is_prefix(e)]
+    return others + PrefixSet(e for e in entries if is_prefix(e)).to_list()
+
+
+def find_shadowed(entries):
+    '''Find address and subnet entries that are covered by another entry
+
+    @param {str[]} entries: Entries that are not addresses or subnets
+    are ignored
+    @return {list}: (entry, covering_entry) tuples, in entry order. Of
+    duplicate entries, every entry but the first is reported.
+    '''
+    parsed = []
+    for index, entry in enumerate(entries):
+        try:
+            bits, value, prefix_len = addr.parse_prefix(entry)
+        except ValueError:
+            continue
+        parsed.append((prefix_len, index, entry, bits, value))
+    # Insert covering entries before the entries they cover. Nodes are
+    # [child_0, child_1, covering entry or None].
+    parsed.sort()
+    roots = {addr.IPV4_BITS: _new_node(), addr.IPV6_BITS: _new_node()}
+    for root in roots.itervalues():
+        root[_TERMINAL] = None
+    shadowed = []
+    for prefix_len, index, entry, bits, value in parsed:
+        node = roots[bits]
+        covering = node[_TERMINAL]
+        for bit in _bits(value, bits, prefix_len):
+            if covering is not None:
+                break
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+            covering = node[_TERMINAL]
+        if covering is not None:
+            shadowed.append((index, entry, covering))
+        else:
+            node[_TERMINAL] = entry
+    shadowed.sort()
+    return [(entry, covering) for _, entry, covering in shadowed]
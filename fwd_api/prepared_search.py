@@ -0,0 +1,130 @@
+'''
+Prepared flow searches: build a query once with placeholders and bind
+many values to it cheaply.
+
+    search_builder = SearchBuilder()
+    search_builder.get_from_context().set_device('veos-0')
+    search_builder.get_to_context() \\
+        .set_ip_dst(Placeholder('ip_dst')) \\
+        .set_l4_dst(Placeholder('l4_dst'))
+    prepared = PreparedSearch(search_builder)
+    results = fwd.get_flows_prepared(
+        prepared, [('10.0.0.1', 22), ('10.0.0.2', 443)], snapshot_id)
+
+Preparing serializes the query to canonical JSON once and splits it
+into constant fragments; binding only encodes the bound values and
+joins them with the fragments.
+'''
+
+import json
+import re
+
+import canonical
+from fwd_filter import Placeholder
+
+_SENTINEL = u'\x00placeholder%d\x00'
+_SENTINEL_RE = re.compile(r'"\\u0000placeholder(\d+)\\u0000"')
+
+_IP_FIELD_NAMES = frozenset(['ipv4_src', 'ipv4_dst', 'ipv6_src', 'ipv6_dst'])
+
+_ENCODER = json.JSONEncoder(separators=(',', ':'))
+
+
+class PreparedSearch(object):
+    """Flow search query with placeholders, pre-serialized for binding
+    """
+
+    def __init__(self, search_builder):
+        """
+        @param {search.SearchBuilder} search_builder: Query whose fields
+        may be set to fwd_filter.Placeholder objects
+        """
+        self._slots = []
+        self._ip_slots = []
+        query = self._replace_placeholders(search_builder.build_query())
+        parts = _SENTINEL_RE.split(canonical.canonical_json(query))
+        # parts alternates constant fragments and slot indices
+        self._fragments = parts[0::2]
+        self._slot_order = [int(i) for i in parts[1::2]]
+        # Names in order of first appearance in the query
+        self._names = []
+        for slot_index in self._slot_order:
+            name = self._slots[slot_index].get_name()
+            if name not in self._names:
+                self._names.append(name)
+
+    def _replace_placeholders(self, value, key=None):
+        if isinstance(value, Placeholder):
+            self._slots.append(value)
+            self._ip_slots.append(key in _IP_FIELD_NAMES)
+            return _SENTINEL % (len(self._slots) - 1)
+        if isinstance(value, dict):
+            return dict((k, self._replace_placeholders(v, k))
+                        for k, v in value.iteritems())
+        if isinstance(value, list):
+            return [self._replace_placeholders(v, key) for v in value]
+        return value
+
+    def get_placeholder_names(self):
+        """
+        @return {str[]}: Placeholder names in order of appearance in the
+        query, "from" context first, then "to" context. This is the
+        order in which bind takes positional values.
+        """
+        return list(self._names)
+
+    def _encode_value(self, slot_index, value):
+        placeholder = self._slots[slot_index]
+        if self._ip_slots[slot_index]:
+            if not isinstance(value, basestring):
+                raise ValueError('Placeholder %s takes an IP address '
+                                 'string, got %r' %
+                                 (placeholder.get_name(), value))
+            if placeholder.is_ipv6() != (':' in value):
+                raise ValueError('Value %s does not match the address '
+                                 'family of placeholder %s' %
+                                 (value, placeholder.get_name()))
+        return _ENCODER.encode(value)
+
+    def bind(self, *args, **kwargs):
+        """Generate the JSON query for one set of values
+
+        @param args: Values in get_placeholder_names order
+        @param kwargs: Values by placeholder name
+        @return {str}: JSON body for a flows search
+        """
+        if args and kwargs:
+            raise ValueError('Pass values either by position or by name')
+        if args:
+            if len(args) != len(self._names):
+                raise ValueError('Expected %d values, got %d' %
+                                 (len(self._names), len(args)))
+            values = dict(zip(self._names, args))
+        else:
+            values = kwargs
+        encoded = []
+        for slot_index in self._slot_order:
+            placeholder = self._slots[slot_index]
+            try:
+                value = values[placeholder.get_name()]
+            except KeyError:
+                raise ValueError('No value bound to placeholder %s' %
+                                 placeholder.get_name())
+            encoded.append(self._encode_value(slot_index, value))
+        parts = [self._fragments[0]]
+        for value_json, fragment in zip(encoded, self._fragments[1:]):
+            parts.append(value_json)
+            parts.append(fragment)
+        return ''.join(parts)
+
+    def bind_many(self, bindings):
+        """
+        @param {iterable} bindings: Each element is a dict of values by
+        name, or a tuple of values in get_placeholder_names order
+        @return {generator}: JSON bodies, one per binding
+        """
+        for binding in bindings:
+            if isinstance(binding, dict):
+                yield self.bind(**binding)
+            else:
+                yield self.bind(*binding)
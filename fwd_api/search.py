@@ -1,3 +1,4 @@
+import canonical
 import fwd_filter
 
 
@@ -17,6 +18,30 @@ class Context(object):
         self._location = None
         self._fields = {}
 
+    def copy(self):
+        """
+        @return {Context}: Context with the same location and fields
+        that can be modified independently of this one
+        """
+        result = Context()
+        result._location = self._location
+        result._fields = dict(self._fields)
+        return result
+
+    def get_location(self):
+        """
+        @return {fwd_filter.LocationFilter or None}
+        """
+        return self._location
+
+    def get_field_value(self, search_field):
+        """
+        @param {str} search_field: One of the members of SearchFields
+        @return {int or str or None}: None if the field is not set
+        """
+        field = self._fields.get(search_field)
+        return None if field is None else field.get_value()
+
     def set_device(self, device_name):
         """
         @param {str} device_name
@@ -53,7 +78,7 @@ class Context(object):
         network with the given source IP address, regardless of where
         that edge port is.
 
-        @param {str} ip_src
+        @param {str or fwd_filter.Placeholder} ip_src
         """
         self._fields[SearchFields.IP_SRC] = fwd_filter.IpSrcField(ip_src)
         return self
@@ -63,28 +88,28 @@ class Context(object):
         See the note in set_ip_src about the distinction between this
         call and set_host.
 
-        @param {str} ip_dst
+        @param {str or fwd_filter.Placeholder} ip_dst
         """
         self._fields[SearchFields.IP_DST] = fwd_filter.IpDstField(ip_dst)
         return self
 
     def set_ip_proto(self, ip_proto):
         """
-        @param {int} ip_proto
+        @param {int or fwd_filter.Placeholder} ip_proto
         """
         self._fields[SearchFields.IP_PROTO] = fwd_filter.IpProtoField(ip_proto)
         return self
 
     def set_l4_src(self, l4_src):
         """
-        @param {int} l4_src
+        @param {int or fwd_filter.Placeholder} l4_src
         """
         self._fields[SearchFields.L4_SRC] = fwd_filter.L4SrcField(l4_src)
         return self
 
     def set_l4_dst(self, l4_dst):
         """
-        @param {int} l4_dst
+        @param {int or fwd_filter.Placeholder} l4_dst
         """
         self._fields[SearchFields.L4_DST] = fwd_filter.L4DstField(l4_dst)
         return self
@@ -93,10 +118,16 @@ class Context(object):
         return self._location is None and len(self._fields) == 0
 
     def as_dict(self):
-        fields = self._fields.values()
+        fields = [self._fields[k] for k in sorted(self._fields)]
         headers = [fwd_filter.PacketFilter(fields)] if fields else []
         return fwd_filter.EndpointFilter(self._location, headers).as_dict()
 
+    def fingerprint(self):
+        """
+        @return {str}: Stable hash that is equal for equal contexts
+        """
+        return canonical.fingerprint(self)
+
 
 class SearchBuilder(object):
     def __init__(self):
@@ -104,6 +135,24 @@ class SearchBuilder(object):
         self._to_context = Context()
         self._flow_types = None
 
+    def copy(self):
+        """
+        @return {SearchBuilder}: Builder for the same query that can be
+        modified independently of this one
+        """
+        result = SearchBuilder()
+        result._from_context = self._from_context.copy()
+        result._to_context = self._to_context.copy()
+        if self._flow_types is not None:
+            result._flow_types = list(self._flow_types)
+        return result
+
+    def get_flow_types(self):
+        """
+        @return {str[] or None}: None if flow types are not restricted
+        """
+        return None if self._flow_types is None else list(self._flow_types)
+
     def get_from_context(self):
         """Return the "from" contet of a query.
 
@@ -126,6 +175,12 @@ class SearchBuilder(object):
         self._flow_types.append(flow_type)
         return self
 
+    def clear_flow_types(self):
+        """Remove any flow type restriction added by add_flow_type
+        """
+        self._flow_types = None
+        return self
+
     def build_query(self):
         """Generate a search dictionary, which the server will generate a
         response for
@@ -143,3 +198,17 @@ class SearchBuilder(object):
         if self._flow_types is not None:
             query_dict['flowTypes'] = list(self._flow_types)
         return query_dict
+
+    def canonical_json(self):
+        """Serialize the query so that equal queries produce equal
+        strings
+
+        @return {str}
+        """
+        return canonical.canonical_json(self.build_query())
+
+    def fingerprint(self):
+        """
+        @return {str}: Stable hash that is equal for equal queries
+        """
+        return canonical.fingerprint_json(self.canonical_json())
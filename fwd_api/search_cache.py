@@ -0,0 +1,86 @@
+'''
+In-memory cache of flow search results.
+
+Snapshots never change once collected, so a search result keyed by
+snapshot id and canonical query fingerprint stays valid forever. The
+cache only has to bound its memory use, which it does by evicting the
+least recently used results once their total size exceeds a limit.
+'''
+
+import collections
+import threading
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class SearchResultCache(object):
+    """Thread-safe LRU cache bounded by the total size of cached results
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        @param {int} max_bytes: Upper bound on the sum of the sizes
+        passed to put for the cached entries
+        """
+        self._max_bytes = max_bytes
+        self._size_bytes = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, snapshot_id, query_hash):
+        """
+        @param {int} snapshot_id
+        @param {str} query_hash: E.g., SearchBuilder.fingerprint()
+        @return: Cached result or None on a miss
+        """
+        key = (snapshot_id, query_hash)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self._misses += 1
+                return None
+            # Re-insert to mark as most recently used
+            self._entries[key] = entry
+            self._hits += 1
+            return entry[0]
+
+    def put(self, snapshot_id, query_hash, result, size_bytes):
+        """
+        @param {int} snapshot_id
+        @param {str} query_hash
+        @param result: Value to cache
+        @param {int} size_bytes: Size charged against max_bytes, e.g.,
+        the length of the server's response body. Results larger than
+        max_bytes are not cached.
+        """
+        if size_bytes > self._max_bytes:
+            return
+        key = (snapshot_id, query_hash)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size_bytes -= old[1]
+            self._entries[key] = (result, size_bytes)
+            self._size_bytes += size_bytes
+            while self._size_bytes > self._max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size_bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size_bytes = 0
+
+    def get_size_bytes(self):
+        return self._size_bytes
+
+    def get_hits(self):
+        return self._hits
+
+    def get_misses(self):
+        return self._misses
+
+    def __len__(self):
+        return len(self._entries)
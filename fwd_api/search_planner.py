@@ -0,0 +1,109 @@
+'''
+Split broad flow searches into sub-searches ("shards").
+
+Shards can run in parallel and their responses be merged with
+FlowsResponse.merge:
+
+    shards = split_by_flow_type(
+        split_by_ip_src(search_builder, num_bits=2))
+    flows_response = fwd.get_flows_sharded(shards, snapshot_id)
+
+Each split function accepts a single SearchBuilder or a list of them,
+so splits compose.
+
+Shards of split_by_device and split_by_flow_type match disjoint sets of
+flows. Shards of split_by_ip_src may not: a flow whose header space
+covers IP sources of several shards is returned by each of them.
+FlowsResponse.merge drops such duplicate flows, and the merged total
+flows are then an upper bound. Pass disjoint=True to get_flows_sharded
+for plans of disjoint shards only, to keep exact totals exact.
+'''
+
+import addr
+from search import SearchBuilder, SearchFields
+
+
+def _as_list(search_builders):
+    if isinstance(search_builders, SearchBuilder):
+        return [search_builders]
+    return list(search_builders)
+
+
+def split_by_ip_src(search_builders, num_bits=1):
+    '''Split on the source IP prefix of the "from" context
+
+    For example, splitting 10.0.0.0/8 with num_bits=1 produces
+    10.0.0.0/9 and 10.128.0.0/9. Shards may return the same flows, see
+    above.
+
+    @param {SearchBuilder or SearchBuilder[]} search_builders: Must set
+    an IP source address or subnet in their "from" context
+    @param {int} num_bits: Each search is split into 2 ** num_bits
+    shards, or fewer if the prefix is too long to split further
+    @return {SearchBuilder[]}
+    '''
+    result = []
+    for search_builder in _as_list(search_builders):
+        ip_src = search_builder.get_from_context().get_field_value(
+            SearchFields.IP_SRC)
+        if ip_src is None:
+            raise ValueError('Cannot split a search on IP source unless '
+                             'it sets an IP source')
+        bits, value, prefix_len = addr.parse_prefix(ip_src)
+        split_bits = min(num_bits, bits - prefix_len)
+        sub_len = prefix_len + split_bits
+        for i in range(2 ** split_bits):
+            sub_value = value | (i << (bits - sub_len))
+            shard = search_builder.copy()
+            shard.get_from_context().set_ip_src(
+                addr.format_prefix(bits, sub_value, sub_len))
+            result.append(shard)
+    return result
+
+
+def split_by_device(search_builders, devices):
+    '''Split on the device where flows enter the network
+
+    @param {SearchBuilder or SearchBuilder[]} search_builders: Must not
+    set a location in their "from" context
+    @param {DevicesResponse or str[]} devices: All devices of the
+    snapshot, e.g., Fwd.get_devices(snapshot_id), or their names
+    @return {SearchBuilder[]}
+    '''
+    if hasattr(devices, 'get_device_response_list'):
+        device_names = [d.get_name()
+                        for d in devices.get_device_response_list()]
+    else:
+        device_names = list(devices)
+    result = []
+    for search_builder in _as_list(search_builders):
+        if search_builder.get_from_context().get_location() is not None:
+            raise ValueError('Cannot split a search on device if it '
+                             'already sets a "from" location')
+        for device_name in device_names:
+            shard = search_builder.copy()
+            shard.get_from_context().set_device(device_name)
+            result.append(shard)
+    return result
+
+
+def split_by_flow_type(search_builders):
+    '''Split on flow type
+
+    @param {SearchBuilder or SearchBuilder[]} search_builders: Searches
+    restricted to some flow types are split into one shard per type.
+    Unrestricted searches are left unsplit, since the server may know
+    flow types that FlowType does not.
+    @return {SearchBuilder[]}
+    '''
+    result = []
+    for search_builder in _as_list(search_builders):
+        flow_types = search_builder.get_flow_types()
+        if flow_types is None:
+            result.append(search_builder.copy())
+            continue
+        for flow_type in sorted(set(flow_types)):
+            shard = search_builder.copy()
+            shard.clear_flow_types().add_flow_type(flow_type)
+            result.append(shard)
+    return result
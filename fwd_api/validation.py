@@ -0,0 +1,289 @@
+'''
+Local validation of checks and aliases before they are uploaded.
+
+The validators work on the JSON forms sent to the server, so they
+cover every Check and _Alias subclass, and report every problem of a
+batch at once:
+
+    problems = validate_batch(checks + aliases)
+    for problem in problems:
+        print problem
+
+Fwd.upload_checks and Fwd.sync_aliases validate their batches by
+default and raise a ValidationError before sending any request.
+'''
+
+import addr
+import header_space
+from alias import _Alias
+from check import Check
+from fwd_filter import Placeholder
+from vlan_set import RESERVED_VLAN_IDS, VlanSet
+
+_STRUCTURED_CHECK_TYPES = frozenset(['Existential', 'Isolation',
+                                     'Reachability'])
+
+_LOCATION_FILTER_TYPES = frozenset(['HostFilter', 'DeviceFilter',
+                                    'InterfaceFilter'])
+_LOCATION_ALIAS_FILTER_TYPES = frozenset(['HostAliasFilter',
+                                          'DeviceAliasFilter',
+                                          'InterfaceAliasFilter'])
+_HEADER_FILTER_TYPES = frozenset(['PacketFilter', 'PacketAliasFilter'])
+
+# Characters that cannot appear in alias names, which are part of URLs
+_INVALID_NAME_CHARS = frozenset('/?#%\\ \t\n')
+
+
+class Problem(object):
+    """Problem found with one item of a batch
+    """
+
+    def __init__(self, index, item, message):
+        """
+        @param {int} index: Position of the item in the batch
+        @param item: The check or alias
+        @param {str} message
+        """
+        self._index = index
+        self._item = item
+        self._message = message
+
+    def get_index(self):
+        return self._index
+
+    def get_item(self):
+        return self._item
+
+    def get_message(self):
+        return self._message
+
+    def __str__(self):
+        return 'Item %d (%s): %s' % (self._index, _describe(self._item),
+                                     self._message)
+
+
+class ValidationError(ValueError):
+    """Raised for a batch with problems, listing all of them
+    """
+
+    def __init__(self, problems):
+        """
+        @param {Problem[]} problems
+        """
+        super(ValidationError, self).__init__(
+            '%d problem(s) found:\n%s' %
+            (len(problems), '\n'.join(str(p) for p in problems)))
+        self._problems = list(problems)
+
+    def get_problems(self):
+        return list(self._problems)
+
+
+def _describe(item):
+    if isinstance(item, _Alias):
+        return 'alias %r' % item.get_name()
+    if isinstance(item, Check):
+        name = item.to_check_dict().get('name')
+        if name:
+            return 'check %r' % name
+        return 'check'
+    return type(item).__name__
+
+
+def _is_nonempty_string(value):
+    return isinstance(value, basestring) and value.strip() != ''
+
+
+def _filter_problems(filter_dict, path, allowed_types):
+    '''
+    @param {dict} filter_dict: Filter in its dictionary form
+    @param {str} path: Location of the filter in the check, for messages
+    @param {frozenset} allowed_types: Filter types allowed at path
+    @return {str[]}
+    '''
+    if not isinstance(filter_dict, dict):
+        return ['%s: expected a filter, got %r' % (path, filter_dict)]
+    filter_type = filter_dict.get('type')
+    if filter_type not in allowed_types:
+        return ['%s: unknown or misplaced filter type %r' %
+                (path, filter_type)]
+    problems = []
+    if filter_type == 'EndpointFilter':
+        if 'location' not in filter_dict and 'headers' not in filter_dict:
+            problems.append('%s: EndpointFilter needs a location or '
+                            'headers' % path)
+        if 'location' in filter_dict:
+            problems.extend(_filter_problems(
+                filter_dict['location'], path + '.location',
+                _LOCATION_FILTER_TYPES | _LOCATION_ALIAS_FILTER_TYPES |
+                frozenset(['NotFilter'])))
+        for i, header in enumerate(filter_dict.get('headers') or []):
+            problems.extend(_filter_problems(
+                header, '%s.headers[%d]' % (path, i),
+                _HEADER_FILTER_TYPES | frozenset(['NotFilter'])))
+    elif filter_type == 'NotFilter':
+        problems.extend(_filter_problems(
+            filter_dict.get('clause'), path + '.clause',
+            allowed_types - frozenset(['NotFilter', 'EndpointFilter'])))
+    elif filter_type == 'PacketFilter':
+        values = filter_dict.get('values')
+        if not isinstance(values, dict) or not values:
+            problems.append('%s: PacketFilter needs header values' % path)
+        else:
+            for field_name, field_values in sorted(values.iteritems()):
+                problems.extend(_field_problems(
+                    '%s.%s' % (path, field_name), field_name,
+                    field_values))
+    elif filter_type in _LOCATION_FILTER_TYPES:
+        values = filter_dict.get('values')
+        if (not isinstance(values, list) or not values or
+                not all(_is_nonempty_string(v) for v in values)):
+            problems.append('%s: %s needs a non-empty name' %
+                            (path, filter_type))
+    elif not _is_nonempty_string(filter_dict.get('value')):
+        # Alias filters
+        problems.append('%s: %s needs an alias name' % (path, filter_type))
+    return problems
+
+
+def _field_problems(path, field_name, field_values):
+    if any(isinstance(v, Placeholder) for v in field_values):
+        return ['%s: unbound placeholder' % path]
+    try:
+        header_space.check_field_value(field_name, field_values)
+    except ValueError as e:
+        return ['%s: %s' % (path, e)]
+    return []
+
+
+def _vlan_problems(path, vlans):
+    '''
+    @param vlans: VLAN IDs and ranges where concrete VLANs are required
+    '''
+    try:
+        vlan_set = VlanSet(vlans)
+    except (ValueError, TypeError) as e:
+        return ['%s: %s' % (path, e)]
+    return ['%s: reserved VLAN ID %d' % (path, vlan_id)
+            for vlan_id in RESERVED_VLAN_IDS if vlan_id in vlan_set]
+
+
+def check_problems(check):
+    '''
+    @param {Check} check
+    @return {str[]}: Problems of the check definition
+    '''
+    definition = check.to_check_dict()
+    problems = []
+    check_type = definition.get('checkType')
+    name = definition.get('name')
+    if name is not None and not isinstance(name, basestring):
+        problems.append('name must be a string')
+    if check_type in _STRUCTURED_CHECK_TYPES:
+        filters = definition.get('filters') or {}
+        if 'from' not in filters and 'to' not in filters:
+            problems.append('needs a "from" or "to" filter')
+        all_types = (_LOCATION_FILTER_TYPES | _LOCATION_ALIAS_FILTER_TYPES |
+                     _HEADER_FILTER_TYPES |
+                     frozenset(['NotFilter', 'EndpointFilter']))
+        for key in ('from', 'to'):
+            if key in filters:
+                problems.extend(_filter_problems(filters[key], key,
+                                                 all_types))
+    elif (check_type == 'Predefined' and
+          definition.get('predefinedCheckType') == 'VLAN_EXISTENCE'):
+        params = definition.get('params') or {}
+        if not params.get('interfaces'):
+            problems.append('needs at least one interface')
+        vlans = params.get('vlans')
+        if not vlans:
+            problems.append('needs at least one VLAN')
+        else:
+            problems.extend(_vlan_problems('vlans', vlans))
+    elif check_type is None:
+        problems.append('missing checkType')
+    return problems
+
+
+def alias_problems(alias):
+    '''
+    @param {_Alias} alias
+    @return {str[]}: Problems of the alias definition
+    '''
+    problems = []
+    name = alias.get_name()
+    if not _is_nonempty_string(name):
+        problems.append('name must be a non-empty string')
+    elif _INVALID_NAME_CHARS.intersection(name):
+        problems.append('name %r contains characters not allowed in '
+                        'alias names' % name)
+    d = alias._to_alias_dict()
+    alias_type = d.get('type')
+    values = d.get('values')
+    if alias_type == 'INTERFACES':
+        for value in values or []:
+            if not _is_nonempty_string(value) or len(value.split()) != 2:
+                problems.append('interface %r must be "device port"' %
+                                (value,))
+        if 'vlanIds' in d:
+            problems.extend(_vlan_problems('vlanIds', d['vlanIds']))
+    elif alias_type == 'HEADERS':
+        if not isinstance(values, dict) or not values:
+            problems.append('needs header values')
+        else:
+            for key, field_values in sorted(values.iteritems()):
+                if not isinstance(field_values, list) or not field_values:
+                    problems.append('%s: needs a non-empty list' % key)
+                elif key == 'ip_addr':
+                    for value in field_values:
+                        try:
+                            addr.parse_prefix(value)
+                        except ValueError as e:
+                            problems.append('ip_addr: %s' % e)
+                elif key in header_space.FIELD_NAMES:
+                    problems.extend(_field_problems(key, key, field_values))
+    elif alias_type == 'HOSTS':
+        if (not isinstance(values, list) or not values or
+                not all(_is_nonempty_string(v) for v in values)):
+            problems.append('needs a non-empty list of host names')
+    return problems
+
+
+def validate_batch(items):
+    '''Validate checks and aliases, including name collisions: aliases
+    or named checks that share a name but differ in definition
+
+    @param {list} items: Check and _Alias objects
+    @return {Problem[]}: In item order
+    '''
+    problems = []
+    definitions_by_name = {}
+    for index, item in enumerate(items):
+        if isinstance(item, _Alias):
+            messages = alias_problems(item)
+            key = ('alias', item.get_name())
+            definition = item._to_alias_dict()
+        elif isinstance(item, Check):
+            messages = check_problems(item)
+            key = ('check', item.to_check_dict().get('name'))
+            definition = item.get_definition_hash()
+        else:
+            problems.append(Problem(index, item, 'not a check or alias'))
+            continue
+        if key[1]:
+            first = definitions_by_name.setdefault(key, (index, definition))
+            if first[1] != definition:
+                messages.append('%s name %r is also used by item %d' %
+                                (key[0], key[1], first[0]))
+        problems.extend(Problem(index, item, m) for m in messages)
+    return problems
+
+
+def check_batch(items):
+    '''Raise a ValidationError listing every problem of items, if any
+
+    @param {list} items: Check and _Alias objects
+    '''
+    problems = validate_batch(items)
+    if problems:
+        raise ValidationError(problems)
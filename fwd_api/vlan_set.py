@@ -0,0 +1,209 @@
+'''
+Sets of VLAN IDs stored as sorted, disjoint intervals.
+
+    vlans = VlanSet(['1-5', 7, '6'])
+    vlans.to_strings()                      # ['1-7']
+    (vlans - VlanSet('3')).to_strings()     # ['1-2', '4-7']
+'''
+
+import bisect
+
+MIN_VLAN_ID = 0
+MAX_VLAN_ID = 4095
+
+# IDs that do not name a VLAN: 0 marks priority-tagged frames and 4095
+# is reserved
+RESERVED_VLAN_IDS = (MIN_VLAN_ID, MAX_VLAN_ID)
+
+
+def _parse_interval(spec):
+    '''
+    @param {int or str} spec: VLAN ID or range, e.g., 10 or "1-5"
+    @return {tuple}: Inclusive (low, high) interval
+    '''
+    if isinstance(spec, (int, long)):
+        low = high = spec
+    else:
+        parts = spec.strip().split('-')
+        try:
+            if len(parts) == 1:
+                low = high = int(parts[0])
+            elif len(parts) == 2:
+                low, high = int(parts[0]), int(parts[1])
+            else:
+                raise ValueError
+        except ValueError:
+            raise ValueError('Invalid VLAN ID or range: %r' % spec)
+    if not MIN_VLAN_ID <= low <= high <= MAX_VLAN_ID:
+        raise ValueError('Invalid VLAN ID or range: %r' % spec)
+    return low, high
+
+
+def _normalize(intervals):
+    '''Sort intervals and merge overlapping or adjacent ones
+    '''
+    result = []
+    for low, high in sorted(intervals):
+        if result and low <= result[-1][1] + 1:
+            if high > result[-1][1]:
+                result[-1] = (result[-1][0], high)
+        else:
+            result.append((low, high))
+    return result
+
+
+class VlanSet(object):
+    """Immutable set of VLAN IDs
+    """
+
+    def __init__(self, vlans=()):
+        """
+        @param {VlanSet, int, str or list} vlans: VLAN IDs and ranges.
+        Strings may hold comma-separated lists, e.g., "1-5,7".
+        """
+        if isinstance(vlans, VlanSet):
+            self._intervals = vlans._intervals
+            return
+        if isinstance(vlans, (int, long, basestring)):
+            vlans = [vlans]
+        intervals = []
+        for spec in vlans:
+            if isinstance(spec, basestring):
+                intervals.extend(_parse_interval(s)
+                                 for s in spec.split(',') if s.strip())
+            else:
+                intervals.append(_parse_interval(spec))
+        self._intervals = _normalize(intervals)
+
+    @classmethod
+    def _from_intervals(cls, intervals):
+        vlan_set = cls()
+        vlan_set._intervals = intervals
+        return vlan_set
+
+    def get_intervals(self):
+        """
+        @return {tuple[]}: Sorted, disjoint, non-adjacent inclusive
+        (low, high) intervals
+        """
+        return list(self._intervals)
+
+    def to_strings(self):
+        """
+        @return {str[]}: Most compact list of IDs and ranges, e.g.,
+        ['1-5', '7'], as accepted by VlanInterfaceAlias
+        """
+        return [str(low) if low == high else '%d-%d' % (low, high)
+                for low, high in self._intervals]
+
+    def to_list(self):
+        """
+        @return {int[]}: Every VLAN ID of the set, in order
+        """
+        return list(self)
+
+    def __iter__(self):
+        for low, high in self._intervals:
+            for vlan_id in xrange(low, high + 1):
+                yield vlan_id
+
+    def __len__(self):
+        return sum(high - low + 1 for low, high in self._intervals)
+
+    def __nonzero__(self):
+        return bool(self._intervals)
+
+    def __contains__(self, vlan_id):
+        index = bisect.bisect_right(self._intervals,
+                                    (vlan_id, MAX_VLAN_ID + 1)) - 1
+        return index >= 0 and self._intervals[index][1] >= vlan_id
+
+    def union(self, other):
+        return VlanSet._from_intervals(
+            _normalize(self._intervals + VlanSet(other)._intervals))
+
+    def intersection(self, other):
+        other = VlanSet(other)._intervals
+        result = []
+        i = j = 0
+        while i < len(self._intervals) and j < len(other):
+            low = max(self._intervals[i][0], other[j][0])
+            high = min(self._intervals[i][1], other[j][1])
+            if low <= high:
+                result.append((low, high))
+            if self._intervals[i][1] < other[j][1]:
+                i += 1
+            else:
+                j += 1
+        return VlanSet._from_intervals(result)
+
+    def difference(self, other):
+        other = VlanSet(other)._intervals
+        result = []
+        j = 0
+        for low, high in self._intervals:
+            while j < len(other) and other[j][1] < low:
+                j += 1
+            k = j
+            while k < len(other) and other[k][0] <= high:
+                if other[k][0] > low:
+                    result.append((low, other[k][0] - 1))
+                low = max(low, other[k][1] + 1)
+                k += 1
+            if low <= high:
+                result.append((low, high))
+        return VlanSet._from_intervals(result)
+
+    def overlaps(self, other):
+        """
+        @param {VlanSet, int, str or list} other
+        @return {bool}: True if some VLAN ID is in both sets
+        """
+        return bool(self.intersection(other))
+
+    def is_subset(self, other):
+        return not self.difference(other)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+
+    def __eq__(self, other):
+        return (isinstance(other, VlanSet) and
+                self._intervals == other._intervals)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(tuple(self._intervals))
+
+    def __repr__(self):
+        return 'VlanSet(%r)' % ','.join(self.to_strings())
+
+
+def find_overlaps(vlan_sets):
+    '''Find overlapping pairs among named VLAN sets
+
+    @param {dict} vlan_sets: VlanSet-s (or anything VlanSet accepts) by
+    name, e.g., alias name
+    @return {list}: Sorted (name, other_name, VlanSet of shared IDs)
+    tuples, with name < other_name
+    '''
+    # Sweep the interval endpoints in order, tracking the open intervals
+    events = []
+    for name, vlans in vlan_sets.iteritems():
+        for low, high in VlanSet(vlans)._intervals:
+            events.append((low, high, name))
+    events.sort()
+    shared = {}
+    open_intervals = []
+    for low, high, name in events:
+        open_intervals = [(h, n) for h, n in open_intervals if h >= low]
+        for other_high, other_name in open_intervals:
+            key = tuple(sorted((name, other_name)))
+            shared.setdefault(key, []).append(
+                (low, min(high, other_high)))
+        open_intervals.append((high, name))
+    return [(key[0], key[1], VlanSet._from_intervals(_normalize(i)))
+            for key, i in sorted(shared.iteritems())]
@@ -0,0 +1,121 @@
+'''
+Fwd stand-in that answers requests from in-process handlers instead of
+a Forward server.
+'''
+
+import json
+import re
+import threading
+
+from fwd_api.fwd import Fwd
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, json_body=None, url='',
+                 headers=None):
+        self.status_code = status_code
+        self.content = '' if json_body is None else json.dumps(json_body)
+        self.url = url
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeFwd(Fwd):
+    '''Routes requests to handlers registered with add_handler. Each
+    handler is called as handler(match, data) where match is the regex
+    match on the url suffix and data is the request body, and returns a
+    FakeResponse or a (status_code, json_body) tuple.
+    '''
+
+    def __init__(self, **kwargs):
+        super(FakeFwd, self).__init__('http://fake', 'user', 'password',
+                                      verbose=False, **kwargs)
+        self._handlers = []
+        self._lock = threading.Lock()
+        self.requests = []
+
+    def add_handler(self, method, url_regex, handler):
+        self._handlers.append((method.upper(), re.compile(url_regex + '$'),
+                               handler))
+
+    def request(self, method, api_url_suffix, verbose=False, **kwargs):
+        with self._lock:
+            self.requests.append((method.upper(), api_url_suffix))
+        path = api_url_suffix.split('?', 1)[0]
+        for handler_method, regex, handler in self._handlers:
+            match = regex.match(path)
+            if handler_method == method.upper() and match:
+                r = handler(match, kwargs.get('data'))
+                if isinstance(r, tuple):
+                    r = FakeResponse(r[0], r[1], api_url_suffix)
+                if self.verify:
+                    self.verify_status_code(r)
+                return r
+        r = FakeResponse(404, url=api_url_suffix)
+        self.verify_status_code(r)
+        return r
+
+    def count_requests(self, method, url_regex):
+        regex = re.compile(url_regex + '$')
+        return len([1 for m, url in self.requests
+                    if m == method.upper() and regex.match(url)])
+
+
+class FakeCheckServer(object):
+    '''In-memory check storage behind the check endpoints of a FakeFwd.
+    Checks are stored as the server's JSON form, by snapshot id.
+    '''
+
+    def __init__(self, fwd):
+        self.checks = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        fwd.add_handler('get', r'/api/snapshots/(\d+)/checks',
+                        self._get_checks)
+        fwd.add_handler('post', r'/api/snapshots/(\d+)/checks',
+                        self._post_check)
+        fwd.add_handler('get', r'/api/snapshots/(\d+)/checks/(\d+)',
+                        self._get_check)
+        fwd.add_handler('delete', r'/api/snapshots/(\d+)/checks/(\d+)',
+                        self._delete_check)
+
+    def add_check(self, snapshot_id, definition, status='NONE'):
+        with self._lock:
+            check_id = self._next_id
+            self._next_id += 1
+            check = {'id': check_id, 'definition': definition,
+                     'status': status}
+            self.checks.setdefault(snapshot_id, {})[check_id] = check
+        return check
+
+    def set_status(self, snapshot_id, check_id, status):
+        self.checks[snapshot_id][check_id]['status'] = status
+
+    def _get_checks(self, match, data):
+        checks = self.checks.get(int(match.group(1)), {})
+        return (200, [checks[i] for i in sorted(checks)])
+
+    def _post_check(self, match, data):
+        return (200, self.add_check(int(match.group(1)), json.loads(data)))
+
+    def _get_check(self, match, data):
+        checks = self.checks.get(int(match.group(1)), {})
+        check = checks.get(int(match.group(2)))
+        if check is None:
+            return (404, None)
+        return (200, check)
+
+    def _delete_check(self, match, data):
+        checks = self.checks.get(int(match.group(1)), {})
+        if checks.pop(int(match.group(2)), None) is None:
+            return (404, None)
+        return (200, None)
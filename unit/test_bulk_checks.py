@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+
+import json
+import sys
+import threading
+
+try:
+    from fwd_api.check import (ExistenceCheck, NetworkCheckStatus,
+                               NetworkCheckType, definition_hash)
+    from fwd_api.fwd import HTTPStatusError
+    from fwd_api.fwd_filter import DeviceFilter
+    from fake_fwd import FakeCheckServer, FakeFwd
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+
+def make_fwd():
+    fwd = FakeFwd()
+    lock = threading.Lock()
+    state = {'next_id': 1, 'flaky_failures': 1}
+
+    def handle_post(match, data):
+        definition = json.loads(data)
+        with lock:
+            if definition['name'] == 'flaky' and state['flaky_failures']:
+                state['flaky_failures'] -= 1
+                return (503, None)
+            check_id = state['next_id']
+            state['next_id'] += 1
+        if definition['name'] == 'bad':
+            return (400, {'error': 'invalid check'})
+        status = 'PASS' if definition['name'] == 'pass' else 'NONE'
+        return (200, {'id': check_id, 'definition': definition,
+                      'status': status})
+
+    def handle_delete(match, data):
+        if match.group(2) == '404':
+            return (404, None)
+        if match.group(2) == '500':
+            return (500, None)
+        return (200, None)
+
+    def handle_get(match, data):
+        return (200, [{'id': 100,
+                       'definition': dict(check('existing').to_check_dict(),
+                                          createdAt=12345),
+                       'status': 'FAIL'}])
+
+    fwd.add_handler('post', r'/api/snapshots/(\d+)/checks', handle_post)
+    fwd.add_handler('get', r'/api/snapshots/(\d+)/checks', handle_get)
+    fwd.add_handler('delete', r'/api/snapshots/(\d+)/checks/(\d+)',
+                    handle_delete)
+    return fwd
+
+
+def check(name):
+    return ExistenceCheck(DeviceFilter('veos-0'), None, name)
+
+
+def test_upload_checks():
+    fwd = make_fwd()
+    checks = [check('a'), check('pass'), check('bad'), check('flaky')]
+    summary = fwd.upload_checks(checks, 1, max_concurrency=2)
+
+    assert not summary.is_success()
+    assert summary.get_succeeded() == [checks[0], checks[1], checks[3]]
+    by_status = summary.get_results_by_status()
+    assert sorted(by_status) == [NetworkCheckStatus.NONE,
+                                 NetworkCheckStatus.PASS]
+    assert [r.get_name() for r in summary.get_results('NONE')] == \
+        ['a', 'flaky']
+    assert summary.get_results('PASS')[0].get_check_type() == \
+        NetworkCheckType.EXISTENTIAL
+    # Client errors fail their item without retries
+    failures = summary.get_failures()
+    assert [f.get_index() for f in failures] == [2]
+    assert isinstance(failures[0].get_error(), HTTPStatusError)
+    assert failures[0].get_error().status_code == 400
+    # The server error of 'flaky' was retried
+    assert fwd.count_requests('post', r'/api/snapshots/1/checks') == 5
+
+
+def test_delete_checks():
+    fwd = make_fwd()
+    summary = fwd.delete_checks([1, 404, 2, 500], 1, retries=1)
+    assert summary.get_succeeded() == [1, 2]
+    assert [f.get_request() for f in summary.get_failures()] == [404, 500]
+    assert fwd.count_requests('delete', r'/api/snapshots/1/checks/500') == 2
+    assert fwd.count_requests('delete', r'/api/snapshots/1/checks/404') == 1
+
+
+def test_definition_hash():
+    a = check('a')
+    assert a.get_definition_hash() == check('a').get_definition_hash()
+    assert a.get_definition_hash() != check('b').get_definition_hash()
+    assert a.get_definition_hash() == definition_hash(a.to_check_dict())
+
+
+def test_upload_checks_skip_existing():
+    fwd = make_fwd()
+    checks = [check('existing'), check('a'), check('b'), check('a')]
+    summary = fwd.upload_checks(checks, 1, skip_existing=True)
+
+    assert summary.is_success()
+    assert summary.get_skipped() == [checks[0], checks[3]]
+    assert fwd.count_requests('post', r'/api/snapshots/1/checks') == 2
+    results = [r.get_result() for r in summary.get_batch_results()]
+    assert results[0].get_check_id() == 100
+    assert results[1] is results[3]
+    # A re-run uploads nothing new
+    summary = fwd.upload_checks([check('existing')] * 3, 1,
+                                skip_existing=True)
+    assert len(summary.get_skipped()) == 3
+    assert fwd.count_requests('post', r'/api/snapshots/1/checks') == 2
+
+
+def make_lossy_fwd(lost):
+    '''POSTs of checks named in lost create the check, but lose the
+    response that many times
+    '''
+    fwd = FakeFwd()
+
+    def create_then_fail(match, data):
+        definition = json.loads(data)
+        if lost.get(definition['name']):
+            lost[definition['name']] -= 1
+            # The check is created but the client sees a gateway error
+            server.add_check(int(match.group(1)), definition)
+            return (502, None)
+        return (200, server.add_check(int(match.group(1)), definition))
+
+    fwd.add_handler('post', r'/api/snapshots/(\d+)/checks', create_then_fail)
+    server = FakeCheckServer(fwd)
+    return fwd, server
+
+
+def test_upload_retry_after_lost_response():
+    fwd, server = make_lossy_fwd({'a': 1})
+    # An identical check that existed before is not reused
+    existing = server.add_check(1, check('a').to_check_dict())
+
+    summary = fwd.upload_checks([check('a'), check('b')], 1, retries=2)
+    assert summary.is_success()
+    results = [r.get_result() for r in summary.get_batch_results()]
+    assert results[0].get_check_id() not in (None, existing['id'])
+    assert results[0].get_name() == 'a'
+    # One POST per check: the lost one was found when retrying
+    assert fwd.count_requests('post', r'/api/snapshots/1/checks') == 2
+    assert len(server.checks[1]) == 3
+
+
+def test_concurrent_retries_share_listing():
+    names = ['a', 'b', 'c', 'd']
+    fwd, server = make_lossy_fwd(dict((name, 1) for name in names))
+    summary = fwd.upload_checks([check(name) for name in names], 1,
+                                max_concurrency=4)
+    assert summary.is_success()
+    assert sorted(r.get_result().get_name()
+                  for r in summary.get_batch_results()) == names
+    assert len(set(r.get_result().get_check_id()
+                   for r in summary.get_batch_results())) == 4
+    assert len(server.checks[1]) == 4
+    # One listing of existing checks, and one shared by the retries
+    assert fwd.count_requests('get', r'/api/snapshots/1/checks') == 2
+
+
+def test_delete_retry_after_lost_response():
+    fwd = FakeFwd()
+    deleted = set()
+
+    def delete_then_fail(match, data):
+        check_id = int(match.group(2))
+        if check_id in deleted:
+            return (404, None)
+        deleted.add(check_id)
+        return (502, None)
+
+    fwd.add_handler('delete', r'/api/snapshots/(\d+)/checks/(\d+)',
+                    delete_then_fail)
+    summary = fwd.delete_checks([1, 2], 1, retries=1)
+    assert summary.is_success()
+    assert summary.get_succeeded() == [1, 2]
+    assert fwd.count_requests('delete', r'/api/snapshots/1/checks/\d+') == 4
+
+
+if __name__ == '__main__':
+    test_upload_checks()
+    test_delete_checks()
+    test_definition_hash()
+    test_upload_checks_skip_existing()
+    test_upload_retry_after_lost_response()
+    test_concurrent_retries_share_listing()
+    test_delete_retry_after_lost_response()
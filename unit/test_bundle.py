@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+import json
+import sys
+
+try:
+    from fwd_api.alias import HostAlias, IpV4TrafficAlias
+    from fwd_api.bundle import IntentBundle, apply_bundle, referenced_aliases
+    from fwd_api.check import ExistenceCheck, IsolationCheck
+    from fwd_api.fwd_filter import (DeviceFilter, EndpointFilter,
+                                    HostAliasFilter, PacketAliasFilter)
+    from fake_fwd import FakeCheckServer, FakeFwd
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+
+def make_bundle():
+    aliases = [HostAlias('servers', ['10.0.0.1', '10.0.0.2']),
+               IpV4TrafficAlias('mgmt', ['192.168.0.0/16'])]
+    checks = [
+        ExistenceCheck(EndpointFilter(HostAliasFilter('servers'),
+                                      [PacketAliasFilter('mgmt')]),
+                       None, 'servers-mgmt'),
+        IsolationCheck(DeviceFilter('a'), HostAliasFilter('servers'),
+                       'a-isolated'),
+    ]
+    return IntentBundle(aliases, checks)
+
+
+def make_fwd():
+    fwd = FakeFwd()
+    FakeCheckServer(fwd)
+    aliases = {}
+
+    def get_aliases(match, data):
+        return (200, aliases.get(int(match.group(1)), {}).values())
+
+    def put_alias(match, data):
+        snapshot_id = int(match.group(1))
+        if snapshot_id == 13:
+            return (400, None)
+        aliases.setdefault(snapshot_id, {})[match.group(2)] = \
+            json.loads(data)
+        return (200, None)
+
+    fwd.add_handler('get', r'/api/snapshots/(\d+)/aliases', get_aliases)
+    fwd.add_handler('put', r'/api/snapshots/(\d+)/aliases/([^/]+)',
+                    put_alias)
+    return fwd, aliases
+
+
+def test_round_trip():
+    bundle = make_bundle()
+    assert referenced_aliases(bundle.get_checks()[0]) == \
+        set(['servers', 'mgmt'])
+    assert bundle.get_missing_aliases() == []
+    assert IntentBundle([], bundle.get_checks()).get_missing_aliases() == \
+        ['mgmt', 'servers']
+    loaded = IntentBundle.from_json(bundle.to_json())
+    assert [a.get_definition_hash() for a in loaded.get_aliases()] == \
+        [a.get_definition_hash() for a in bundle.get_aliases()]
+    assert [c.get_definition_hash() for c in loaded.get_checks()] == \
+        [c.get_definition_hash() for c in bundle.get_checks()]
+
+
+def test_apply_bundle():
+    fwd, aliases = make_fwd()
+    bundle = IntentBundle.from_json(make_bundle().to_json())
+    snapshot_ids = range(1, 21)
+    results = apply_bundle(fwd, bundle, snapshot_ids)
+
+    assert [r.get_request() for r in results] == snapshot_ids
+    failed = [r.get_request() for r in results if not r.is_success()]
+    assert failed == [13]
+    ok = results[0].get_result()
+    assert ok.is_success()
+    assert ok.get_alias_summary().get_counts()['created'] == 2
+    assert len(ok.get_check_summary().get_succeeded()) == 2
+    assert sorted(aliases[20]) == ['mgmt', 'servers']
+    # No checks reach a snapshot whose aliases failed
+    assert fwd.count_requests('post', r'/api/snapshots/13/checks') == 0
+
+    # Re-applying is a no-op
+    posts = fwd.count_requests('post', r'/api/snapshots/\d+/checks')
+    results = apply_bundle(fwd, bundle, [1, 2])
+    assert all(r.get_result().get_check_summary().get_skipped()
+               for r in results)
+    assert fwd.count_requests('post', r'/api/snapshots/\d+/checks') == posts
+
+
+if __name__ == '__main__':
+    test_round_trip()
+    test_apply_bundle()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+import sys
+
+try:
+    from fwd_api.check_sync import (CheckChange, CheckStatusSync,
+                                    MemoryCheckStore, SqliteCheckStore)
+    from fake_fwd import FakeCheckServer, FakeFwd
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+
+def check_refresh(store):
+    fwd = FakeFwd()
+    server = FakeCheckServer(fwd)
+    a = server.add_check(1, {'checkType': 'Existential', 'name': 'a'})
+    b = server.add_check(1, {'checkType': 'Isolation', 'name': 'b'}, 'PASS')
+    server.add_check(2, {'checkType': 'Isolation', 'name': 'c'}, 'FAIL')
+    events = []
+    sync = CheckStatusSync(fwd, store)
+    sync.add_listener(events.append)
+
+    changes = sync.refresh_all([1, 2, 3])
+    assert [c.get_kind() for c in changes[1]] == ['ADDED', 'ADDED']
+    assert len(changes[2]) == 1 and changes[3] == []
+    assert len(events) == 3
+    assert store.get_snapshot_ids() == [1, 2]
+    assert store.count_by_status(1) == {'NONE': 1, 'PASS': 1}
+    rows = store.get_checks(1, status='PASS')
+    assert [r.get_check_id() for r in rows] == [b['id']]
+    assert rows[0].get_check_type() == 'Isolation'
+
+    # Unchanged checks produce no changes
+    assert sync.refresh(1) == []
+
+    server.set_status(1, a['id'], 'FAIL')
+    server.checks[1].pop(b['id'])
+    changes = sync.refresh(1)
+    assert [(c.get_kind(), c.get_check_id()) for c in changes] == [
+        (CheckChange.UPDATED, a['id']), (CheckChange.REMOVED, b['id'])]
+    assert changes[0].get_old_row().get_status() == 'NONE'
+    assert changes[0].get_new_row().get_status() == 'FAIL'
+    assert changes[0].get_old_row().get_definition_hash() == \
+        changes[0].get_new_row().get_definition_hash()
+    assert store.count_by_status(1) == {'FAIL': 1}
+    assert len(events) == 5
+
+
+def test_refresh_memory_store():
+    check_refresh(MemoryCheckStore())
+
+
+def test_refresh_sqlite_store():
+    check_refresh(SqliteCheckStore())
+
+
+if __name__ == '__main__':
+    test_refresh_memory_store()
+    test_refresh_sqlite_store()
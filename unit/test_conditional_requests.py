@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+import BaseHTTPServer
+import json
+import sys
+import threading
+
+try:
+    from fwd_api.fwd import Fwd
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+NETWORKS = [{'id': 1, 'name': 'lab', 'orgId': 2, 'creatorId': 3}]
+SNAPSHOTS = {'id': 1, 'name': 'lab', 'orgId': 2, 'creatorId': 3,
+             'snapshots': [{'id': 10, 'creationDateMillis': 1000}]}
+LAST_MODIFIED = 'Mon, 19 Oct 2026 10:00:00 GMT'
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    '''Serves /api/networks with an ETag and /api/networks/1/snapshots
+    with a Last-Modified date
+    '''
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, self.headers.get('If-None-Match'),
+                                self.headers.get('If-Modified-Since')))
+        if self.path == '/api/networks':
+            etag = '"v%d"' % server.version
+            if self.headers.get('If-None-Match') == etag:
+                return self._send(304, {'ETag': etag})
+            body = [dict(NETWORKS[0], name='lab%d' % server.version)]
+            return self._send(200, {'ETag': etag}, body)
+        if self.path == '/api/networks/1/snapshots':
+            if self.headers.get('If-Modified-Since') == LAST_MODIFIED:
+                return self._send(304, {})
+            return self._send(200, {'Last-Modified': LAST_MODIFIED},
+                              SNAPSHOTS)
+        self._send(404, {})
+
+    def _send(self, status, headers, body=None):
+        content = '' if body is None else json.dumps(body)
+        self.send_response(status)
+        for name, value in headers.iteritems():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), Handler)
+    server.requests = []
+    server.version = 1
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def make_fwd(server, conditional_requests=True):
+    return Fwd('http://127.0.0.1:%d' % server.server_address[1], 'user',
+               'password', verbose=False,
+               conditional_requests=conditional_requests)
+
+
+def test_etag_revalidation():
+    server = start_server()
+    try:
+        fwd = make_fwd(server)
+        networks = fwd.get_networks_info()
+        assert networks[0].get_name() == 'lab1'
+        assert server.requests == [('/api/networks', None, None)]
+
+        # Not modified: the decoded networks are reused
+        again = fwd.get_networks_info()
+        assert again[0] is networks[0]
+        assert server.requests[-1] == ('/api/networks', '"v1"', None)
+
+        server.version = 2
+        assert fwd.get_networks_info()[0].get_name() == 'lab2'
+        assert fwd.get_networks_info()[0].get_name() == 'lab2'
+        assert server.requests[-1] == ('/api/networks', '"v2"', None)
+        assert len(server.requests) == 4
+    finally:
+        server.shutdown()
+
+
+def test_last_modified_revalidation():
+    server = start_server()
+    try:
+        fwd = make_fwd(server)
+        network = fwd.get_snapshots_info(1)
+        assert network.get_snapshots()[0].get_id() == 10
+        # Not modified: a copy of the decoded network is returned
+        again = fwd.get_snapshots_info(1)
+        assert again is not network
+        assert again.get_snapshots()[0] is network.get_snapshots()[0]
+        again.get_snapshots().pop()
+        assert len(fwd.get_snapshots_info(1).get_snapshots()) == 1
+        assert server.requests[-1] == ('/api/networks/1/snapshots', None,
+                                       LAST_MODIFIED)
+
+        fwd.clear_validators()
+        assert (fwd.get_snapshots_info(1).get_snapshots()[0] is not
+                network.get_snapshots()[0])
+        assert server.requests[-1] == ('/api/networks/1/snapshots', None,
+                                       None)
+    finally:
+        server.shutdown()
+
+
+def test_disabled_by_default():
+    server = start_server()
+    try:
+        fwd = make_fwd(server, conditional_requests=False)
+        fwd.get_networks_info()
+        fwd.get_networks_info()
+        assert server.requests == [('/api/networks', None, None)] * 2
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    test_etag_revalidation()
+    test_last_modified_revalidation()
+    test_disabled_by_default()
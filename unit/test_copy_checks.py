@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+import sys
+
+try:
+    from fwd_api.check import (ExistenceCheck, IsolationCheck,
+                               NetworkCheckType, RawCheck)
+    from fwd_api.fwd_filter import DeviceFilter
+    from fake_fwd import FakeCheckServer, FakeFwd
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+
+def test_copy_checks():
+    fwd = FakeFwd()
+    server = FakeCheckServer(fwd)
+    src_ids = [server.add_check(1, c.to_check_dict(), 'PASS')['id']
+               for c in [ExistenceCheck(DeviceFilter('a'), None, 'ex-a'),
+                         ExistenceCheck(DeviceFilter('b'), None, 'ex-b'),
+                         IsolationCheck(DeviceFilter('a'), None, 'iso-a')]]
+    # The destination already has one of them
+    existing = server.add_check(2, ExistenceCheck(
+        DeviceFilter('b'), None, 'ex-b').to_check_dict())
+
+    id_map = fwd.copy_checks(1, 2)
+    assert sorted(id_map) == src_ids
+    assert id_map[src_ids[1]] == existing['id']
+    assert len(server.checks[2]) == 3
+    copied = server.checks[2][id_map[src_ids[2]]]
+    assert RawCheck(copied['definition']).get_definition_hash() == \
+        RawCheck(server.checks[1][src_ids[2]]['definition']) \
+        .get_definition_hash()
+    # Copying again is a no-op
+    assert fwd.copy_checks(1, 2) == id_map
+    assert len(server.checks[2]) == 3
+
+
+def test_copy_checks_filtered():
+    fwd = FakeFwd()
+    server = FakeCheckServer(fwd)
+    for c in [ExistenceCheck(DeviceFilter('a'), None, 'ex-a'),
+              ExistenceCheck(DeviceFilter('b'), None, 'ex-b'),
+              IsolationCheck(DeviceFilter('a'), None, 'iso-a')]:
+        server.add_check(1, c.to_check_dict())
+    id_map = fwd.copy_checks(
+        1, 3, check_types=[NetworkCheckType.EXISTENTIAL], name_pattern='-a$')
+    assert len(id_map) == 1
+    assert server.checks[3].values()[0]['definition']['name'] == 'ex-a'
+
+
+def test_copy_checks_in_batches():
+    fwd = FakeFwd()
+    server = FakeCheckServer(fwd)
+    # Definitions repeat across upload batches
+    src_ids = [server.add_check(1, ExistenceCheck(
+        DeviceFilter('d%d' % (i % 30)), None, 'c').to_check_dict())['id']
+        for i in range(50)]
+    id_map = fwd.copy_checks(1, 2, max_concurrency=1)
+    assert sorted(id_map) == src_ids
+    assert len(server.checks[2]) == 30
+    assert fwd.count_requests('post', r'/api/snapshots/2/checks') == 30
+    for i, src_id in enumerate(src_ids):
+        assert id_map[src_id] == id_map[src_ids[i % 30]]
+        assert server.checks[2][id_map[src_id]]['definition'] == \
+            server.checks[1][src_id]['definition']
+
+
+if __name__ == '__main__':
+    test_copy_checks()
+    test_copy_checks_filtered()
+    test_copy_checks_in_batches()
@@ -33,6 +33,19 @@ def test_deserialization():
     assert device_response_list == EXPECTED_DEVICES
 
 
+def test_lookups():
+    devices_response = DevicesResponse(
+        EXPECTED_DEVICES + [DeviceResponse('veos-0', 3)])
+    # The first device of a name wins, as with a linear scan
+    assert devices_response.get_device_response_by_name('veos-0') == \
+        DeviceResponse('veos-0', 1)
+    assert devices_response.get_device_response_by_id(3) == \
+        DeviceResponse('veos-0', 3)
+    assert devices_response.get_device_response_by_name('veos-9') is None
+    assert devices_response.get_device_response_by_id(9) is None
+
+
 if __name__ == '__main__':
     test_deserialization()
+    test_lookups()
 
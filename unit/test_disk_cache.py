@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+try:
+    from fwd_api.disk_cache import DiskCache, make_key
+    from fwd_api.search import SearchBuilder
+    from fake_fwd import FakeFwd
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'fwd-api-data')
+
+
+def load(*path):
+    with open(os.path.join(DATA_DIR, *path)) as fd:
+        return json.loads(fd.read())
+
+
+def make_fwd(cache):
+    devices_json = load('devices', 'example.json')
+    ifaces_json = load('ifaces', 'example.json')
+    flows_json = load('flows', 'example.json')
+    fwd = FakeFwd(disk_cache=cache)
+    fwd.add_handler('get', r'/api/snapshots/(\d+)/devices/',
+                    lambda match, data: (200, devices_json))
+    fwd.add_handler('get', r'/api/snapshots/(\d+)/devices/(\d+)/interfaces',
+                    lambda match, data: (200, ifaces_json))
+    fwd.add_handler('post', r'/api/snapshots/(\d+)/flows',
+                    lambda match, data: (200, flows_json))
+    return fwd
+
+
+def test_make_key():
+    key = make_key('http://fwd/', 'alice', 1, '/api/snapshots/1/flows',
+                   {'b': 1, 'a': 2})
+    assert key == make_key('http://fwd', 'alice', 1,
+                           '/api/snapshots/1/flows', {'a': 2, 'b': 1})
+    assert key != make_key('http://fwd', 'alice', 2,
+                           '/api/snapshots/1/flows', {'a': 2, 'b': 1})
+    assert key != make_key('http://other', 'alice', 1,
+                           '/api/snapshots/1/flows', {'a': 2, 'b': 1})
+    assert key != make_key('http://fwd', 'bob', 1,
+                           '/api/snapshots/1/flows', {'a': 2, 'b': 1})
+
+
+def test_fwd_reads_snapshot_data_from_disk():
+    directory = tempfile.mkdtemp()
+    try:
+        fwd = make_fwd(DiskCache(directory))
+        search = SearchBuilder()
+        search.get_from_context().set_device('veos-0')
+        devices = fwd.get_devices(1)
+        fwd.get_ifaces(1, 2)
+        flows = fwd.get_flows(search, 1)
+
+        # A new process with the same directory starts warm
+        fwd = make_fwd(DiskCache(directory))
+        assert (fwd.get_devices(1).get_device_response_list()[0].get_name()
+                == devices.get_device_response_list()[0].get_name())
+        assert fwd.get_ifaces(1, 2).get_by_iface_name('et1') is not None
+        assert (len(fwd.get_flows(search, 1).get_flows_list()) ==
+                len(flows.get_flows_list()))
+        assert fwd.requests == []
+        assert fwd.disk_cache.get_hits() == 3
+
+        # Other snapshots and queries miss
+        fwd.get_devices(2)
+        search.get_to_context().set_l4_dst(80)
+        fwd.get_flows(search, 1)
+        assert len(fwd.requests) == 2
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_lru_eviction_by_size():
+    directory = tempfile.mkdtemp()
+    try:
+        body = os.urandom(1000)
+        cache = DiskCache(directory, max_bytes=2500)
+        cache.put('a', body)
+        cache.put('b', body)
+        os.utime(os.path.join(directory, 'a.z'), (1, 1))
+        os.utime(os.path.join(directory, 'b.z'), (2, 2))
+        assert cache.get('a') == body
+        # Evicts 'b', the least recently used entry
+        cache.put('c', body)
+        assert cache.get('b') is None
+        assert cache.get('a') == body
+        assert cache.get('c') == body
+        assert len(cache) == 2
+        assert cache.get_size_bytes() <= 2500
+
+        # The size of an existing directory is accounted for
+        assert DiskCache(directory).get_size_bytes() == \
+            cache.get_size_bytes()
+        cache.clear()
+        assert len(cache) == 0
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_read_only_cache():
+    directory = tempfile.mkdtemp()
+    utime, mkstemp, rename = os.utime, tempfile.mkstemp, os.rename
+
+    def read_only(*args, **kwargs):
+        raise OSError(30, 'Read-only file system')
+    try:
+        cache = DiskCache(directory)
+        cache.put('a', 'body')
+        os.utime = read_only
+        assert cache.get('a') == 'body'
+        assert cache.get_hits() == 1
+
+        # Writes fail silently, and searches still succeed
+        tempfile.mkstemp = read_only
+        cache.put('b', 'body')
+        assert cache.get('b') is None
+        assert make_fwd(cache).get_devices(1) is not None
+        tempfile.mkstemp = mkstemp
+        os.rename = read_only
+        cache.put('b', 'body')
+        assert os.listdir(directory) == ['a.z']
+        assert cache.get_size_bytes() == os.path.getsize(
+            os.path.join(directory, 'a.z'))
+    finally:
+        os.utime, tempfile.mkstemp, os.rename = utime, mkstemp, rename
+        shutil.rmtree(directory)
+
+
+def test_error_bodies_not_cached():
+    directory = tempfile.mkdtemp()
+    try:
+        responses = [{'error': 'Snapshot is being processed'},
+                     load('devices', 'example.json')]
+        fwd = FakeFwd(disk_cache=DiskCache(directory))
+        fwd.add_handler('get', r'/api/snapshots/(\d+)/devices/',
+                        lambda match, data: (200, responses.pop(0)))
+        try:
+            fwd.get_devices(1)
+            raised = False
+        except Exception:
+            raised = True
+        assert raised
+        assert len(fwd.disk_cache) == 0
+        fwd.get_devices(1)
+        assert len(fwd.disk_cache) == 1
+        assert len(fwd.requests) == 2
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    test_make_key()
+    test_fwd_reads_snapshot_data_from_disk()
+    test_lru_eviction_by_size()
+    test_read_only_cache()
+    test_error_bodies_not_cached()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+import sys
+
+try:
+    from fwd_api import canonical
+    from fwd_api.check import IsolationCheck, ReachabilityCheck
+    from fwd_api.fwd_filter import (DeviceFilter, EndpointFilter, IpDstField,
+                                    L4DstField, LocationFilter, NotFilter,
+                                    PacketFilter, intern_filter)
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+
+def make_endpoint(ports):
+    return EndpointFilter(
+        DeviceFilter('veos-0'),
+        [PacketFilter([IpDstField('10.0.0.1'), L4DstField(port)])
+         for port in ports] +
+        [NotFilter(PacketFilter([L4DstField(23)]))])
+
+
+def test_structural_equality():
+    a = make_endpoint([22, 80])
+    b = make_endpoint([80, 22])
+    assert a == b
+    assert hash(a) == hash(b)
+    assert a != make_endpoint([22])
+    assert len(set([a, b, make_endpoint([22])])) == 2
+    assert DeviceFilter('veos-0') != NotFilter(DeviceFilter('veos-0'))
+
+
+def test_immutable():
+    f = DeviceFilter('veos-0')
+    try:
+        f._device_name = 'veos-1'
+        assert False
+    except AttributeError:
+        pass
+    assert f.as_dict() == {'type': 'DeviceFilter', 'values': ['veos-0']}
+
+
+def test_cached_forms():
+    f = make_endpoint([22, 80])
+    assert f.as_json() is f.as_json()
+    assert f.as_json() == canonical.canonical_json(f.as_dict())
+    assert f.fingerprint() == canonical.fingerprint(f.as_dict())
+
+
+def test_as_dict_returns_copies():
+    f = make_endpoint([22, 80])
+    json_before = f.as_json()
+    d = f.as_dict()
+    assert d == f.as_dict() and d is not f.as_dict()
+    d['location']['values'].append('veos-1')
+    d['headers'].pop()
+    assert f.as_dict() != d
+    assert canonical.canonical_json(f.as_dict()) == json_before
+    # Interned twins are not affected either
+    assert make_endpoint([22, 80]).as_dict() == f.as_dict()
+
+
+def test_interning():
+    a = make_endpoint([22])
+    b = make_endpoint([22])
+    assert a is not b
+    assert intern_filter(a) is intern_filter(b)
+    # Sub-filters of composite filters are interned
+    assert a._location is b._location
+    assert a._headers[1]._clause is b._headers[1]._clause
+
+
+def test_check_json_reuses_filters():
+    src = make_endpoint([22, 80])
+    checks = [IsolationCheck(src, DeviceFilter('veos-1'), name='iso'),
+              ReachabilityCheck(src, name=u'reach \u00e9')]
+    for check in checks:
+        assert (check.to_check_json() ==
+                canonical.canonical_json(check.to_check_dict()))
+    # Serialized once, when the first check was
+    assert '_json' in src.__dict__
+
+
+def test_subclass_overrides_as_dict():
+    class TagFilter(LocationFilter):
+        def __init__(self, tag):
+            self._tag = tag
+
+        def as_dict(self):
+            return {'type': 'TagFilter', 'values': [self._tag]}
+
+    f = TagFilter('edge')
+    assert f.as_json() == '{"type":"TagFilter","values":["edge"]}'
+    assert NotFilter(f).as_dict()['clause'] == f.as_dict()
+
+
+if __name__ == '__main__':
+    test_structural_equality()
+    test_immutable()
+    test_cached_forms()
+    test_as_dict_returns_copies()
+    test_interning()
+    test_check_json_reuses_filters()
+    test_subclass_overrides_as_dict()
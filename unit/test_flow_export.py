@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+import csv
+import json
+import os
+import sys
+from StringIO import StringIO
+
+try:
+    from fwd_api import flow_export
+    from fwd_api.flow import FlowsResponse
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+FLOWS_JSON = os.path.join(os.path.dirname(__file__),
+                          '..', 'fwd-api-data', 'flows',
+                          'example.json')
+
+
+def load_flows_response():
+    with open(FLOWS_JSON) as fd:
+        return FlowsResponse.from_json(json.loads(fd.read()))
+
+
+def test_jsonl():
+    flows_response = load_flows_response()
+    out = StringIO()
+    count = flow_export.write_flows_jsonl(flows_response.iter_flows(), out)
+    lines = out.getvalue().splitlines()
+    assert count == len(lines) == 10
+
+    flows_list = flows_response.get_flows_list()
+    for line, flow in zip(lines, flows_list):
+        row = json.loads(line)
+        assert row['flowType'] == flow.get_flow_type()
+        assert row['hops'] == flow.get_unexploded_path().as_dict()['hops']
+
+
+def test_csv():
+    flows_response = load_flows_response()
+    out = StringIO()
+    count = flow_export.write_flows_csv(flows_response.iter_flows(), out)
+    rows = list(csv.reader(StringIO(out.getvalue())))
+    assert count == 10
+    assert rows[0] == flow_export.CSV_COLUMNS
+
+    num_hops = sum(len(f.get_unexploded_path().get_hop_list())
+                   for f in flows_response.get_flows_list())
+    assert len(rows) == num_hops + 1
+    # First hop of first flow ingresses veos-0 on et1 or et3
+    assert rows[1][:5] == ['0', 'VALID', '0', 'veos-0', 'et1;et3']
+
+
+if __name__ == '__main__':
+    test_jsonl()
+    test_csv()
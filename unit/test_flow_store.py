@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+try:
+    from fwd_api import flow_store
+    from fwd_api.flow import FlowsResponse
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+FLOWS_JSON = os.path.join(os.path.dirname(__file__),
+                          '..', 'fwd-api-data', 'flows',
+                          'example.json')
+
+
+def load_flows():
+    with open(FLOWS_JSON) as fd:
+        return FlowsResponse.from_json(json.loads(fd.read())).get_flows_list()
+
+
+def test_round_trip():
+    flows = load_flows()
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, 'flows.bin')
+        assert flow_store.write_flow_store(path, iter(flows)) == len(flows)
+        with flow_store.FlowStoreWriter(path) as writer:
+            writer.add_flows(flows)
+            assert len(writer) == len(flows)
+
+        with flow_store.FlowStoreReader(path) as store:
+            assert len(store) == len(flows)
+            for stored, expected in zip(store, flows):
+                assert stored.get_flow_type() == expected.get_flow_type()
+                assert (stored.get_unexploded_path() ==
+                        expected.get_unexploded_path())
+            assert (store[-1].get_unexploded_path() ==
+                    flows[-1].get_unexploded_path())
+            assert store.get_flow_type(1) == flows[1].get_flow_type()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_rejects_other_files():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, 'flows.bin')
+        with open(path, 'wb') as fd:
+            fd.write('x' * 512)
+        try:
+            flow_store.FlowStoreReader(path)
+            assert False
+        except ValueError:
+            pass
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    test_round_trip()
+    test_rejects_other_files()
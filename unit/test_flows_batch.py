@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+import json
+import os
+import sys
+
+try:
+    from fwd_api.search import SearchBuilder
+    from fake_fwd import FakeFwd
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+FLOWS_JSON = os.path.join(os.path.dirname(__file__),
+                          '..', 'fwd-api-data', 'flows',
+                          'example.json')
+
+
+def make_fwd():
+    with open(FLOWS_JSON) as fd:
+        flows_json = json.loads(fd.read())
+
+    def handle_flows(match, data):
+        if 'bad-device' in data:
+            return (400, {'error': 'unknown device'})
+        return (200, flows_json)
+
+    fwd = FakeFwd()
+    fwd.add_handler('post', r'/api/snapshots/(\d+)/flows', handle_flows)
+    return fwd
+
+
+def builder_from(device_name):
+    search_builder = SearchBuilder()
+    search_builder.get_from_context().set_device(device_name)
+    return search_builder
+
+
+def test_batch_dedup_and_order():
+    fwd = make_fwd()
+    builders = [builder_from(name)
+                for name in ['veos-0', 'veos-1', 'veos-0', 'bad-device']]
+    results = fwd.get_flows_batch(builders, 3, max_concurrency=2)
+
+    assert [r.get_index() for r in results] == [0, 1, 2, 3]
+    assert [r.get_request() for r in results] == builders
+    # Identical queries are sent once and share their response
+    assert fwd.count_requests('post', r'/api/snapshots/3/flows') == 3
+    assert results[0].get_result() is results[2].get_result()
+    assert results[1].is_success()
+    # Errors are isolated to their own query
+    assert not results[3].is_success()
+    assert 'Bad request' in str(results[3].get_error())
+
+
+def test_batch_stream():
+    fwd = make_fwd()
+    builders = [builder_from('veos-%d' % i) for i in range(20)]
+    results = list(fwd.get_flows_batch(builders, 3, stream=True))
+    assert sorted(r.get_index() for r in results) == range(20)
+    assert all(r.is_success() for r in results)
+
+
+if __name__ == '__main__':
+    test_batch_dedup_and_order()
+    test_batch_stream()
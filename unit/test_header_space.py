@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+import json
+import os
+import sys
+
+try:
+    from fwd_api.flow import FlowsResponse
+    from fwd_api.header_space import HeaderSpace
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+FLOWS_JSON = os.path.join(os.path.dirname(__file__),
+                          '..', 'fwd-api-data', 'flows',
+                          'example.json')
+
+
+def load_flows(retain_header_space):
+    with open(FLOWS_JSON) as fd:
+        json_dict = json.loads(fd.read())
+    return FlowsResponse.from_json(
+        json_dict, retain_header_space).get_flows_list()
+
+
+def test_cube_operations():
+    ten_8 = HeaderSpace.from_fields({'ipv4_dst': '10.0.0.0/8'})
+    ten_16 = HeaderSpace.from_fields({'ipv4_dst': '10.1.0.0/16'})
+    eleven_8 = HeaderSpace.from_fields({'ipv4_dst': '11.0.0.0/8'})
+
+    assert ten_16.is_subset(ten_8)
+    assert not ten_8.is_subset(ten_16)
+    assert ten_8.intersects(ten_16)
+    assert not ten_8.intersects(eleven_8)
+    assert ten_8.intersect(eleven_8).is_empty()
+
+
+def test_subtraction():
+    ten_8 = HeaderSpace.from_fields({'ipv4_dst': '10.0.0.0/8'})
+    ten_9 = HeaderSpace.from_fields({'ipv4_dst': '10.0.0.0/9'})
+    upper_half = HeaderSpace.from_fields({'ipv4_dst': '10.128.0.0/9'})
+
+    remainder = ten_8.subtract(ten_9)
+    assert remainder.is_subset(upper_half)
+    assert upper_half.is_subset(remainder)
+    assert not remainder.intersects(ten_9)
+    assert ten_8.subtract(ten_8).is_empty()
+
+
+def test_ranges_and_vlans():
+    web = HeaderSpace.from_fields({'tp_dst': '80-90'})
+    assert HeaderSpace.from_fields({'tp_dst': '85'}).is_subset(web)
+    assert not HeaderSpace.from_fields({'tp_dst': '91'}).intersects(web)
+
+    tagged = HeaderSpace.from_fields({'vlan_vid': '1-4095'})
+    untagged = HeaderSpace.from_fields({'vlan_vid': 'untagged'})
+    assert not tagged.intersects(untagged)
+
+
+def test_flows_without_header_space():
+    flows = load_flows(retain_header_space=False)
+    assert not flows[0].has_header_space()
+
+
+def test_flow_header_space():
+    flows = load_flows(retain_header_space=True)
+    last_flow = flows[-1]
+    num_hops = len(last_flow.get_unexploded_path().get_hop_list())
+
+    # Last flow is destined to 1.0.0.6 or 18.0.0.5
+    ingress = last_flow.get_ingress_header_space(0)
+    assert ingress.intersects(
+        HeaderSpace.from_fields({'ipv4_dst': '1.0.0.0/24'}))
+    assert ingress.is_subset(
+        HeaderSpace.from_fields({'ipv4_dst': '1.0.0.6, 18.0.0.5'}))
+    assert not ingress.intersects(
+        HeaderSpace.from_fields({'ipv4_dst': '10.0.0.0/8'}))
+
+    # Final hop consumes the packet, so there is no egress header space
+    assert last_flow.get_egress_header_space(num_hops - 1) is None
+    assert last_flow.get_egress_header_space(0) is not None
+
+
+if __name__ == '__main__':
+    test_cube_operations()
+    test_subtraction()
+    test_ranges_and_vlans()
+    test_flows_without_header_space()
+    test_flow_header_space()
@@ -39,8 +39,22 @@ def test_deserialization():
         assert found
 
 
+def test_lookups():
+    with open(IFACES_JSON) as fd:
+        ifaces_response = IfacesResponse.from_json(json.loads(fd.read()))
+    assert ifaces_response.get_by_iface_name('ethernet3') \
+        .get_primary_name() == 'et3'
+    assert ifaces_response.get_by_iface_name('port-channel20') \
+        .get_primary_name() == 'po20'
+    assert ifaces_response.get_by_iface_name('et9') is None
+    assert ifaces_response.get_parent_by_member_port('et4') \
+        .get_primary_name() == 'po20'
+    assert ifaces_response.get_parent_by_member_port('et1') is None
+
+
 if __name__ == '__main__':
     test_deserialization()
+    test_lookups()
 
 
 
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+import json
+import os
+import sys
+
+try:
+    from fwd_api.path import DeviceIfaceListPair
+    from fake_fwd import FakeFwd
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'fwd-api-data')
+
+
+def load(*path):
+    with open(os.path.join(DATA_DIR, *path)) as fd:
+        return json.loads(fd.read())
+
+
+def make_fwd():
+    devices_json = load('devices', 'example.json')
+    ifaces_json = load('ifaces', 'example.json')
+    devices_json.append({'id': 3, 'name': 'broken'})
+    fwd = FakeFwd()
+    fwd.add_handler('get', r'/api/snapshots/(\d+)/devices/',
+                    lambda match, data: (200, devices_json))
+
+    def get_ifaces(match, data):
+        if match.group(2) == '3':
+            return (404, None)
+        return (200, ifaces_json)
+
+    fwd.add_handler('get', r'/api/snapshots/(\d+)/devices/(\d+)/interfaces',
+                    get_ifaces)
+    return fwd
+
+
+def test_get_inventory():
+    fwd = make_fwd()
+    inventory = fwd.get_inventory(1, max_concurrency=2)
+
+    assert inventory.get_device_names() == ['veos-0', 'veos-1', 'broken']
+    assert fwd.count_requests(
+        'get', r'/api/snapshots/1/devices/\d+/interfaces') == 3
+    assert not inventory.is_complete()
+    assert inventory.get_errors().keys() == ['broken']
+    assert inventory.get_ifaces('broken') is None
+
+    assert inventory.get_device('veos-1').get_id() == 2
+    assert inventory.to_device_iface_pair('veos-1', 'ethernet2') \
+        .as_fwd_repr() == 'veos-1 et2'
+    assert inventory.get_member_ports('veos-0', 'port-channel20') == \
+        DeviceIfaceListPair('veos-0', ['et4', 'et3'])
+    assert inventory.get_port_channel('veos-0', 'et3') \
+        .get_primary_name() == 'po20'
+    assert inventory.get_iface('veos-0', 'et9') is None
+
+
+if __name__ == '__main__':
+    test_get_inventory()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import sys
+
+try:
+    from fwd_api.json_stream import iter_json_array
+    from fake_fwd import FakeCheckServer, FakeFwd
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+
+def chunked(s, size):
+    return [s[i:i + size] for i in range(0, len(s), size)]
+
+
+def test_iter_json_array():
+    values = [{'id': 1, 'name': u'caf\xe9', 'nested': [1, {'a': None}]},
+              12345, -0.5, 'x', [], True, None,
+              {'s': 'a]\\"}{[\\\\', 'e': 1e-7}, '\\']
+    doc = ' [ ' + ' , '.join(json.dumps(v, ensure_ascii=False)
+                             .encode('utf-8') for v in values) + ' ]\n'
+    for size in [1, 2, 7, len(doc)]:
+        assert list(iter_json_array(chunked(doc, size))) == values
+    assert list(iter_json_array(chunked(' [ ] ', 1))) == []
+
+
+def test_iter_json_array_errors():
+    for doc in ['{"error": "x"}', '[1, 2', '[1 2]', '[1]x', '',
+                '[1,]', '[{"a": 1]', '["a\\"]', '[tru]', '[}]']:
+        try:
+            list(iter_json_array(chunked(doc, 2)))
+            assert False, doc
+        except ValueError:
+            pass
+
+
+def test_projected_checks():
+    fwd = FakeFwd()
+    server = FakeCheckServer(fwd)
+    for i in range(3):
+        server.add_check(1, {'checkType': 'Existential', 'name': 'c%d' % i,
+                             'filters': {}}, 'PASS')
+    results = list(fwd.iter_checks(1, hash_definitions=True))
+    assert [r.get_name() for r in results] == ['c0', 'c1', 'c2']
+    assert results[0].get_response() is None
+    assert results[0].get_definition_hash() is not None
+    full = fwd.get_checks(1)
+    assert full[0].get_response()['definition']['filters'] == {}
+    assert full[0].get_definition_hash() == results[0].get_definition_hash()
+
+
+if __name__ == '__main__':
+    test_iter_json_array()
+    test_iter_json_array_errors()
+    test_projected_checks()
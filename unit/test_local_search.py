@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+import json
+import os
+import sys
+
+try:
+    from fwd_api import local_search
+    from fwd_api.flow import FlowsResponse, FlowType
+    from fwd_api.fwd_filter import (DeviceFilter, EndpointFilter,
+                                    HostAliasFilter, IfaceFilter, IpDstField,
+                                    NotFilter, PacketFilter)
+    from fwd_api.path import DeviceIfacePair
+    from fwd_api.search import SearchBuilder
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+FLOWS_JSON = os.path.join(os.path.dirname(__file__),
+                          '..', 'fwd-api-data', 'flows',
+                          'example.json')
+
+
+def load_flows():
+    with open(FLOWS_JSON) as fd:
+        json_dict = json.loads(fd.read())
+    return FlowsResponse.from_json(
+        json_dict, retain_header_space=True).get_flows_list()
+
+
+def test_location_filters():
+    flows = load_flows()
+    to_veos_1 = local_search.compile_endpoint_filter(
+        DeviceFilter('veos-1'), local_search.TO)
+    assert len(local_search.filter_flows(flows, to_veos_1)) == 4
+
+    not_to_veos_1 = local_search.compile_endpoint_filter(
+        NotFilter(DeviceFilter('veos-1')), local_search.TO)
+    assert len(local_search.filter_flows(flows, not_to_veos_1)) == 6
+
+    from_ma1 = local_search.compile_endpoint_filter(
+        IfaceFilter(DeviceIfacePair('veos-0', 'ma1')), local_search.FROM)
+    assert len(local_search.filter_flows(flows, from_ma1)) == 2
+
+
+def test_header_filters():
+    flows = load_flows()
+    to_subnet = EndpointFilter(
+        DeviceFilter('veos-0'), [PacketFilter([IpDstField('1.0.0.6')])])
+    predicate = local_search.compile_endpoint_filter(to_subnet,
+                                                     local_search.FROM)
+    matching = local_search.filter_flows(flows, predicate)
+    assert flows[-1] in matching
+
+    excluded = EndpointFilter(
+        None, [NotFilter(PacketFilter([IpDstField('0.0.0.0/0')]))])
+    predicate = local_search.compile_endpoint_filter(excluded,
+                                                     local_search.FROM)
+    assert local_search.filter_flows(flows, predicate) == []
+
+
+def test_search_builder():
+    flows = load_flows()
+    search_builder = SearchBuilder()
+    search_builder.get_to_context().set_device('veos-1')
+    search_builder.add_flow_type(FlowType.VALID)
+    assert len(local_search.filter_flows(flows, search_builder)) == 4
+
+    search_builder.get_from_context().set_ip_dst('10.0.0.0/8')
+    assert local_search.filter_flows(flows, search_builder) == []
+
+
+def test_server_side_filters_rejected():
+    try:
+        local_search.compile_endpoint_filter(HostAliasFilter('hosts'),
+                                             local_search.FROM)
+        assert False
+    except ValueError:
+        pass
+
+
+if __name__ == '__main__':
+    test_location_filters()
+    test_header_filters()
+    test_search_builder()
+    test_server_side_filters_rejected()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+import sys
+
+try:
+    from fwd_api.alias import HostAlias, IpV4TrafficAlias
+    from fwd_api.fwd_filter import HostFilter
+    from fwd_api.prefix_set import PrefixSet, find_shadowed
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+
+def test_collapse():
+    prefixes = PrefixSet(['10.0.0.0/25', '10.0.0.128/25', '10.0.0.7',
+                          '10.0.1.0/24', '192.168.1.1', '2001:db8::/33',
+                          '2001:db8:8000::/33', '2001:db8::1'])
+    assert prefixes.to_list() == ['10.0.0.0/23', '192.168.1.1',
+                                  '2001:db8::/32']
+    assert not prefixes.add('10.0.1.5')
+    assert prefixes.add('10.0.2.0/24')
+    assert PrefixSet().is_empty()
+
+
+def test_contains_and_overlaps():
+    prefixes = PrefixSet(['10.0.0.0/16', '2001:db8::/32'])
+    assert prefixes.contains('10.0.3.0/24')
+    assert prefixes.contains('2001:db8::1')
+    assert not prefixes.contains('10.0.0.0/8')
+    assert prefixes.overlaps('10.0.0.0/8')
+    assert not prefixes.overlaps('10.1.0.0/16')
+    assert prefixes.overlaps(PrefixSet(['10.0.255.255']))
+    assert not prefixes.overlaps(PrefixSet(['11.0.0.0/8', '2001::/32']))
+    assert PrefixSet(['10.0.1.0/24', '2001:db8::1']).is_subset(prefixes)
+    assert not PrefixSet(['10.0.0.0/15']).is_subset(prefixes)
+
+
+def test_find_shadowed():
+    entries = ['10.0.0.1', 'host-a', '10.0.0.0/24', '10.0.0.0/24',
+               '10.0.1.0/24']
+    assert find_shadowed(entries) == [('10.0.0.1', '10.0.0.0/24'),
+                                      ('10.0.0.0/24', '10.0.0.0/24')]
+
+
+def test_aliases_and_filters():
+    alias = IpV4TrafficAlias('a', ['10.0.0.0/25', '10.0.0.128/25'],
+                             collapse=True)
+    assert alias._to_alias_dict()['values']['ip_addr'] == ['10.0.0.0/24']
+    hosts = HostAlias('h', ['10.0.0.1', 'host-a', '10.0.0.0/31'],
+                      collapse=True)
+    assert hosts._to_alias_dict()['values'] == ['host-a', '10.0.0.0/31']
+    assert hosts.get_prefix_set().overlaps(alias.get_prefix_set())
+    assert HostFilter('10.0.0.0/8').get_prefix_set().contains('10.1.0.0/16')
+    assert HostFilter('host-a').get_prefix_set().is_empty()
+
+
+if __name__ == '__main__':
+    test_collapse()
+    test_contains_and_overlaps()
+    test_find_shadowed()
+    test_aliases_and_filters()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+import json
+import os
+import sys
+
+try:
+    from fwd_api.fwd_filter import Placeholder
+    from fwd_api.prepared_search import PreparedSearch
+    from fwd_api.search import SearchBuilder
+    from fake_fwd import FakeFwd
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+FLOWS_JSON = os.path.join(os.path.dirname(__file__),
+                          '..', 'fwd-api-data', 'flows',
+                          'example.json')
+
+
+def build(ip_dst, l4_dst):
+    search_builder = SearchBuilder()
+    search_builder.get_from_context().set_device('veos-0')
+    search_builder.get_to_context().set_ip_dst(ip_dst).set_l4_dst(l4_dst)
+    return search_builder
+
+
+def test_bind_matches_built_query():
+    prepared = PreparedSearch(build(Placeholder('ip_dst'),
+                                    Placeholder('l4_dst')))
+    assert prepared.get_placeholder_names() == ['ip_dst', 'l4_dst']
+    expected = build('10.0.0.1', 22).canonical_json()
+    assert prepared.bind('10.0.0.1', 22) == expected
+    assert prepared.bind(l4_dst=22, ip_dst='10.0.0.1') == expected
+    assert (list(prepared.bind_many([('10.0.0.1', 22),
+                                     {'ip_dst': '10.0.0.2', 'l4_dst': 80}]))
+            == [expected, build('10.0.0.2', 80).canonical_json()])
+
+
+def test_bind_errors():
+    prepared = PreparedSearch(build(Placeholder('ip_dst'),
+                                    Placeholder('l4_dst')))
+    for args, kwargs in [(('10.0.0.1',), {}),
+                         ((), {'ip_dst': '10.0.0.1'}),
+                         (('2001:db8::1', 22), {}),
+                         ((167772161, 22), {}),
+                         ((), {'ip_dst': 167772161L, 'l4_dst': 22})]:
+        try:
+            prepared.bind(*args, **kwargs)
+            assert False
+        except ValueError:
+            pass
+
+    v6 = PreparedSearch(build(Placeholder('ip_dst', ipv6=True), 22))
+    assert v6.bind('2001:db8::1') == build('2001:db8::1', 22).canonical_json()
+
+
+def test_positional_order():
+    search_builder = SearchBuilder()
+    # Neither the order in which fields are set nor the alphabetical
+    # order of names matters
+    search_builder.get_to_context().set_ip_dst(Placeholder('dst'))
+    search_builder.get_from_context().set_ip_src(Placeholder('src'))
+    prepared = PreparedSearch(search_builder)
+    assert prepared.get_placeholder_names() == ['src', 'dst']
+
+    expected = SearchBuilder()
+    expected.get_from_context().set_ip_src('10.0.0.1')
+    expected.get_to_context().set_ip_dst('10.0.0.2')
+    assert prepared.bind('10.0.0.1', '10.0.0.2') == expected.canonical_json()
+
+
+def test_get_flows_prepared():
+    with open(FLOWS_JSON) as fd:
+        flows_json = json.loads(fd.read())
+    bodies = []
+
+    def handle_flows(match, data):
+        bodies.append(data)
+        return (200, flows_json)
+
+    fwd = FakeFwd()
+    fwd.add_handler('post', r'/api/snapshots/(\d+)/flows', handle_flows)
+    prepared = PreparedSearch(build(Placeholder('ip_dst'), 22))
+    bindings = [('10.0.0.%d' % (i % 5),) for i in range(20)]
+    results = fwd.get_flows_prepared(prepared, bindings, 5)
+
+    assert [r.get_request() for r in results] == bindings
+    assert all(r.is_success() for r in results)
+    # Equal bindings are only sent once
+    assert len(bodies) == 5
+
+
+if __name__ == '__main__':
+    test_bind_matches_built_query()
+    test_bind_errors()
+    test_positional_order()
+    test_get_flows_prepared()
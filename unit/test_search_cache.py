@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+import json
+import os
+import sys
+
+try:
+    from fwd_api.flow import FlowType
+    from fwd_api.fwd_filter import (DeviceFilter, EndpointFilter,
+                                    IpDstField, L4DstField, PacketFilter)
+    from fwd_api.search import SearchBuilder
+    from fwd_api.search_cache import SearchResultCache
+    from fake_fwd import FakeFwd
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+FLOWS_JSON = os.path.join(os.path.dirname(__file__),
+                          '..', 'fwd-api-data', 'flows',
+                          'example.json')
+
+
+def test_equal_queries_equal_fingerprints():
+    a = SearchBuilder()
+    a.get_from_context().set_device('veos-0').set_ip_dst('1.0.0.6')
+    a.get_to_context().set_l4_dst(80)
+    a.add_flow_type(FlowType.VALID).add_flow_type(FlowType.DROPPED)
+
+    b = SearchBuilder()
+    b.add_flow_type(FlowType.DROPPED).add_flow_type(FlowType.VALID)
+    b.get_to_context().set_l4_dst(80)
+    b.get_from_context().set_ip_dst('1.0.0.6').set_device('veos-0')
+
+    assert a.canonical_json() == b.canonical_json()
+    assert a.fingerprint() == b.fingerprint()
+
+    b.get_to_context().set_l4_dst(443)
+    assert a.fingerprint() != b.fingerprint()
+
+
+def test_filter_fingerprint_ignores_header_order():
+    ip = PacketFilter([IpDstField('10.0.0.1')])
+    port = PacketFilter([L4DstField(22)])
+    a = EndpointFilter(DeviceFilter('veos-0'), [ip, port])
+    b = EndpointFilter(DeviceFilter('veos-0'), [port, ip])
+    assert a.fingerprint() == b.fingerprint()
+
+
+def test_lru_eviction_by_bytes():
+    cache = SearchResultCache(max_bytes=10)
+    cache.put(1, 'a', 'A', 4)
+    cache.put(1, 'b', 'B', 4)
+    assert cache.get(1, 'a') == 'A'
+    # Evicts 'b', the least recently used entry
+    cache.put(1, 'c', 'C', 4)
+    assert cache.get(1, 'b') is None
+    assert cache.get(1, 'a') == 'A'
+    assert cache.get(1, 'c') == 'C'
+    assert cache.get_size_bytes() == 8
+    # Too large to cache at all
+    cache.put(2, 'a', 'big', 11)
+    assert cache.get(2, 'a') is None
+
+
+def test_get_flows_uses_cache():
+    with open(FLOWS_JSON) as fd:
+        flows_json = json.loads(fd.read())
+    fwd = FakeFwd(search_cache=SearchResultCache())
+    fwd.add_handler('post', r'/api/snapshots/(\d+)/flows',
+                    lambda match, data: (200, flows_json))
+
+    a = SearchBuilder()
+    a.get_from_context().set_device('veos-0').set_l4_dst(80)
+    b = SearchBuilder()
+    b.get_from_context().set_l4_dst(80).set_device('veos-0')
+
+    first = fwd.get_flows(a, 7)
+    assert fwd.get_flows(b, 7) is first
+    assert fwd.count_requests('post', r'/api/snapshots/7/flows') == 1
+
+    # Different snapshot misses
+    fwd.get_flows(b, 8)
+    assert fwd.count_requests('post', r'/api/snapshots/8/flows') == 1
+
+
+def test_cache_shared_by_servers_and_users():
+    with open(FLOWS_JSON) as fd:
+        flows_json = json.loads(fd.read())
+    cache = SearchResultCache()
+    search = SearchBuilder()
+    search.get_from_context().set_device('veos-0')
+    fwds = [FakeFwd(search_cache=cache) for _ in range(3)]
+    fwds[1].username = 'other'
+    fwds[2].url = 'http://other'
+    for fwd in fwds:
+        fwd.add_handler('post', r'/api/snapshots/(\d+)/flows',
+                        lambda match, data: (200, flows_json))
+        fwd.get_flows(search, 7)
+        fwd.get_flows(search, 7)
+        assert fwd.count_requests('post', r'/api/snapshots/7/flows') == 1
+    assert len(cache) == 3
+
+
+if __name__ == '__main__':
+    test_equal_queries_equal_fingerprints()
+    test_filter_fingerprint_ignores_header_order()
+    test_lru_eviction_by_bytes()
+    test_get_flows_uses_cache()
+    test_cache_shared_by_servers_and_users()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+import json
+import os
+import sys
+
+try:
+    from fwd_api import search_planner
+    from fwd_api.flow import FlowType
+    from fwd_api.search import SearchBuilder, SearchFields
+    from fake_fwd import FakeFwd
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+FLOWS_JSON = os.path.join(os.path.dirname(__file__),
+                          '..', 'fwd-api-data', 'flows',
+                          'example.json')
+
+
+def ip_srcs(shards):
+    return [s.get_from_context().get_field_value(SearchFields.IP_SRC)
+            for s in shards]
+
+
+def test_split_by_ip_src():
+    search_builder = SearchBuilder()
+    search_builder.get_from_context().set_ip_src('10.0.0.0/8')
+    shards = search_planner.split_by_ip_src(search_builder, num_bits=2)
+    assert ip_srcs(shards) == ['10.0.0.0/10', '10.64.0.0/10',
+                               '10.128.0.0/10', '10.192.0.0/10']
+    # The original builder is left untouched
+    assert ip_srcs([search_builder]) == ['10.0.0.0/8']
+
+    host = SearchBuilder()
+    host.get_from_context().set_ip_src('10.0.0.1')
+    assert ip_srcs(search_planner.split_by_ip_src(host)) == ['10.0.0.1']
+
+    v6 = SearchBuilder()
+    v6.get_from_context().set_ip_src('2001:db8::/32')
+    assert ip_srcs(search_planner.split_by_ip_src(v6)) == [
+        '2001:db8::/33', '2001:db8:8000::/33']
+
+
+def test_composed_splits():
+    search_builder = SearchBuilder()
+    search_builder.get_from_context().set_ip_src('10.0.0.0/8')
+    search_builder.add_flow_type(FlowType.VALID)
+    search_builder.add_flow_type(FlowType.DROPPED)
+    shards = search_planner.split_by_flow_type(
+        search_planner.split_by_device(
+            search_planner.split_by_ip_src(search_builder),
+            ['veos-0', 'veos-1']))
+    assert len(shards) == 8
+    assert len(set(s.fingerprint() for s in shards)) == 8
+    assert all(len(s.get_flow_types()) == 1 for s in shards)
+
+
+def test_get_flows_sharded():
+    with open(FLOWS_JSON) as fd:
+        flows_json = json.loads(fd.read())
+    fwd = FakeFwd()
+    fwd.add_handler('post', r'/api/snapshots/(\d+)/flows',
+                    lambda match, data: (200, flows_json))
+
+    search_builder = SearchBuilder()
+    search_builder.get_from_context().set_ip_src('10.0.0.0/8')
+    shards = search_planner.split_by_ip_src(search_builder, num_bits=2)
+    merged = fwd.get_flows_sharded(shards, 1)
+    single = fwd.get_flows(search_builder, 1)
+    # Every shard returns the same flows, which are merged once
+    assert len(merged.get_flows_list()) == len(single.get_flows_list())
+    assert merged.get_paged_flows() == single.get_paged_flows()
+    # The summed total is an upper bound
+    assert merged.get_total_flows().get_total_flows() == 10 * len(shards)
+    assert merged.get_total_flows().get_flows_type() == 'UPPER_BOUND'
+
+    device_shards = search_planner.split_by_device(search_builder,
+                                                   ['veos-0', 'veos-1'])
+    merged = fwd.get_flows_sharded(device_shards, 1, disjoint=True)
+    assert merged.get_total_flows().get_total_flows() == 20
+    assert merged.get_total_flows().get_flows_type() == 'EXACT'
+
+
+def test_split_by_flow_type_leaves_unrestricted_searches():
+    shards = search_planner.split_by_flow_type(SearchBuilder())
+    assert len(shards) == 1
+    assert shards[0].get_flow_types() is None
+
+
+if __name__ == '__main__':
+    test_split_by_ip_src()
+    test_composed_splits()
+    test_get_flows_sharded()
+    test_split_by_flow_type_leaves_unrestricted_searches()
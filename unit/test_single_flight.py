@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    from fwd_api.concurrency import SingleFlight, run_concurrently_ordered
+    from fake_fwd import FakeFwd
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+DEVICES_JSON = os.path.join(os.path.dirname(__file__),
+                            '..', 'fwd-api-data', 'devices',
+                            'example.json')
+
+
+def test_concurrent_calls_share_one_call():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return object()
+
+    results = []
+    threads = [threading.Thread(
+        target=lambda: results.append(single_flight.do('k', slow)))
+        for _ in range(5)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    # Let the other threads join the call in flight
+    while single_flight.get_calls_shared() < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 5 and all(r is results[0] for r in results)
+
+    # Without a ttl, later calls run again
+    single_flight.do('k', slow)
+    assert len(calls) == 2
+
+
+def test_errors_are_shared_but_not_kept():
+    single_flight = SingleFlight(ttl=60)
+
+    def fail():
+        raise ValueError('boom')
+
+    try:
+        single_flight.do('k', fail)
+        assert False
+    except ValueError as e:
+        assert str(e) == 'boom'
+    assert single_flight.do('k', lambda: 1) == 1
+    # Reused within the ttl
+    assert single_flight.do('k', lambda: 2) == 1
+    single_flight.forget('k')
+    assert single_flight.do('k', lambda: 3) == 3
+
+
+def test_ttl_expiry():
+    single_flight = SingleFlight(ttl=0.05)
+    assert single_flight.do('k', lambda: 1) == 1
+    assert single_flight.do('k', lambda: 2) == 1
+    time.sleep(0.1)
+    assert single_flight.do('k', lambda: 3) == 3
+
+
+def test_expired_results_evicted():
+    single_flight = SingleFlight(ttl=0.05)
+    for i in range(10):
+        single_flight.do(i, lambda: i)
+    assert len(single_flight) == 10
+    time.sleep(0.1)
+    single_flight.do('k', lambda: 1)
+    assert len(single_flight) == 1
+
+
+def test_results_not_reused():
+    single_flight = SingleFlight(ttl=60)
+    assert single_flight.do('k', lambda: 1, reuse=False) == 1
+    assert single_flight.do('k', lambda: 2, reuse=False) == 2
+    assert len(single_flight) == 0
+
+
+def test_fwd_coalesces_get_devices():
+    with open(DEVICES_JSON) as fd:
+        devices_json = json.loads(fd.read())
+    release = threading.Event()
+
+    def get_devices(match, data):
+        release.wait()
+        return (200, devices_json)
+
+    fwd = FakeFwd(single_flight=SingleFlight())
+    fwd.add_handler('get', r'/api/snapshots/(\d+)/devices/', get_devices)
+    fwd.add_handler('get', r'/api/networks/(\d+)/collector/status',
+                    lambda match, data: (200, {'isOnline': True,
+                                               'isIdle': False}))
+
+    def get(i):
+        if i == 0:
+            # Wait for the other threads to join the first one's request
+            while fwd.single_flight.get_calls_shared() < 4:
+                time.sleep(0.01)
+            release.set()
+            return None
+        return fwd.get_devices(1)
+
+    results = run_concurrently_ordered(get, range(6), max_concurrency=6)
+    assert all(r.is_success() for r in results)
+    assert len(set(id(r.get_result()) for r in results[1:])) == 1
+    assert fwd.count_requests('get', r'/api/snapshots/1/devices/') == 1
+
+    assert fwd.get_collector_status(1, verbose=False).is_online
+    fwd.get_collector_status(1, verbose=False)
+    assert fwd.count_requests('get', r'/api/networks/1/collector/status') \
+        == 2
+
+
+def test_fwd_reuses_within_ttl():
+    checks = []
+    fwd = FakeFwd(single_flight=SingleFlight(ttl=60))
+    fwd.add_handler('get', r'/api/networks/(\d+)/collector/status',
+                    lambda match, data: (200, {'isOnline': True,
+                                               'isIdle': False}))
+    fwd.add_handler('get', r'/api/snapshots/(\d+)/checks',
+                    lambda match, data: (200, checks))
+    url = r'/api/networks/1/collector/status'
+    fwd.get_collector_status(1, verbose=False)
+    fwd.get_collector_status(1, verbose=False)
+    assert fwd.count_requests('get', url) == 1
+    # Verbose calls print their own request
+    fwd.get_collector_status(1, verbose=True)
+    assert fwd.count_requests('get', url) == 2
+
+    # Checks are polled, so never reused
+    fwd.get_checks(1)
+    fwd.get_checks(1)
+    assert fwd.count_requests('get', r'/api/snapshots/1/checks') == 2
+
+
+if __name__ == '__main__':
+    test_concurrent_calls_share_one_call()
+    test_errors_are_shared_but_not_kept()
+    test_ttl_expiry()
+    test_expired_results_evicted()
+    test_results_not_reused()
+    test_fwd_coalesces_get_devices()
+    test_fwd_reuses_within_ttl()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+import json
+import sys
+
+try:
+    from fwd_api.alias import (HostAlias, InterfaceAlias, IpV4TrafficAlias,
+                               RawAlias)
+    from fake_fwd import FakeFwd
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+
+def make_fwd():
+    fwd = FakeFwd()
+    aliases = {}
+
+    def get_aliases(match, data):
+        return (200, [dict(a, createdBy='admin')
+                      for _, a in sorted(aliases.iteritems())])
+
+    def put_alias(match, data):
+        name = match.group(2)
+        if name == 'bad':
+            return (400, {'error': 'bad alias'})
+        aliases[name] = json.loads(data)
+        return (200, None)
+
+    fwd.add_handler('get', r'/api/snapshots/(\d+)/aliases', get_aliases)
+    fwd.add_handler('put', r'/api/snapshots/(\d+)/aliases/([^/]+)',
+                    put_alias)
+    return fwd, aliases
+
+
+def test_sync_aliases():
+    fwd, aliases = make_fwd()
+    fwd.upload_alias(HostAlias('hosts', ['10.0.0.1']), 1, verbose=False)
+    fwd.upload_alias(InterfaceAlias('ifaces', 'veos-0', 'et1'), 1,
+                     verbose=False)
+
+    catalog = [HostAlias('hosts', ['10.0.0.1']),
+               InterfaceAlias('ifaces', 'veos-0', 'et2'),
+               IpV4TrafficAlias('nets', ['10.0.0.0/8']),
+               HostAlias('bad', ['x'])]
+    summary = fwd.sync_aliases(catalog, 1)
+    assert summary.get_counts() == {'created': 1, 'updated': 1,
+                                    'unchanged': 1, 'failed': 1}
+    assert summary.get_created() == ['nets']
+    assert summary.get_updated() == ['ifaces']
+    assert summary.get_unchanged() == ['hosts']
+    assert summary.get_failures()[0].get_request().get_name() == 'bad'
+    assert aliases['ifaces']['values'] == ['veos-0 et2']
+
+    # Re-applying the catalog only retries the failed alias
+    puts = fwd.count_requests('put', r'/api/snapshots/1/aliases/.*')
+    summary = fwd.sync_aliases(catalog[:3], 1)
+    assert summary.get_counts()['unchanged'] == 3
+    assert fwd.count_requests('put', r'/api/snapshots/1/aliases/.*') == puts
+
+
+def test_get_aliases():
+    fwd, aliases = make_fwd()
+    fwd.upload_alias(HostAlias('hosts', ['10.0.0.1']), 1, verbose=False)
+    result = fwd.get_aliases(1)
+    assert [a.get_name() for a in result] == ['hosts']
+    assert isinstance(result[0], RawAlias)
+    assert 'createdBy' not in result[0]._to_alias_dict()
+    assert result[0].get_definition_hash() == \
+        HostAlias('hosts', ['10.0.0.1']).get_definition_hash()
+
+
+if __name__ == '__main__':
+    test_sync_aliases()
+    test_get_aliases()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+import sys
+
+try:
+    from fwd_api.alias import (HostAlias, InterfaceAlias, IpV4TrafficAlias,
+                               TrafficAlias, VlanInterfaceAlias,
+                               VlanTrafficAlias)
+    from fwd_api.check import (ExistenceCheck, IsolationCheck, RawCheck,
+                               VlanExistenceCheck)
+    from fwd_api.fwd_filter import (DeviceFilter, EndpointFilter,
+                                    HostAliasFilter, IpDstField, L4DstField,
+                                    NotFilter, PacketFilter, Placeholder)
+    from fwd_api.validation import (ValidationError, check_batch,
+                                    validate_batch)
+    from fake_fwd import FakeCheckServer, FakeFwd
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+
+def endpoint(*fields):
+    return EndpointFilter(HostAliasFilter('hosts'), [PacketFilter(fields)])
+
+
+def test_valid_batch():
+    items = [
+        ExistenceCheck(endpoint(IpDstField('10.0.0.0/8'), L4DstField(22)),
+                       NotFilter(DeviceFilter('veos-1')), 'ok'),
+        HostAlias('hosts', ['10.0.0.1', 'host-a']),
+        InterfaceAlias('ifaces', 'veos-0', 'et1'),
+        VlanInterfaceAlias('vlans', vlans=['1-5']),
+        IpV4TrafficAlias('nets', ['10.0.0.0/8']),
+    ]
+    assert validate_batch(items) == []
+    check_batch(items)
+
+
+def test_unmodeled_fields_accepted():
+    packet_filter = {'type': 'PacketFilter',
+                     'values': {'in_port': ['et1'], 'ip_dscp': ['10'],
+                                'tp_dst': ['22']}}
+    items = [
+        RawCheck({'checkType': 'Existential',
+                  'filters': {'from': {'type': 'EndpointFilter',
+                                       'headers': [packet_filter]}}}),
+        TrafficAlias('t', {'ip_ttl': ['5'], 'tcp_flags': ['syn']}),
+    ]
+    assert validate_batch(items) == []
+
+
+def test_reserved_vlans():
+    items = [
+        VlanInterfaceAlias('v', vlans=['0-5']),
+        VlanExistenceCheck(['veos-0 et1'], ['10', '4095']),
+        VlanInterfaceAlias('ok', vlans=['1-4094']),
+    ]
+    messages = [(p.get_index(), p.get_message())
+                for p in validate_batch(items)]
+    assert messages == [(0, 'vlanIds: reserved VLAN ID 0'),
+                        (1, 'vlans: reserved VLAN ID 4095')]
+
+
+def test_all_problems_reported():
+    items = [
+        ExistenceCheck(endpoint(IpDstField('10.0.0.300'), L4DstField(70000)),
+                       None, 'bad-fields'),
+        IsolationCheck(endpoint(IpDstField(Placeholder('ip'))), None),
+        RawCheck({'checkType': 'Existential',
+                  'filters': {'from': {'type': 'MagicFilter'}}}),
+        VlanTrafficAlias('v', ['1', '5000']),
+        IpV4TrafficAlias('bad/name', ['10.0.0.0/33']),
+        HostAlias('hosts', []),
+        ExistenceCheck(DeviceFilter('a'), None, 'dup'),
+        ExistenceCheck(DeviceFilter('b'), None, 'dup'),
+        ExistenceCheck(DeviceFilter('b'), None, 'dup'),
+    ]
+    problems = validate_batch(items)
+    assert [p.get_index() for p in problems] == [0, 0, 1, 2, 3, 4, 4, 5, 7,
+                                                  8]
+    messages = [p.get_message() for p in problems]
+    assert 'from.headers[0].tp_dst' in messages[1]
+    assert 'unbound placeholder' in messages[2]
+    assert 'MagicFilter' in messages[3]
+    assert 'also used by item 6' in messages[8]
+    try:
+        check_batch(items)
+        assert False
+    except ValidationError as e:
+        assert len(e.get_problems()) == 10
+        assert "Item 4 (alias 'bad/name')" in str(e)
+
+
+def test_upload_checks_validates_first():
+    fwd = FakeFwd()
+    FakeCheckServer(fwd)
+    checks = [ExistenceCheck(DeviceFilter('a'), None, 'ok'),
+              ExistenceCheck(endpoint(L4DstField(-1)), None, 'bad')]
+    try:
+        fwd.upload_checks(checks, 1)
+        assert False
+    except ValidationError:
+        pass
+    assert fwd.requests == []
+
+
+if __name__ == '__main__':
+    test_valid_batch()
+    test_unmodeled_fields_accepted()
+    test_reserved_vlans()
+    test_all_problems_reported()
+    test_upload_checks_validates_first()
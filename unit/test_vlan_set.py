@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+import sys
+
+try:
+    from fwd_api.alias import VlanInterfaceAlias, VlanTrafficAlias
+    from fwd_api.check import VlanExistenceCheck
+    from fwd_api.vlan_set import VlanSet, find_overlaps
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+
+def test_parse_and_compact():
+    vlans = VlanSet(['1-5', 7, '6', '10,12-14', 3])
+    assert vlans.to_strings() == ['1-7', '10', '12-14']
+    assert len(vlans) == 11
+    assert 13 in vlans and 11 not in vlans and 0 not in vlans
+    assert VlanSet('1-4094').to_strings() == ['1-4094']
+    for bad in ['5-1', 'abc', '1-2-3', 4096]:
+        try:
+            VlanSet(bad)
+            assert False, bad
+        except ValueError:
+            pass
+
+
+def test_set_operations():
+    a = VlanSet('1-10,20-30')
+    b = VlanSet('5-25')
+    assert (a | b).to_strings() == ['1-30']
+    assert (a & b).to_strings() == ['5-10', '20-25']
+    assert (a - b).to_strings() == ['1-4', '26-30']
+    assert (b - a).to_strings() == ['11-19']
+    assert (a - VlanSet('1-3,5,30')).to_strings() == ['4', '6-10', '20-29']
+    assert a.overlaps('10') and not a.overlaps('11-19')
+    assert VlanSet('2-3').is_subset(a) and not b.is_subset(a)
+    assert a == VlanSet(range(1, 11) + range(20, 31))
+
+
+def test_find_overlaps():
+    overlaps = find_overlaps({'a': '1-10', 'b': '5-20', 'c': '30',
+                              'd': '8,30'})
+    assert [(x, y, v.to_strings()) for x, y, v in overlaps] == [
+        ('a', 'b', ['5-10']), ('a', 'd', ['8']), ('b', 'd', ['8']),
+        ('c', 'd', ['30'])]
+
+
+def test_aliases_and_checks():
+    vlans = ['1', '2-5', '7', '6']
+    # Kept as given unless collapsed
+    assert VlanInterfaceAlias('v', vlans=vlans)._to_alias_dict()[
+        'vlanIds'] == vlans
+    alias = VlanInterfaceAlias('v', vlans=vlans, collapse=True)
+    assert alias._to_alias_dict()['vlanIds'] == ['1-7']
+    assert VlanInterfaceAlias('v', vlans=VlanSet(vlans))._to_alias_dict()[
+        'vlanIds'] == ['1-7']
+    traffic = VlanTrafficAlias('t', VlanSet('3-5'))
+    assert traffic._to_alias_dict()['values']['vlan_vid'] == ['3', '4', '5']
+    assert alias.get_vlan_set().overlaps(traffic.get_vlan_set())
+    check = VlanExistenceCheck([], VlanSet('1-3'))
+    assert check.to_check_dict()['params']['vlans'] == [1, 2, 3]
+
+
+if __name__ == '__main__':
+    test_parse_and_compact()
+    test_set_operations()
+    test_find_overlaps()
+    test_aliases_and_checks()
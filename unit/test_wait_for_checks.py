@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+import sys
+
+try:
+    from fwd_api.check import NetworkCheckStatus
+    from fake_fwd import FakeCheckServer, FakeFwd
+except:
+    print('Error importing from fwd_api. Check that you ran ' +
+          'setup (see README).')
+    sys.exit(-1)
+
+
+def make_fwd(num_checks):
+    '''Each request evaluates the pending check with the smallest id
+    '''
+    fwd = FakeFwd()
+
+    def evaluate(match):
+        checks = server.checks[int(match.group(1))]
+        pending = sorted(i for i, c in checks.iteritems()
+                         if c['status'] == 'NONE')
+        if pending:
+            checks[pending[0]]['status'] = 'PASS'
+
+    def get_checks(match, data):
+        evaluate(match)
+        return server._get_checks(match, data)
+
+    def get_check(match, data):
+        evaluate(match)
+        return server._get_check(match, data)
+
+    fwd.add_handler('get', r'/api/snapshots/(\d+)/checks', get_checks)
+    fwd.add_handler('get', r'/api/snapshots/(\d+)/checks/(\d+)', get_check)
+    server = FakeCheckServer(fwd)
+    ids = [server.add_check(1, {'name': 'c%d' % i})['id']
+           for i in range(num_checks)]
+    return fwd, server, ids
+
+
+def test_wait_for_checks():
+    fwd, server, ids = make_fwd(6)
+    server.set_status(1, ids[4], 'FAIL')
+    results = list(fwd.wait_for_checks(1, ids, min_interval=0.001))
+
+    assert sorted(r.get_check_id() for r in results) == ids
+    # The first round finds the failed check and evaluates another
+    assert [r.get_check_id() for r in results[:2]] == [ids[0], ids[4]]
+    assert results[1].get_status() == NetworkCheckStatus.FAIL
+    assert all(r.get_status() != NetworkCheckStatus.NONE for r in results)
+    # Whole-snapshot polls until few checks are pending, then per check
+    assert fwd.count_requests('get', r'/api/snapshots/1/checks') == 2
+    assert fwd.count_requests('get', r'/api/snapshots/1/checks/\d+') > 0
+
+
+def test_wait_for_checks_timeout():
+    fwd = FakeFwd()
+    server = FakeCheckServer(fwd)
+    ids = [server.add_check(1, {'name': 'c'})['id']]
+    try:
+        list(fwd.wait_for_checks(1, ids, timeout=0.05, min_interval=0.01))
+        assert False
+    except Exception as e:
+        assert 'Timed out' in str(e)
+
+
+def test_wait_for_checks_polls_at_deadline():
+    fwd = FakeFwd()
+
+    def get_check(match, data):
+        # Evaluated by the third poll, at the deadline
+        if fwd.count_requests('get', r'/api/snapshots/1/checks/\d+') == 3:
+            server.set_status(1, check_id, 'PASS')
+        return server._get_check(match, data)
+
+    fwd.add_handler('get', r'/api/snapshots/(\d+)/checks/(\d+)', get_check)
+    server = FakeCheckServer(fwd)
+    check_id = server.add_check(1, {'name': 'c'})['id']
+    results = list(fwd.wait_for_checks(1, [check_id], timeout=0.3,
+                                       min_interval=0.2, max_interval=0.2))
+    assert [r.get_status() for r in results] == [NetworkCheckStatus.PASS]
+    assert fwd.count_requests('get', r'/api/snapshots/1/checks/\d+') == 3
+
+
+if __name__ == '__main__':
+    test_wait_for_checks()
+    test_wait_for_checks_timeout()
+    test_wait_for_checks_polls_at_deadline()